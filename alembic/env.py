@@ -0,0 +1,43 @@
+"""Alembic environment: migrates the database named by ``DATABASE_URL``."""
+from logging.config import fileConfig
+
+from alembic import context
+from sqlalchemy import create_engine, pool
+
+from app.core import models  # noqa: F401  registers the tables on Base
+from app.core.database import SQLALCHEMY_DATABASE_URL, Base
+
+config = context.config
+# callers that already configured logging (e.g. tests) can opt out
+if config.config_file_name is not None and config.attributes.get("configure_logger", True):
+    fileConfig(config.config_file_name)
+
+target_metadata = Base.metadata
+
+
+def _url() -> str:
+    # an explicit -x url=... or sqlalchemy.url wins over DATABASE_URL
+    return context.get_x_argument(as_dictionary=True).get("url") or config.get_main_option(
+        "sqlalchemy.url", SQLALCHEMY_DATABASE_URL
+    )
+
+
+def run_migrations_offline() -> None:
+    context.configure(url=_url(), target_metadata=target_metadata, literal_binds=True, render_as_batch=True)
+    with context.begin_transaction():
+        context.run_migrations()
+
+
+def run_migrations_online() -> None:
+    connectable = create_engine(_url(), poolclass=pool.NullPool)
+    with connectable.connect() as connection:
+        # batch mode lets ALTERs work on SQLite, which rebuilds the table
+        context.configure(connection=connection, target_metadata=target_metadata, render_as_batch=True)
+        with context.begin_transaction():
+            context.run_migrations()
+
+
+if context.is_offline_mode():
+    run_migrations_offline()
+else:
+    run_migrations_online()
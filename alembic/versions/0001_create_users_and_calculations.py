@@ -0,0 +1,57 @@
+"""create users and calculations
+
+Revision ID: 0001
+Revises:
+Create Date: 2026-10-18 11:05:29.648414
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0001'
+down_revision: Union[str, None] = None
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table('users',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('username', sa.String(), nullable=False),
+    sa.Column('email', sa.String(), nullable=False),
+    sa.Column('password_hash', sa.String(), nullable=False),
+    sa.Column('created_at', sa.DateTime(timezone=True), server_default=sa.func.now(), nullable=False),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_users_email'), 'users', ['email'], unique=True)
+    op.create_index(op.f('ix_users_id'), 'users', ['id'], unique=False)
+    op.create_index(op.f('ix_users_username'), 'users', ['username'], unique=True)
+
+    op.create_table('calculations',
+    sa.Column('id', sa.Integer(), nullable=False),
+    sa.Column('a', sa.Float(), nullable=False),
+    sa.Column('b', sa.Float(), nullable=False),
+    sa.Column('type', sa.String(), nullable=False),
+    sa.Column('result', sa.Float(), nullable=True),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.ForeignKeyConstraint(['user_id'], ['users.id'], ),
+    sa.PrimaryKeyConstraint('id')
+    )
+    op.create_index(op.f('ix_calculations_id'), 'calculations', ['id'], unique=False)
+    op.create_index(op.f('ix_calculations_type'), 'calculations', ['type'], unique=False)
+    op.create_index(op.f('ix_calculations_user_id'), 'calculations', ['user_id'], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f('ix_calculations_user_id'), table_name='calculations')
+    op.drop_index(op.f('ix_calculations_type'), table_name='calculations')
+    op.drop_index(op.f('ix_calculations_id'), table_name='calculations')
+    op.drop_table('calculations')
+    op.drop_index(op.f('ix_users_username'), table_name='users')
+    op.drop_index(op.f('ix_users_id'), table_name='users')
+    op.drop_index(op.f('ix_users_email'), table_name='users')
+    op.drop_table('users')
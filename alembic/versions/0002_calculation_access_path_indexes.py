@@ -0,0 +1,35 @@
+"""index calculations by (user_id, id)
+
+Replaces the single-column indexes on calculations (id duplicates the
+primary key, type is never filtered on, user_id alone leaves ORDER BY id to
+a sort on Postgres) with one composite (user_id, id) index.
+
+Revision ID: 0002
+Revises: 0001
+Create Date: 2026-10-18 11:40:12.118204
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0002'
+down_revision: Union[str, None] = '0001'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index('ix_calculations_user_id_id', 'calculations', ['user_id', 'id'], unique=False)
+    op.drop_index('ix_calculations_user_id', table_name='calculations')
+    op.drop_index('ix_calculations_type', table_name='calculations')
+    op.drop_index('ix_calculations_id', table_name='calculations')
+
+
+def downgrade() -> None:
+    op.create_index('ix_calculations_id', 'calculations', ['id'], unique=False)
+    op.create_index('ix_calculations_type', 'calculations', ['type'], unique=False)
+    op.create_index('ix_calculations_user_id', 'calculations', ['user_id'], unique=False)
+    op.drop_index('ix_calculations_user_id_id', table_name='calculations')
@@ -0,0 +1,127 @@
+"""per-user calculation stats summary table
+
+Adds calculation_stats, kept current by triggers on calculations, and
+backfills it from the existing rows. The trigger DDL is a copy of the one in
+app.core.models as of this revision, so later model changes cannot alter
+what this migration does.
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-18 14:05:37.402519
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision: str = '0003'
+down_revision: Union[str, None] = '0002'
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+# the trigger DDL as of this revision
+_SQLITE_REMOVE_OLD = """
+    UPDATE calculation_stats SET
+        count = count - 1,
+        total = total - coalesce(OLD.result, 0),
+        minimum = CASE WHEN OLD.result <= minimum THEN
+            (SELECT min(result) FROM calculations WHERE user_id = OLD.user_id AND type = OLD.type)
+            ELSE minimum END,
+        maximum = CASE WHEN OLD.result >= maximum THEN
+            (SELECT max(result) FROM calculations WHERE user_id = OLD.user_id AND type = OLD.type)
+            ELSE maximum END
+    WHERE user_id = OLD.user_id AND type = OLD.type;
+    DELETE FROM calculation_stats WHERE user_id = OLD.user_id AND type = OLD.type AND count <= 0;
+"""
+
+_SQLITE_ADD_NEW = """
+    INSERT INTO calculation_stats (user_id, type, count, total, minimum, maximum)
+    SELECT NEW.user_id, NEW.type, 1, coalesce(NEW.result, 0), NEW.result, NEW.result
+    WHERE NEW.user_id IS NOT NULL
+    ON CONFLICT (user_id, type) DO UPDATE SET
+        count = count + 1,
+        total = total + excluded.total,
+        minimum = CASE WHEN minimum IS NULL OR excluded.minimum < minimum
+            THEN coalesce(excluded.minimum, minimum) ELSE minimum END,
+        maximum = CASE WHEN maximum IS NULL OR excluded.maximum > maximum
+            THEN coalesce(excluded.maximum, maximum) ELSE maximum END;
+"""
+
+_SQLITE_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS calculation_stats_insert AFTER INSERT ON calculations BEGIN {_SQLITE_ADD_NEW} END",
+    f"CREATE TRIGGER IF NOT EXISTS calculation_stats_delete AFTER DELETE ON calculations BEGIN {_SQLITE_REMOVE_OLD} END",
+    "CREATE TRIGGER IF NOT EXISTS calculation_stats_update AFTER UPDATE OF type, result, user_id ON calculations "
+    f"BEGIN {_SQLITE_REMOVE_OLD} {_SQLITE_ADD_NEW} END",
+)
+
+_POSTGRES_TRIGGERS = (
+    """
+    CREATE OR REPLACE FUNCTION calculation_stats_maintain() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.user_id IS NOT NULL THEN
+            UPDATE calculation_stats SET
+                count = count - 1,
+                total = total - coalesce(OLD.result, 0),
+                minimum = CASE WHEN OLD.result <= minimum THEN
+                    (SELECT min(result) FROM calculations WHERE user_id = OLD.user_id AND type = OLD.type)
+                    ELSE minimum END,
+                maximum = CASE WHEN OLD.result >= maximum THEN
+                    (SELECT max(result) FROM calculations WHERE user_id = OLD.user_id AND type = OLD.type)
+                    ELSE maximum END
+            WHERE user_id = OLD.user_id AND type = OLD.type;
+            DELETE FROM calculation_stats WHERE user_id = OLD.user_id AND type = OLD.type AND count <= 0;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.user_id IS NOT NULL THEN
+            INSERT INTO calculation_stats AS s (user_id, type, count, total, minimum, maximum)
+            VALUES (NEW.user_id, NEW.type, 1, coalesce(NEW.result, 0), NEW.result, NEW.result)
+            ON CONFLICT (user_id, type) DO UPDATE SET
+                count = s.count + 1,
+                total = s.total + excluded.total,
+                minimum = LEAST(s.minimum, excluded.minimum),
+                maximum = GREATEST(s.maximum, excluded.maximum);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS calculation_stats_maintain ON calculations",
+    "CREATE TRIGGER calculation_stats_maintain AFTER INSERT OR UPDATE OF type, result, user_id OR DELETE "
+    "ON calculations FOR EACH ROW EXECUTE FUNCTION calculation_stats_maintain()",
+)
+
+
+def upgrade() -> None:
+    op.create_table(
+        'calculation_stats',
+        sa.Column('user_id', sa.Integer(), nullable=False),
+        sa.Column('type', sa.String(), nullable=False),
+        sa.Column('count', sa.Integer(), nullable=False),
+        sa.Column('total', sa.Float(), nullable=False),
+        sa.Column('minimum', sa.Float(), nullable=True),
+        sa.Column('maximum', sa.Float(), nullable=True),
+        sa.ForeignKeyConstraint(['user_id'], ['users.id']),
+        sa.PrimaryKeyConstraint('user_id', 'type'),
+    )
+    dialect = op.get_bind().dialect.name
+    triggers = {'sqlite': _SQLITE_TRIGGERS, 'postgresql': _POSTGRES_TRIGGERS}.get(dialect, ())
+    for statement in triggers:
+        op.execute(statement)
+    op.execute(
+        "INSERT INTO calculation_stats (user_id, type, count, total, minimum, maximum) "
+        "SELECT user_id, type, count(*), coalesce(sum(result), 0), min(result), max(result) "
+        "FROM calculations WHERE user_id IS NOT NULL GROUP BY user_id, type"
+    )
+
+
+def downgrade() -> None:
+    dialect = op.get_bind().dialect.name
+    if dialect == 'sqlite':
+        for name in ('calculation_stats_insert', 'calculation_stats_delete', 'calculation_stats_update'):
+            op.execute(f"DROP TRIGGER IF EXISTS {name}")
+    elif dialect == 'postgresql':
+        op.execute("DROP TRIGGER IF EXISTS calculation_stats_maintain ON calculations")
+        op.execute("DROP FUNCTION IF EXISTS calculation_stats_maintain()")
+    op.drop_table('calculation_stats')
@@ -1,3 +1,3 @@
 """API package containing FastAPI application and request/response schemas."""
 
-__all__ = ["main", "schemas"]
+__all__ = ["main", "schemas", "async_routes", "export", "metrics", "middleware", "profiling", "responses", "idempotency"]
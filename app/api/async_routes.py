@@ -0,0 +1,230 @@
+"""AsyncSession versions of the user and calculation routes.
+
+With ``DB_MODE=async`` :func:`install` replaces the sync routes in
+``app.api.main`` with the ones below, which await an ``AsyncSession`` from
+:func:`app.core.database.get_async_sessionmaker` instead of running on the
+anyio threadpool. Concurrency is then bounded by the database connection
+pool rather than by the threadpool's 40 workers. Validation, pagination and
+batch computation are shared with the sync routes; only the I/O differs.
+"""
+from __future__ import annotations
+
+import asyncio
+from typing import Any, List
+
+from fastapi import APIRouter, Body, Depends, FastAPI, Header, HTTPException, Query, Request, Security
+from fastapi.routing import APIRoute
+from fastapi.security import HTTPAuthorizationCredentials
+from sqlalchemy import insert, select, update
+from sqlalchemy.exc import IntegrityError
+
+from ..auth.principals import load_principal_async
+from ..auth.security import create_token, password_pool
+from ..config.settings import settings
+from ..core import database, models
+from ..core.bulk import insert_returning
+from ..core.stats import live_stats_stmt, summary_stats_stmt
+from . import main as sync_routes
+from .main import (
+    DEFAULT_PAGE_SIZE,
+    MAX_PAGE_SIZE,
+    _batch_rows,
+    _calculation_page,
+    _decode_cursor,
+    _hash_work,
+    _parse_fields,
+    _submit_calculation,
+    _write_timeout,
+    _token_claims,
+    bearer_scheme,
+    calculation_values,
+    delete_calculation_stmt,
+    list_calculations_stmt,
+    owned_calculation_stmt,
+    update_calculation_stmt,
+)
+from .responses import model_response
+from .schemas import (
+    CalculationBatchResult,
+    CalculationCreate,
+    CalculationRead,
+    CalculationStatsRead,
+    LoginRequest,
+    UserCreate,
+    UserRead,
+)
+
+router = APIRouter()
+
+
+async def get_async_db():
+    maker = database.get_async_sessionmaker()
+    await database.ensure_schema_async(maker.kw["bind"])
+    async with maker() as db:
+        yield db
+
+
+async def get_current_user_async(
+    credentials: HTTPAuthorizationCredentials | None = Security(bearer_scheme),
+    authorization: str | None = Header(None, alias="Authorization"),
+    db=Depends(get_async_db),
+):
+    subject, user_id = _token_claims(credentials, authorization)
+    user = await load_principal_async(db, subject, user_id)
+    if not user:
+        raise HTTPException(status_code=401, detail="invalid token")
+    return user
+
+
+@router.post("/users/register", response_model=UserRead)
+async def register_user(user: UserCreate, db=Depends(get_async_db)):
+    hashed = await _hash_work(password_pool.hash(user.password))
+    db_user = models.User(username=user.username, email=user.email, password_hash=hashed)
+    db.add(db_user)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(status_code=400, detail="username or email already exists")
+    # created_at is a server default, so it has to be read back
+    await db.refresh(db_user, ["created_at"])
+    return UserRead.model_validate(db_user)
+
+
+async def _authenticate(db, payload: LoginRequest):
+    db_user = await db.scalar(select(models.User).where(models.User.username == payload.username).limit(1))
+    # end the read transaction so the connection is free during the password check
+    await db.commit()
+    if not db_user:
+        raise HTTPException(status_code=401, detail="invalid credentials")
+    ok, new_hash = await _hash_work(password_pool.verify_and_update(payload.password, db_user.password_hash))
+    if not ok:
+        raise HTTPException(status_code=401, detail="invalid credentials")
+    if new_hash is not None:
+        await db.execute(update(models.User).where(models.User.id == db_user.id).values(password_hash=new_hash))
+        await db.commit()
+    return db_user
+
+
+@router.post("/users/token")
+async def token(payload: LoginRequest, db=Depends(get_async_db)):
+    db_user = await _authenticate(db, payload)
+    tok = create_token({"sub": db_user.username, "uid": db_user.id})
+    return {"access_token": tok, "token_type": "bearer"}
+
+
+@router.post("/users/login", response_model=UserRead)
+async def login_user(payload: LoginRequest, db=Depends(get_async_db)):
+    db_user = await _authenticate(db, payload)
+    return UserRead.model_validate(db_user)
+
+
+@router.post("/calculations", response_model=CalculationRead, status_code=201)
+async def create_calculation(
+    request: Request,
+    data: CalculationCreate,
+    current_user=Depends(get_current_user_async),
+    db=Depends(get_async_db),
+):
+    values = calculation_values(data, current_user.id)
+    if sync_routes.calculation_writer is not None:
+        # the group-commit writer uses the sync engine; release this connection meanwhile
+        await db.close()
+        future = _submit_calculation(values)
+        try:
+            created = await asyncio.wait_for(asyncio.shield(asyncio.wrap_future(future)), settings.db_write_timeout)
+        except asyncio.TimeoutError:
+            raise _write_timeout(request, future) from None
+        return model_response(created, status_code=201)
+    stmt = insert(models.Calculation).values(values).returning(models.Calculation)
+    created = CalculationRead.model_validate(await db.scalar(stmt))
+    await db.commit()
+    return model_response(created, status_code=201)
+
+
+@router.post("/calculations/batch", response_model=CalculationBatchResult)
+async def create_calculations_batch(
+    items: List[Any] = Body(...),
+    current_user=Depends(get_current_user_async),
+    db=Depends(get_async_db),
+):
+    rows, errors = _batch_rows(items, current_user.id)
+    created: List[CalculationRead] = []
+    if rows:
+        stmt, ordered = insert_returning(models.Calculation, db.get_bind().dialect)
+        created = [CalculationRead.model_validate(c) for c in ordered(await db.scalars(stmt, rows))]
+        await db.commit()
+    errors.sort(key=lambda err: err.index)
+    return model_response(CalculationBatchResult(created=created, errors=errors))
+
+
+@router.get("/calculations", response_model=List[CalculationRead])
+async def list_calculations(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+    current_user=Depends(get_current_user_async),
+    db=Depends(get_async_db),
+):
+    selected = _parse_fields(fields)
+    after = _decode_cursor(cursor) if cursor else None
+    rows = (await db.execute(list_calculations_stmt(current_user.id, after, limit + 1, selected))).all()
+    return _calculation_page(rows, limit, fields, selected)
+
+
+@router.get("/calculations/stats", response_model=CalculationStatsRead)
+async def calculation_stats(
+    source: str = Query("summary", pattern="^(summary|live)$"),
+    current_user=Depends(get_current_user_async),
+    db=Depends(get_async_db),
+):
+    stmt = summary_stats_stmt if source == "summary" else live_stats_stmt
+    return CalculationStatsRead.from_rows((await db.execute(stmt(current_user.id))).all())
+
+
+async def _owned_calculation(db, calc_id: int, user_id: int) -> models.Calculation:
+    calc = await db.scalar(owned_calculation_stmt(calc_id, user_id))
+    if not calc:
+        raise HTTPException(status_code=404, detail="calculation not found")
+    return calc
+
+
+@router.get("/calculations/{calc_id}", response_model=CalculationRead)
+async def get_calculation(calc_id: int, current_user=Depends(get_current_user_async), db=Depends(get_async_db)):
+    return model_response(CalculationRead.model_validate(await _owned_calculation(db, calc_id, current_user.id)))
+
+
+@router.put("/calculations/{calc_id}", response_model=CalculationRead)
+async def update_calculation(
+    calc_id: int, data: CalculationCreate, current_user=Depends(get_current_user_async), db=Depends(get_async_db)
+):
+    stmt = update_calculation_stmt(calc_id, current_user.id, calculation_values(data, current_user.id))
+    calc = await db.scalar(stmt)
+    if calc is None:
+        raise HTTPException(status_code=404, detail="calculation not found")
+    updated = CalculationRead.model_validate(calc)
+    await db.commit()
+    return model_response(updated)
+
+
+@router.delete("/calculations/{calc_id}", status_code=204)
+async def delete_calculation(calc_id: int, current_user=Depends(get_current_user_async), db=Depends(get_async_db)):
+    if await db.scalar(delete_calculation_stmt(calc_id, current_user.id)) is None:
+        raise HTTPException(status_code=404, detail="calculation not found")
+    await db.commit()
+
+
+def install(app: FastAPI) -> None:
+    """Replace ``app``'s sync versions of these routes with the async ones.
+
+    Routes not defined here (e.g. ``/calculations/export``) are left as is.
+    The async engine is disposed on shutdown.
+    """
+    replaced = {(route.path, method) for route in router.routes for method in route.methods}
+    app.router.routes[:] = [
+        route
+        for route in app.router.routes
+        if not (isinstance(route, APIRoute) and any((route.path, m) in replaced for m in route.methods))
+    ]
+    app.include_router(router)
+    app.add_event_handler("shutdown", database.dispose_async_engine)
@@ -0,0 +1,75 @@
+"""Streaming export of a user's calculation history.
+
+:func:`iter_export` yields encoded chunks (NDJSON or CSV) for one user's
+calculations without materializing them: the query runs on the session's
+Core connection with ``stream_results`` and ``yield_per`` (a server-side
+cursor on Postgres; SQLite cursors already fetch lazily), skipping ORM result
+processing, and each partition of rows is encoded into a single chunk.
+Memory therefore stays proportional to ``chunk_size`` rather than to the
+size of the history.
+"""
+from __future__ import annotations
+
+import csv
+import io
+from typing import Callable, Iterator
+
+from pydantic_core import to_json
+from sqlalchemy import select
+from sqlalchemy.orm import Session
+
+from ..core import models
+
+EXPORT_FORMATS = {
+    "ndjson": "application/x-ndjson",
+    "csv": "text/csv; charset=utf-8",
+}
+
+EXPORT_COLUMNS = ("id", "a", "b", "type", "result", "user_id")
+
+DEFAULT_CHUNK_SIZE = 1000
+
+
+def export_stmt(user_id: int):
+    columns = [getattr(models.Calculation, name) for name in EXPORT_COLUMNS]
+    return select(*columns).where(models.Calculation.user_id == user_id).order_by(models.Calculation.id)
+
+
+def _ndjson_chunk(rows) -> bytes:
+    # non-finite results (e.g. an overflowing multiply) become null, as in
+    # the JSON routes; Infinity/NaN are not valid JSON
+    return b"".join(to_json(dict(zip(EXPORT_COLUMNS, row)), inf_nan_mode="null") + b"\n" for row in rows)
+
+
+def _csv_chunk(rows) -> bytes:
+    buf = io.StringIO()
+    csv.writer(buf, lineterminator="\n").writerows(rows)
+    return buf.getvalue().encode("utf-8")
+
+
+def iter_export(
+    session_factory: Callable[[], Session],
+    user_id: int,
+    fmt: str,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> Iterator[bytes]:
+    """Yield ``fmt``-encoded chunks of ``user_id``'s calculations, oldest first.
+
+    The generator opens its own session so it can outlive the request's
+    ``get_db`` session while the response body is being streamed; the
+    session is closed when the generator finishes or is closed early.
+    """
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"unsupported export format: {fmt!r}")
+    encode = _ndjson_chunk if fmt == "ndjson" else _csv_chunk
+    if fmt == "csv":
+        yield _csv_chunk([EXPORT_COLUMNS])
+
+    db = session_factory()
+    try:
+        conn = db.connection().execution_options(stream_results=True, yield_per=chunk_size)
+        result = conn.execute(export_stmt(user_id))
+        for partition in result.partitions():
+            yield encode(partition)
+    finally:
+        db.close()
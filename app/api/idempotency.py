@@ -0,0 +1,187 @@
+"""``Idempotency-Key`` support for POST routes.
+
+A client that retries a POST after a timeout cannot tell whether the first
+attempt went through. Sending the same ``Idempotency-Key`` header on every
+attempt makes the retry safe: :class:`IdempotencyMiddleware` stores the
+first response per (principal, path, key) and replays it to later requests
+with the same key (marked ``Idempotent-Replayed: true``) without running the
+handler again. A request carrying a key that is still being processed waits
+for that request to finish and then gets its response. Reusing a key with a
+different request body is rejected with 422.
+
+Responses with status 429 or 5xx are not stored, so a retry after a
+transient failure runs the handler again. Requests without the header are
+untouched. A handler that gives up waiting on work that may still complete
+(e.g. a queued write that timed out) calls :func:`defer_response`: the key
+then stays in flight until that work finishes, and its eventual response is
+stored for the retry, so the retry neither repeats the work nor loses it.
+
+Stored responses live in a :class:`app.core.cache.TTLCache` (LRU, with a
+TTL), so a key is honoured until it expires or is evicted. The store is per
+process: with several workers, a retry that lands on another worker is not
+deduplicated.
+"""
+from __future__ import annotations
+
+import asyncio
+import hashlib
+import json
+from dataclasses import dataclass
+from concurrent.futures import Future
+from typing import Any, Callable, Iterable
+
+from ..core.cache import TTLCache
+
+IDEMPOTENCY_HEADER = b"idempotency-key"
+REPLAYED_HEADER = b"idempotent-replayed"
+MAX_KEY_LENGTH = 255
+# scope key holding the request's deferred (future, render) pairs
+DEFERRED_SCOPE_KEY = "idempotency.deferred"
+
+
+@dataclass(frozen=True)
+class StoredResponse:
+    fingerprint: str
+    status: int
+    headers: list
+    body: bytes
+
+
+def defer_response(scope: dict, future: Future, render: Callable[[Any], Any]) -> None:
+    """Store ``render(future.result())`` for the request's key once ``future`` resolves.
+
+    For a handler that answers before its work is known to be done. If the
+    future fails, nothing is stored and a retry runs the handler again. A
+    no-op for requests without an ``Idempotency-Key``.
+    """
+    deferred = scope.get(DEFERRED_SCOPE_KEY)
+    if deferred is not None:
+        deferred.append((future, render))
+
+
+async def _error(send, status: int, detail: str) -> None:
+    body = json.dumps({"detail": detail}).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode("latin-1"))],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+class IdempotencyMiddleware:
+    """Store and replay POST responses for requests sending ``Idempotency-Key``.
+
+    ``paths`` are the routes it applies to. ``principal(scope)`` names the
+    caller the key belongs to (``""`` for anonymous requests); returning None
+    leaves the request alone, e.g. when its credentials are invalid and the
+    route is going to reject it anyway.
+    """
+
+    def __init__(self, app, store: TTLCache, paths: Iterable[str], principal: Callable[[dict], str | None]):
+        self.app = app
+        self.store = store
+        self.paths = frozenset(paths)
+        self.principal = principal
+        self._in_flight: dict[tuple, asyncio.Event] = {}
+        self._settling: set[asyncio.Task] = set()
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["method"] != "POST" or scope["path"] not in self.paths:
+            await self.app(scope, receive, send)
+            return
+        key = next((value for name, value in scope["headers"] if name == IDEMPOTENCY_HEADER), None)
+        owner = self.principal(scope) if key is not None else None
+        if owner is None:
+            await self.app(scope, receive, send)
+            return
+        if not key or len(key) > MAX_KEY_LENGTH:
+            await _error(send, 400, f"Idempotency-Key must be 1 to {MAX_KEY_LENGTH} characters")
+            return
+
+        # the body is read up front to fingerprint it, then handed to the app
+        chunks = []
+        while True:
+            message = await receive()
+            if message["type"] == "http.disconnect":
+                return
+            chunks.append(message.get("body", b""))
+            if not message.get("more_body", False):
+                break
+        body = b"".join(chunks)
+        fingerprint = hashlib.sha256(body).hexdigest()
+        cache_key = (owner, scope["path"], key)
+
+        while True:
+            stored = self.store.get(cache_key)
+            if stored is not None:
+                if stored.fingerprint != fingerprint:
+                    await _error(send, 422, "Idempotency-Key was already used with a different request")
+                    return
+                await send(
+                    {
+                        "type": "http.response.start",
+                        "status": stored.status,
+                        "headers": stored.headers + [(REPLAYED_HEADER, b"true")],
+                    }
+                )
+                await send({"type": "http.response.body", "body": stored.body})
+                return
+            pending = self._in_flight.get(cache_key)
+            if pending is None:
+                break
+            await pending.wait()
+
+        done = asyncio.Event()
+        self._in_flight[cache_key] = done
+        body_sent = False
+
+        async def receive_wrapper():
+            nonlocal body_sent
+            if not body_sent:
+                body_sent = True
+                return {"type": "http.request", "body": body, "more_body": False}
+            return await receive()
+
+        status, headers, parts, complete = 500, [], [], False
+
+        async def send_wrapper(message):
+            nonlocal status, headers, complete
+            if message["type"] == "http.response.start":
+                status, headers = message["status"], list(message.get("headers", []))
+            elif message["type"] == "http.response.body":
+                parts.append(message.get("body", b""))
+                complete = not message.get("more_body", False)
+            await send(message)
+
+        deferred: list = []
+        settled = True
+        try:
+            await self.app({**scope, DEFERRED_SCOPE_KEY: deferred}, receive_wrapper, send_wrapper)
+            if deferred:
+                # keep the key in flight until the outcome is known
+                task = asyncio.ensure_future(self._settle(cache_key, fingerprint, done, *deferred[-1]))
+                self._settling.add(task)
+                task.add_done_callback(self._settling.discard)
+                settled = False
+            elif complete and status < 500 and status != 429:
+                self.store.set(cache_key, StoredResponse(fingerprint, status, headers, b"".join(parts)))
+        finally:
+            if settled:
+                del self._in_flight[cache_key]
+                done.set()
+
+    async def _settle(self, cache_key: tuple, fingerprint: str, done: asyncio.Event, future, render) -> None:
+        try:
+            response = render(await asyncio.wrap_future(future))
+        except Exception:  # pylint: disable=broad-except
+            pass  # the work failed, so a retry may run it again
+        else:
+            self.store.set(
+                cache_key, StoredResponse(fingerprint, response.status_code, list(response.raw_headers), response.body)
+            )
+        finally:
+            del self._in_flight[cache_key]
+            done.set()
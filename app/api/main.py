@@ -1,30 +1,71 @@
 """FastAPI calculator application with centralized logging."""
+import base64
+import hashlib
+import json
 import logging
-import time
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
+from urllib.parse import urlencode
 
-from fastapi import FastAPI, HTTPException, Request, Depends, Security
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, Security, Body, Query
+from fastapi.concurrency import run_in_threadpool
 from fastapi.staticfiles import StaticFiles
-from fastapi.responses import FileResponse
-from pydantic import BaseModel
+from fastapi.responses import FileResponse, PlainTextResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+from sqlalchemy import delete, insert, select, update
 from sqlalchemy.orm import Session
 from sqlalchemy.exc import IntegrityError
 
-from ..config.logging_config import configure_logging
+from ..config.logging_config import configure_logging, logging_stats
+from ..config.settings import settings
+from ..core.cache import TTLCache
 from ..core.calculator import add, sub, mul, div
-from ..core import models
-from ..core.database import SessionLocal, engine, Base
-from ..api.schemas import UserCreate, UserRead, LoginRequest, CalculationCreate, CalculationRead
-from ..auth.security import hash_password, verify_password, create_token, verify_token
+from ..core import database, models
+from ..core.bulk import insert_returning
+from ..core.stats import live_stats_stmt, summary_stats_stmt
+from ..core.writequeue import GroupCommitQueue, WriteQueueFullError
+from ..core.factory import compute_many
+from ..core.pool import pool_status
+from ..core.database import SessionLocal, engine, ensure_schema
+from ..api.export import EXPORT_FORMATS, iter_export
+from ..api.metrics import (
+    PROMETHEUS_CONTENT_TYPE,
+    cache_metric_lines,
+    pool_metric_lines,
+    registry as metrics_registry,
+    write_queue_metric_lines,
+)
+from ..api.idempotency import IdempotencyMiddleware, defer_response
+from ..api.middleware import AccessLogMiddleware, MetricsMiddleware, QueryStatsMiddleware
+from ..api.profiling import ProfiledRoute, ProfilingMiddleware
+from ..api.responses import RawJSONResponse, calculation_rows_json, model_response, projection_json
+from ..api.schemas import (
+    UserCreate,
+    UserRead,
+    LoginRequest,
+    CalculationCreate,
+    CalculationRead,
+    CalculationBatchError,
+    CalculationBatchResult,
+    CalculationStatsRead,
+)
+from ..auth.principals import load_principal, principal_cache
+from ..auth.security import HasherBusyError, create_token, password_pool, token_cache, verify_token
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
 from fastapi import Header
-from typing import List
+from typing import Any, List
 
 # ensure logging is configured (idempotent)
 configure_logging()
 
 logger = logging.getLogger("calculator")
 
+# upper bound on items accepted by POST /calculations/batch
+MAX_BATCH_SIZE = 1000
+# page size bounds for GET /calculations
+DEFAULT_PAGE_SIZE = 100
+MAX_PAGE_SIZE = 1000
+
 
 class Operands(BaseModel):
     a: float
@@ -32,6 +73,35 @@ class Operands(BaseModel):
 
 
 app = FastAPI()
+if settings.profile_enabled:
+    # set before any route is declared; innermost so logging and metrics aren't profiled
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(ProfilingMiddleware, output_dir=settings.profile_dir, sample_rate=settings.profile_sample_rate)
+
+
+def _idempotency_principal(scope) -> str | None:
+    """Token subject an Idempotency-Key belongs to; "" when unauthenticated, None if the token is bad."""
+    authorization = next((v for k, v in scope["headers"] if k == b"authorization"), None)
+    if authorization is None:
+        return ""
+    scheme, _, token = authorization.decode("latin-1").partition(" ")
+    payload = verify_token(token.strip()) if scheme.lower() == "bearer" else None
+    return payload["sub"] if payload and "sub" in payload else None
+
+
+# responses replayed for retried POSTs carrying an Idempotency-Key
+idempotency_store = TTLCache(maxsize=settings.idempotency_cache_size, ttl=settings.idempotency_ttl)
+if settings.idempotency_cache_size > 0:
+    app.add_middleware(
+        IdempotencyMiddleware,
+        store=idempotency_store,
+        paths=("/calculations", "/users/register"),
+        principal=_idempotency_principal,
+    )
+app.add_middleware(QueryStatsMiddleware, n_plus_one_threshold=settings.db_n_plus_one_threshold)
+app.add_middleware(AccessLogMiddleware)
+# added last so it is outermost and times the whole stack, access logging included
+app.add_middleware(MetricsMiddleware, registry=metrics_registry)
 
 # static files live in the package root `app/static`, not next to this module
 static_dir = Path(__file__).parent.parent / "static"
@@ -59,64 +129,122 @@ def debug_headers(request: Request):
 
 @app.on_event("startup")
 async def startup_event():
+    # tables are created lazily by get_db (see DB_AUTO_CREATE), so booting a
+    # worker or importing this module never touches the database
     logger.info("Starting FastAPI Calculator app")
-    # ensure database tables exist for simple development/testing
-    Base.metadata.create_all(bind=engine)
 
 
-# Ensure tables exist even if startup event isn't triggered (tests may import module)
-Base.metadata.create_all(bind=engine)
+# memoized results for the stateless arithmetic routes, keyed on operation
+# and operands (repr keeps 0.0 and -0.0 apart)
+result_cache = TTLCache(maxsize=settings.result_cache_size, ttl=settings.result_cache_ttl)
 
+_ARITHMETIC = {"add": add, "sub": sub, "mul": mul, "div": div}
 
-@app.middleware("http")
-async def log_requests(request: Request, call_next):
-    start = time.time()
-    logger.info("Incoming request %s %s", request.method, request.url)
-    try:
-        response = await call_next(request)
-    except Exception:
-        logger.exception("Unhandled exception during request")
-        raise
-    duration = time.time() - start
-    logger.info(
-        "Completed %s %s with status=%s in %.3fs",
-        request.method,
-        request.url,
-        response.status_code,
-        duration,
-    )
-    return response
+
+def _arithmetic(operation: str, a: float, b: float, request: Request, response: Response):
+    key = (operation, repr(a), repr(b))
+    etag = '"%s"' % hashlib.sha1(repr(key).encode()).hexdigest()
+    headers = {"ETag": etag, "Cache-Control": f"public, max-age={settings.result_cache_max_age}"}
+    if request.headers.get("if-none-match") == etag:
+        return Response(status_code=304, headers=headers)
+
+    body = result_cache.get(key)
+    if body is None:
+        body = {"operation": operation, "a": a, "b": b, "result": _ARITHMETIC[operation](a, b)}
+        result_cache.set(key, body)
+    response.headers.update(headers)
+    return body
 
 
 @app.get("/add")
-def route_add(a: float, b: float):
-    result = add(a, b)
-    return {"operation": "add", "a": a, "b": b, "result": result}
+async def route_add(a: float, b: float, request: Request, response: Response):
+    return _arithmetic("add", a, b, request, response)
 
 
 @app.get("/sub")
-def route_sub(a: float, b: float):
-    result = sub(a, b)
-    return {"operation": "sub", "a": a, "b": b, "result": result}
+async def route_sub(a: float, b: float, request: Request, response: Response):
+    return _arithmetic("sub", a, b, request, response)
 
 
 @app.get("/mul")
-def route_mul(a: float, b: float):
-    result = mul(a, b)
-    return {"operation": "mul", "a": a, "b": b, "result": result}
+async def route_mul(a: float, b: float, request: Request, response: Response):
+    return _arithmetic("mul", a, b, request, response)
 
 
 @app.get("/div")
-def route_div(a: float, b: float):
+async def route_div(a: float, b: float, request: Request, response: Response):
     try:
-        result = div(a, b)
+        return _arithmetic("div", a, b, request, response)
     except ZeroDivisionError as exc:
         logger.warning("Attempted division by zero: %s / %s", a, b)
         raise HTTPException(status_code=400, detail="division by zero") from exc
-    return {"operation": "div", "a": a, "b": b, "result": result}
+
+
+@app.get("/debug/cache")
+def debug_cache():
+    """Hit/miss/eviction counters of the in-process caches."""
+    return {
+        "result_cache": result_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "token_cache": token_cache.stats(),
+    }
+
+
+def _logging_metric_lines():
+    stats = logging_stats()
+    return [
+        "# TYPE calculator_log_queue_depth gauge",
+        f"calculator_log_queue_depth {stats['queue_depth']}",
+        "# TYPE calculator_log_dropped_total counter",
+        f"calculator_log_dropped_total {stats['dropped']}",
+    ]
+
+
+metrics_registry.register_collector(lambda: cache_metric_lines("calculator_result_cache", result_cache.stats()))
+metrics_registry.register_collector(
+    lambda: cache_metric_lines("calculator_principal_cache", principal_cache.stats())
+)
+metrics_registry.register_collector(lambda: cache_metric_lines("calculator_token_cache", token_cache.stats()))
+metrics_registry.register_collector(
+    lambda: cache_metric_lines("calculator_idempotency_cache", idempotency_store.stats())
+)
+
+
+def _password_pool_metric_lines():
+    stats = password_pool.stats()
+    lines = []
+    for field, kind in (("running", "gauge"), ("queued", "gauge"), ("completed", "counter"), ("rejected", "counter")):
+        metric = f"calculator_password_pool_{field}" + ("_total" if kind == "counter" else "")
+        lines += [f"# TYPE {metric} {kind}", f"{metric} {stats[field]}"]
+    return lines
+
+
+metrics_registry.register_collector(_password_pool_metric_lines)
+
+
+def _db_pool_metric_lines():
+    pools = {"sync": pool_status(engine.pool)}
+    async_engine = database.current_async_engine()
+    if async_engine is not None:
+        pools["async"] = pool_status(async_engine.pool)
+    return pool_metric_lines("calculator_db_pool", pools)
+
+
+metrics_registry.register_collector(_db_pool_metric_lines)
+metrics_registry.register_collector(
+    lambda: write_queue_metric_lines("calculator_write_queue", calculation_writer.stats()) if calculation_writer else []
+)
+metrics_registry.register_collector(_logging_metric_lines)
+
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def metrics():
+    """Prometheus text exposition of the in-process request metrics."""
+    return PlainTextResponse(metrics_registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 
 def get_db():
+    ensure_schema(engine)
     db = SessionLocal()
     try:
         yield db
@@ -124,14 +252,23 @@ def get_db():
         db.close()
 
 
-@app.post("/users/register", response_model=UserRead)
-def register_user(user: UserCreate, db: Session = Depends(get_db)):
-    """Register a new user.
+async def _hash_work(coro):
+    """Await password-pool work, turning a full queue into a 503."""
+    try:
+        return await coro
+    except HasherBusyError as exc:
+        raise HTTPException(status_code=503, detail="authentication busy, retry later", headers={"Retry-After": "1"}) from exc
 
-    Accepts a `UserCreate` payload, hashes the password and stores the user.
-    Returns a `UserRead` representation on success.
-    """
-    hashed = hash_password(user.password)
+
+def _find_user(db: Session, username: str):
+    user = db.query(models.User).filter(models.User.username == username).first()
+    # hand the connection back before the slow password check; close()
+    # detaches the loaded user without expiring its attributes
+    db.close()
+    return user
+
+
+def _store_user(db: Session, user: UserCreate, hashed: str) -> UserRead:
     db_user = models.User(username=user.username, email=user.email, password_hash=hashed)
     db.add(db_user)
     try:
@@ -144,28 +281,55 @@ def register_user(user: UserCreate, db: Session = Depends(get_db)):
     return UserRead.model_validate(db_user)
 
 
-@app.post("/users/token")
-def token(payload: LoginRequest, db: Session = Depends(get_db)):
-    db_user = db.query(models.User).filter(models.User.username == payload.username).first()
-    if not db_user or not verify_password(payload.password, db_user.password_hash):
+@app.post("/users/register", response_model=UserRead)
+async def register_user(user: UserCreate, db: Session = Depends(get_db)):
+    """Register a new user.
+
+    Accepts a `UserCreate` payload, hashes the password and stores the user.
+    Returns a `UserRead` representation on success. Hashing runs on the
+    password pool; the database work stays on the threadpool.
+    """
+    hashed = await _hash_work(password_pool.hash(user.password))
+    return await run_in_threadpool(_store_user, db, user, hashed)
+
+
+def _store_password_hash(db: Session, user_id: int, hashed: str) -> None:
+    db.query(models.User).filter(models.User.id == user_id).update({models.User.password_hash: hashed})
+    db.commit()
+    db.close()
+
+
+async def _authenticate(db: Session, payload: LoginRequest):
+    """Check credentials, transparently upgrading a stale password hash.
+
+    Hashes made with other rounds than the current configuration (see
+    `PASSWORD_HASH_ROUNDS` / `PASSWORD_HASH_TARGET_MS`) are replaced after a
+    successful login, so stored hashes follow the configured cost.
+    """
+    db_user = await run_in_threadpool(_find_user, db, payload.username)
+    if not db_user:
         raise HTTPException(status_code=401, detail="invalid credentials")
-    tok = create_token({"sub": db_user.username})
+    ok, new_hash = await _hash_work(password_pool.verify_and_update(payload.password, db_user.password_hash))
+    if not ok:
+        raise HTTPException(status_code=401, detail="invalid credentials")
+    if new_hash is not None:
+        await run_in_threadpool(_store_password_hash, db, db_user.id, new_hash)
+        db_user.password_hash = new_hash
+    return db_user
+
+
+@app.post("/users/token")
+async def token(payload: LoginRequest, db: Session = Depends(get_db)):
+    db_user = await _authenticate(db, payload)
+    tok = create_token({"sub": db_user.username, "uid": db_user.id})
     return {"access_token": tok, "token_type": "bearer"}
 
 
 bearer_scheme = HTTPBearer(auto_error=False)
 
 
-def get_current_user(
-    credentials: HTTPAuthorizationCredentials | None = Security(bearer_scheme),
-    authorization: str | None = Header(None, alias="Authorization"),
-    db: Session = Depends(get_db),
-):
-    """Resolve the current user from an HTTP Bearer token.
-
-    Uses `HTTPBearer` so OpenAPI will include a Bearer security scheme and
-    the Swagger UI will show an Authorize button.
-    """
+def _token_claims(credentials: HTTPAuthorizationCredentials | None, authorization: str | None) -> tuple[str, int | None]:
+    """Validate the bearer credentials and return the token's ``(sub, uid)``."""
     if credentials is None:
         # If an Authorization header was provided but HTTPBearer didn't
         # return credentials, it means the scheme wasn't a Bearer token.
@@ -178,69 +342,332 @@ def get_current_user(
     payload = verify_token(token)
     if not payload or "sub" not in payload:
         raise HTTPException(status_code=401, detail="invalid token")
-    user = db.query(models.User).filter(models.User.username == payload["sub"]).first()
+    user_id = payload.get("uid")
+    return payload["sub"], user_id if isinstance(user_id, int) else None
+
+
+def get_current_user(
+    credentials: HTTPAuthorizationCredentials | None = Security(bearer_scheme),
+    authorization: str | None = Header(None, alias="Authorization"),
+    db: Session = Depends(get_db),
+):
+    """Resolve the current user from an HTTP Bearer token.
+
+    Uses `HTTPBearer` so OpenAPI will include a Bearer security scheme and
+    the Swagger UI will show an Authorize button. Returns a cached
+    `Principal` rather than a `User` row, so most requests skip the lookup.
+    """
+    subject, user_id = _token_claims(credentials, authorization)
+    user = load_principal(db, subject, user_id)
     if not user:
         raise HTTPException(status_code=401, detail="invalid token")
     return user
 
 
+def calculation_values(data: CalculationCreate, user_id: int) -> dict:
+    """Column values for ``data``, with ``result`` computed here rather than read back."""
+    result = models.Calculation(a=data.a, b=data.b, type=data.type).compute_result(persist=False)
+    return {"a": data.a, "b": data.b, "type": data.type, "result": result, "user_id": user_id}
+
+
+# with DB_WRITE_COALESCE, POST /calculations inserts are group-committed
+calculation_writer = (
+    GroupCommitQueue(
+        SessionLocal,
+        models.Calculation,
+        convert=CalculationRead.model_validate,
+        batch_size=settings.db_write_batch_size,
+        flush_ms=settings.db_write_flush_ms,
+        max_depth=settings.db_write_queue_depth,
+    )
+    if settings.db_write_coalesce
+    else None
+)
+
+
+@app.on_event("shutdown")
+def flush_calculation_writer():
+    if calculation_writer is not None:
+        calculation_writer.shutdown()
+
+
+def _submit_calculation(values: dict):
+    """Queue ``values`` on ``calculation_writer``, turning a full queue into a 503."""
+    try:
+        return calculation_writer.submit(values)
+    except WriteQueueFullError as exc:
+        raise HTTPException(status_code=503, detail="too many pending writes, retry later", headers={"Retry-After": "1"}) from exc
+
+
+def _write_timeout(request: Request, future) -> HTTPException:
+    """The error for a queued calculation that did not commit within ``DB_WRITE_TIMEOUT``."""
+    if future.cancel():  # still queued, so it will never be written
+        return HTTPException(status_code=503, detail="too many pending writes, retry later", headers={"Retry-After": "1"})
+    # the row may still commit: a retry with the same Idempotency-Key gets it
+    defer_response(request.scope, future, lambda created: model_response(created, status_code=201))
+    return HTTPException(status_code=504, detail="calculation write timed out")
+
+
 @app.post("/calculations", response_model=CalculationRead, status_code=201)
-def create_calculation(data: CalculationCreate, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    calc = models.Calculation(a=data.a, b=data.b, type=data.type, user_id=current_user.id)
-    db.add(calc)
-    # compute and persist result
-    calc.compute_result(persist=True)
+def create_calculation(
+    request: Request,
+    data: CalculationCreate,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    values = calculation_values(data, current_user.id)
+    if calculation_writer is not None:
+        # don't hold a pooled connection while the writer thread needs one
+        db.close()
+        future = _submit_calculation(values)
+        try:
+            created = future.result(timeout=settings.db_write_timeout)
+        except FutureTimeoutError:
+            raise _write_timeout(request, future) from None
+        return model_response(created, status_code=201)
+    stmt = insert(models.Calculation).values(values).returning(models.Calculation)
+    # read the returned row before commit expires it (no refresh SELECT)
+    created = CalculationRead.model_validate(db.scalar(stmt))
     db.commit()
-    db.refresh(calc)
-    return CalculationRead.model_validate(calc)
+    return model_response(created, status_code=201)
+
+
+def _batch_rows(items: List[Any], user_id: int) -> tuple[list[dict], List[CalculationBatchError]]:
+    """Validate and compute a batch, returning insertable rows and per-item errors."""
+    if len(items) > MAX_BATCH_SIZE:
+        raise HTTPException(status_code=400, detail=f"batch too large (max {MAX_BATCH_SIZE} items)")
+
+    errors: List[CalculationBatchError] = []
+    valid: List[tuple[int, CalculationCreate]] = []
+    for index, item in enumerate(items):
+        if not isinstance(item, dict):
+            errors.append(CalculationBatchError(index=index, detail="item must be a JSON object"))
+            continue
+        try:
+            valid.append((index, CalculationCreate.model_validate(item)))
+        except ValidationError as exc:
+            detail = "; ".join(f"{'.'.join(map(str, err['loc']))}: {err['msg']}" for err in exc.errors())
+            errors.append(CalculationBatchError(index=index, detail=detail))
+
+    batch = compute_many([d.type for _, d in valid], [d.a for _, d in valid], [d.b for _, d in valid])
+    rows = []
+    for (index, data), result, zero in zip(valid, batch.results.tolist(), batch.zero_division.tolist()):
+        if zero:
+            errors.append(CalculationBatchError(index=index, detail="division by zero"))
+            continue
+        rows.append({"a": data.a, "b": data.b, "type": data.type, "result": result, "user_id": user_id})
+
+    return rows, errors
+
+
+@app.post("/calculations/batch", response_model=CalculationBatchResult)
+def create_calculations_batch(
+    items: List[Any] = Body(...),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Create many calculations in a single transaction.
+
+    Each item is validated as a `CalculationCreate`; invalid items are
+    reported in `errors` by their index instead of failing the whole batch.
+    Valid items are computed together and written with one bulk
+    INSERT ... RETURNING.
+    """
+    rows, errors = _batch_rows(items, current_user.id)
+
+    created: List[CalculationRead] = []
+    if rows:
+        stmt, ordered = insert_returning(models.Calculation, db.get_bind().dialect)
+        # read the returned rows before commit expires them (avoids a SELECT per row)
+        created = [CalculationRead.model_validate(c) for c in ordered(db.scalars(stmt, rows))]
+        db.commit()
+
+    errors.sort(key=lambda err: err.index)
+    return model_response(CalculationBatchResult(created=created, errors=errors))
+
+
+CALCULATION_FIELDS = tuple(CalculationRead.model_fields)
+
+
+def _encode_cursor(last_id: int) -> str:
+    raw = json.dumps({"v": 1, "after": last_id}, separators=(",", ":")).encode()
+    return base64.urlsafe_b64encode(raw).rstrip(b"=").decode("ascii")
+
+
+def _decode_cursor(cursor: str) -> int:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        after = json.loads(raw)["after"]
+    except (ValueError, KeyError, TypeError) as exc:
+        raise HTTPException(status_code=400, detail="invalid cursor") from exc
+    if not isinstance(after, int):
+        raise HTTPException(status_code=400, detail="invalid cursor")
+    return after
+
+
+def _parse_fields(fields: str | None) -> tuple[str, ...]:
+    if not fields:
+        return CALCULATION_FIELDS
+    requested = tuple(dict.fromkeys(f.strip() for f in fields.split(",") if f.strip()))
+    if not requested:
+        raise HTTPException(status_code=400, detail="fields must not be empty")
+    unknown = [f for f in requested if f not in CALCULATION_FIELDS]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"unknown fields: {', '.join(unknown)}")
+    return requested
+
+
+def list_calculations_stmt(user_id: int, after: int | None, limit: int, fields=CALCULATION_FIELDS):
+    """Keyset page of a user's calculations: ``WHERE user_id = ? AND id > ? ORDER BY id``.
+
+    ``id`` is always selected because it drives the cursor.
+    """
+    columns = [getattr(models.Calculation, f) for f in dict.fromkeys(("id",) + tuple(fields))]
+    stmt = select(*columns).where(models.Calculation.user_id == user_id)
+    if after is not None:
+        stmt = stmt.where(models.Calculation.id > after)
+    return stmt.order_by(models.Calculation.id).limit(limit)
 
 
 @app.get("/calculations", response_model=List[CalculationRead])
-def list_calculations(current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    items = db.query(models.Calculation).filter(models.Calculation.user_id == current_user.id).all()
-    return [CalculationRead.model_validate(i) for i in items]
+def list_calculations(
+    limit: int = Query(DEFAULT_PAGE_SIZE, ge=1, le=MAX_PAGE_SIZE),
+    cursor: str | None = None,
+    fields: str | None = None,
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """List the caller's calculations one keyset page at a time, oldest first.
+
+    When more rows exist, the opaque cursor for the next page is returned in
+    the `X-Next-Cursor` header (and a `Link: rel="next"` header); pass it
+    back as `cursor`. `fields` is an optional comma-separated projection such
+    as `fields=id,result`; only those columns are selected.
+    """
+    selected = _parse_fields(fields)
+    after = _decode_cursor(cursor) if cursor else None
+    # fetch one extra row to learn whether another page exists
+    rows = db.execute(list_calculations_stmt(current_user.id, after, limit + 1, selected)).all()
+    return _calculation_page(rows, limit, fields, selected)
+
+
+def _calculation_page(rows, limit: int, fields: str | None, selected: tuple[str, ...]) -> RawJSONResponse:
+    """Trim the ``limit + 1`` fetched rows to a page and attach the next cursor."""
+    headers = {}
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = _encode_cursor(rows[-1].id)
+        query = {"limit": limit, "cursor": next_cursor}
+        if fields:
+            query["fields"] = fields
+        next_url = f"/calculations?{urlencode(query)}"
+        headers = {"X-Next-Cursor": next_cursor, "Link": f'<{next_url}>; rel="next"'}
+
+    # partial objects don't fit CalculationRead, so projections skip validation
+    body = projection_json(rows, selected) if fields else calculation_rows_json(rows)
+    return RawJSONResponse(body, headers=headers)
+
+
+@app.get("/calculations/export")
+def export_calculations(
+    fmt: str = Query("ndjson", alias="format", pattern="^(ndjson|csv)$"),
+    current_user=Depends(get_current_user),
+):
+    """Stream the caller's full calculation history as NDJSON or CSV.
+
+    Rows are read through a server-side cursor and encoded chunk by chunk,
+    so memory use does not grow with the number of calculations.
+    """
+    return StreamingResponse(
+        iter_export(SessionLocal, current_user.id, fmt),
+        media_type=EXPORT_FORMATS[fmt],
+        headers={"Content-Disposition": f'attachment; filename="calculations.{fmt}"'},
+    )
+
+
+@app.get("/calculations/stats", response_model=CalculationStatsRead)
+def calculation_stats(
+    source: str = Query("summary", pattern="^(summary|live)$"),
+    current_user=Depends(get_current_user),
+    db: Session = Depends(get_db),
+):
+    """Per-type count, sum, min, max and mean of the caller's results.
+
+    ``summary`` (the default) reads the trigger-maintained
+    ``calculation_stats`` rows; ``live`` aggregates ``calculations`` with
+    ``GROUP BY``, at a cost proportional to the caller's history.
+    """
+    stmt = summary_stats_stmt if source == "summary" else live_stats_stmt
+    return CalculationStatsRead.from_rows(db.execute(stmt(current_user.id)))
+
+
+def owned_calculation_stmt(calc_id: int, user_id: int):
+    """One calculation by id, only if ``user_id`` owns it (primary key lookup)."""
+    return select(models.Calculation).where(models.Calculation.id == calc_id, models.Calculation.user_id == user_id)
 
 
 @app.get("/calculations/{calc_id}", response_model=CalculationRead)
 def get_calculation(calc_id: int, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    calc = db.query(models.Calculation).filter(models.Calculation.id == calc_id, models.Calculation.user_id == current_user.id).first()
+    calc = db.scalar(owned_calculation_stmt(calc_id, current_user.id))
     if not calc:
         raise HTTPException(status_code=404, detail="calculation not found")
-    return CalculationRead.model_validate(calc)
+    return model_response(CalculationRead.model_validate(calc))
+
+
+# Mutations are one ownership-scoped statement each. A missing row and
+# someone else's row both match nothing, so RETURNING comes back empty
+# (the DB-API rowcount is not reliable alongside RETURNING, e.g. on SQLite).
+def update_calculation_stmt(calc_id: int, user_id: int, values: dict):
+    """``UPDATE calculations ... WHERE id = ? AND user_id = ? RETURNING *``."""
+    return (
+        update(models.Calculation)
+        .where(models.Calculation.id == calc_id, models.Calculation.user_id == user_id)
+        .values(values)
+        .returning(models.Calculation)
+        .execution_options(synchronize_session=False)
+    )
+
+
+def delete_calculation_stmt(calc_id: int, user_id: int):
+    """``DELETE FROM calculations WHERE id = ? AND user_id = ? RETURNING id``."""
+    return (
+        delete(models.Calculation)
+        .where(models.Calculation.id == calc_id, models.Calculation.user_id == user_id)
+        .returning(models.Calculation.id)
+        .execution_options(synchronize_session=False)
+    )
 
 
 @app.put("/calculations/{calc_id}", response_model=CalculationRead)
 def update_calculation(calc_id: int, data: CalculationCreate, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    calc = db.query(models.Calculation).filter(models.Calculation.id == calc_id, models.Calculation.user_id == current_user.id).first()
-    if not calc:
+    calc = db.scalar(update_calculation_stmt(calc_id, current_user.id, calculation_values(data, current_user.id)))
+    if calc is None:
         raise HTTPException(status_code=404, detail="calculation not found")
-    calc.a = data.a
-    calc.b = data.b
-    calc.type = data.type
-    calc.compute_result(persist=True, force=True)
+    updated = CalculationRead.model_validate(calc)
     db.commit()
-    db.refresh(calc)
-    return CalculationRead.model_validate(calc)
+    return model_response(updated)
 
 
 @app.delete("/calculations/{calc_id}", status_code=204)
 def delete_calculation(calc_id: int, current_user=Depends(get_current_user), db: Session = Depends(get_db)):
-    calc = db.query(models.Calculation).filter(models.Calculation.id == calc_id, models.Calculation.user_id == current_user.id).first()
-    if not calc:
+    if db.scalar(delete_calculation_stmt(calc_id, current_user.id)) is None:
         raise HTTPException(status_code=404, detail="calculation not found")
-    db.delete(calc)
     db.commit()
     return
 
 
 @app.post("/users/login", response_model=UserRead)
-def login_user(payload: LoginRequest, db: Session = Depends(get_db)):
+async def login_user(payload: LoginRequest, db: Session = Depends(get_db)):
     """Authenticate a user by username and password.
 
     Returns `UserRead` on success, 401 otherwise.
     """
-    db_user = db.query(models.User).filter(models.User.username == payload.username).first()
-    if not db_user or not verify_password(payload.password, db_user.password_hash):
-        raise HTTPException(status_code=401, detail="invalid credentials")
-
+    db_user = await _authenticate(db, payload)
     return UserRead.model_validate(db_user)
+
+
+if settings.db_mode == "async":
+    # imported last: the async routes reuse the helpers defined above
+    from .async_routes import install as install_async_routes
+
+    install_async_routes(app)
@@ -0,0 +1,191 @@
+"""In-process request metrics rendered in the Prometheus text format.
+
+:class:`MetricsRegistry` keeps per-route latency histograms, response-size
+totals, status-code counters and in-flight gauges. It is fed by
+:class:`app.api.middleware.MetricsMiddleware` and rendered by the ``/metrics``
+route. Other components can contribute lines through
+:meth:`MetricsRegistry.register_collector` (e.g. cache counters).
+
+The registry is per process: with several uvicorn workers each one exposes
+its own counters, as usual for Prometheus client libraries.
+"""
+from __future__ import annotations
+
+import bisect
+from collections import defaultdict
+from typing import Callable, Iterable
+
+# latency bucket upper bounds in seconds
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+class Histogram:
+    """Fixed-bucket histogram of durations recorded in nanoseconds."""
+
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self._bounds_ns = [int(b * 1e9) for b in self.buckets]
+        # one slot per bucket plus the +Inf overflow slot
+        self.counts = [0] * (len(self.buckets) + 1)
+        self.sum_ns = 0
+        self.count = 0
+
+    def observe_ns(self, value_ns: int) -> None:
+        self.counts[bisect.bisect_left(self._bounds_ns, value_ns)] += 1
+        self.sum_ns += value_ns
+        self.count += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimate the ``q`` quantile in seconds (upper bound of its bucket)."""
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        seen = 0
+        for bound, count in zip(self.buckets, self.counts):
+            seen += count
+            if seen >= rank:
+                return bound
+        return float("inf")
+
+
+def _labels(**labels: object) -> str:
+    inner = ",".join('%s="%s"' % (k, str(v).replace("\\", "\\\\").replace('"', '\\"')) for k, v in labels.items())
+    return "{%s}" % inner
+
+
+def _fmt(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class MetricsRegistry:
+    def __init__(self, buckets: Iterable[float] = DEFAULT_BUCKETS):
+        self.buckets = tuple(buckets)
+        self.latency: dict[tuple[str, str], Histogram] = {}
+        self.response_bytes: dict[tuple[str, str], int] = defaultdict(int)
+        self.status_counts: dict[tuple[str, str, int], int] = defaultdict(int)
+        self.in_flight: dict[str, int] = defaultdict(int)
+        self._collectors: list[Callable[[], Iterable[str]]] = []
+
+    def observe(self, method: str, route: str, status: int, duration_ns: int, size: int) -> None:
+        key = (method, route)
+        hist = self.latency.get(key)
+        if hist is None:
+            hist = self.latency[key] = Histogram(self.buckets)
+        hist.observe_ns(duration_ns)
+        self.response_bytes[key] += size
+        self.status_counts[(method, route, status)] += 1
+
+    def register_collector(self, collector: Callable[[], Iterable[str]]) -> None:
+        """Add a callable returning extra exposition lines at scrape time."""
+        self._collectors.append(collector)
+
+    def reset(self) -> None:
+        self.latency.clear()
+        self.response_bytes.clear()
+        self.status_counts.clear()
+
+    def summary(self) -> dict[str, dict[str, float]]:
+        """p50/p99 latency in seconds and request count per ``"METHOD route"``."""
+        return {
+            f"{method} {route}": {"count": h.count, "p50": h.quantile(0.5), "p99": h.quantile(0.99)}
+            for (method, route), h in self.latency.items()
+        }
+
+    def render(self) -> str:
+        lines = [
+            "# HELP http_request_duration_seconds Request latency by route.",
+            "# TYPE http_request_duration_seconds histogram",
+        ]
+        for (method, route), hist in sorted(self.latency.items()):
+            cumulative = 0
+            for bound, count in zip(hist.buckets, hist.counts):
+                cumulative += count
+                lines.append(
+                    "http_request_duration_seconds_bucket%s %d"
+                    % (_labels(method=method, route=route, le=_fmt(bound)), cumulative)
+                )
+            labels = _labels(method=method, route=route)
+            lines.append(
+                "http_request_duration_seconds_bucket%s %d"
+                % (_labels(method=method, route=route, le="+Inf"), hist.count)
+            )
+            lines.append("http_request_duration_seconds_sum%s %s" % (labels, _fmt(hist.sum_ns / 1e9)))
+            lines.append("http_request_duration_seconds_count%s %d" % (labels, hist.count))
+
+        lines += [
+            "# HELP http_response_size_bytes Response body size by route.",
+            "# TYPE http_response_size_bytes summary",
+        ]
+        for (method, route), total in sorted(self.response_bytes.items()):
+            labels = _labels(method=method, route=route)
+            lines.append("http_response_size_bytes_sum%s %d" % (labels, total))
+            lines.append("http_response_size_bytes_count%s %d" % (labels, self.latency[(method, route)].count))
+
+        lines += ["# HELP http_requests_total Requests by route and status.", "# TYPE http_requests_total counter"]
+        for (method, route, status), count in sorted(self.status_counts.items()):
+            lines.append("http_requests_total%s %d" % (_labels(method=method, route=route, status=status), count))
+
+        lines += ["# HELP http_requests_in_flight Requests currently being served.", "# TYPE http_requests_in_flight gauge"]
+        for method, count in sorted(self.in_flight.items()):
+            lines.append("http_requests_in_flight%s %d" % (_labels(method=method), count))
+
+        for collector in self._collectors:
+            lines.extend(collector())
+        return "\n".join(lines) + "\n"
+
+
+def cache_metric_lines(name: str, stats: dict) -> list[str]:
+    """Expose a :meth:`app.core.cache.TTLCache.stats` dict as counters/gauges."""
+    lines = []
+    for field in ("hits", "misses", "evictions", "expirations"):
+        if field in stats:
+            metric = f"{name}_{field}_total"
+            lines += [f"# TYPE {metric} counter", f"{metric} {stats[field]}"]
+    lines += [f"# TYPE {name}_size gauge", f"{name}_size {stats['size']}"]
+    return lines
+
+
+def pool_metric_lines(name: str, pools: dict[str, dict]) -> list[str]:
+    """Expose :func:`app.core.pool.pool_status` dicts, labelled by engine."""
+    lines = []
+    for field, kind, suffix in (
+        ("size", "gauge", "size"),
+        ("checked_out", "gauge", "checked_out"),
+        ("overflow", "gauge", "overflow"),
+        ("checkouts", "counter", "checkouts_total"),
+        ("timeouts", "counter", "timeouts_total"),
+        ("wait_seconds", "counter", "checkout_wait_seconds_total"),
+        ("max_wait_seconds", "gauge", "checkout_wait_seconds_max"),
+    ):
+        metric = f"{name}_{suffix}"
+        values = [(engine, status[field]) for engine, status in sorted(pools.items()) if field in status]
+        if values:
+            lines.append(f"# TYPE {metric} {kind}")
+            lines += [f"{metric}{_labels(engine=engine)} {_fmt(value)}" for engine, value in values]
+    return lines
+
+
+def write_queue_metric_lines(name: str, stats: dict) -> list[str]:
+    """Expose a :meth:`app.core.writequeue.GroupCommitQueue.stats` dict."""
+    lines = []
+    for field, kind, suffix in (
+        ("depth", "gauge", "depth"),
+        ("max_depth", "gauge", "max_depth"),
+        ("batches", "counter", "batches_total"),
+        ("rows", "counter", "rows_total"),
+        ("failed", "counter", "failed_total"),
+        ("rejected", "counter", "rejected_total"),
+        ("max_batch", "gauge", "batch_size_max"),
+        ("flush_seconds", "counter", "flush_seconds_total"),
+        ("wait_seconds", "counter", "wait_seconds_total"),
+    ):
+        metric = f"{name}_{suffix}"
+        lines += [f"# TYPE {metric} {kind}", f"{metric} {_fmt(stats[field])}"]
+    return lines
+
+
+registry = MetricsRegistry()
@@ -0,0 +1,159 @@
+"""Pure ASGI middleware for access logging, request metrics and SQL accounting.
+
+The classes wrap the ASGI ``send`` callable directly instead of going
+through ``BaseHTTPMiddleware``, so they add no extra task or response
+streaming layer. Timings use the monotonic ``time.perf_counter_ns``.
+"""
+from __future__ import annotations
+
+import logging
+import time
+
+from ..core.querystats import track_queries
+from .metrics import MetricsRegistry
+
+access_logger = logging.getLogger("calculator.access")
+logger = logging.getLogger("calculator")
+
+UNMATCHED_ROUTE = "<unmatched>"
+
+
+def _target(scope) -> str:
+    query = scope.get("query_string", b"")
+    return scope["path"] + ("?" + query.decode("latin-1") if query else "")
+
+
+class AccessLogMiddleware:
+    """Log one line when a request arrives and one when it completes."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter_ns()
+        method, target = scope["method"], _target(scope)
+        status = 500
+        access_logger.info("Incoming request %s %s", method, target)
+
+        async def send_wrapper(message):
+            nonlocal status
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        except Exception:
+            logger.exception("Unhandled exception during request")
+            raise
+        access_logger.info(
+            "Completed %s %s with status=%s in %.3fs",
+            method,
+            target,
+            status,
+            (time.perf_counter_ns() - start) / 1e9,
+        )
+
+
+class MetricsMiddleware:
+    """Record latency, status, response size and in-flight count per route.
+
+    Requests are labelled with the route template (``/calculations/{calc_id}``)
+    rather than the raw path, so label cardinality stays bounded.
+    """
+
+    def __init__(self, app, registry: MetricsRegistry):
+        self.app = app
+        self.registry = registry
+        self._route_names: dict[object, str] = {}
+
+    def _route_name(self, scope) -> str:
+        route = scope.get("route")
+        if route is not None:
+            return route.path
+        endpoint = scope.get("endpoint")
+        if endpoint is None:
+            return UNMATCHED_ROUTE
+        try:
+            return self._route_names[endpoint]
+        except KeyError:
+            pass
+        name = UNMATCHED_ROUTE
+        for candidate in scope["app"].routes:
+            if getattr(candidate, "endpoint", None) is endpoint:
+                name = candidate.path
+                break
+            if getattr(candidate, "app", None) is endpoint:  # Mount
+                name = candidate.path + "/{path}"
+                break
+        self._route_names[endpoint] = name
+        return name
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start = time.perf_counter_ns()
+        method = scope["method"]
+        status = 500
+        size = 0
+        in_flight = self.registry.in_flight
+        in_flight[method] += 1
+
+        async def send_wrapper(message):
+            nonlocal status, size
+            if message["type"] == "http.response.start":
+                status = message["status"]
+            elif message["type"] == "http.response.body":
+                size += len(message.get("body", b""))
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            in_flight[method] -= 1
+            self.registry.observe(method, self._route_name(scope), status, time.perf_counter_ns() - start, size)
+
+
+class QueryStatsMiddleware:
+    """Count and time each request's SQL statements.
+
+    The totals go out in a ``Server-Timing: db;dur=...;desc="N queries"``
+    header (statements issued after the response has started, such as those
+    of a streamed export, are not included in it) and a statement repeated
+    ``n_plus_one_threshold`` times is logged as a likely N+1.
+    """
+
+    def __init__(self, app, n_plus_one_threshold: int = 0):
+        self.app = app
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        with track_queries() as stats:
+
+            async def send_wrapper(message):
+                if message["type"] == "http.response.start":
+                    headers = list(message.get("headers", []))
+                    headers.append((b"server-timing", stats.server_timing().encode("latin-1")))
+                    message["headers"] = headers
+                await send(message)
+
+            await self.app(scope, receive, send_wrapper)
+
+        for statement, times in stats.repeated(self.n_plus_one_threshold):
+            logger.warning(
+                "Possible N+1 in %s %s: statement executed %d times: %s",
+                scope["method"],
+                scope["path"],
+                times,
+                " ".join(statement.split()),
+            )
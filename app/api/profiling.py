@@ -0,0 +1,236 @@
+"""Opt-in per-request CPU profiling.
+
+With ``PROFILE_ENABLED=true`` ``app.api.main`` installs
+:class:`ProfilingMiddleware` and routes its sync endpoints through
+:class:`ProfiledRoute`; otherwise neither is installed and requests run
+exactly as without this module. A request is profiled when it sends
+``X-Profile: 1`` or is drawn by ``PROFILE_SAMPLE_RATE``.
+
+A profiled request gets one profiler, enabled on the event loop thread for
+the whole request (middleware, routing, async endpoints and dependencies).
+Before Python 3.12 cProfile only sees the thread that enabled it, so sync
+endpoints running on the threadpool get one more profiler each. From 3.12
+cProfile is built on ``sys.monitoring``, which covers every thread, so the
+loop profiler sees them already (and a second profiler could not be enabled
+while it runs). The statistics are merged and written to
+``PROFILE_DIR`` as ``<ms>-<METHOD>-<endpoint>-<request id>.pstats`` (open
+with ``python -m pstats`` or snakeviz) and ``.collapsed`` (one
+``frame;frame;frame microseconds`` line per call path, for flamegraph.pl or
+speedscope). The request id is taken from ``X-Request-ID`` when sent, and
+the file stem is returned in the ``X-Profile-Id`` response header.
+
+Only one request is profiled at a time; others arriving meanwhile run
+unprofiled. Other requests' code that runs on the event loop while a
+profiled request is awaiting is attributed to it as well (from 3.12, so is
+their threadpool work). If another profiler is already active, the request
+runs unprofiled.
+"""
+from __future__ import annotations
+
+import asyncio
+import contextvars
+import cProfile
+import functools
+import logging
+import pstats
+import random
+import re
+import sys
+import time
+import uuid
+from pathlib import Path
+
+from fastapi.concurrency import run_in_threadpool
+from fastapi.routing import APIRoute
+
+logger = logging.getLogger("calculator")
+
+PROFILE_HEADER = b"x-profile"
+REQUEST_ID_HEADER = b"x-request-id"
+_UNSAFE = re.compile(r"[^A-Za-z0-9_.-]+")
+# cProfile on sys.monitoring profiles all threads from one Profile
+PROCESS_WIDE_PROFILER = sys.version_info >= (3, 12)
+
+
+class RequestProfile:
+    """Profilers collected for one request, across the threads it ran on."""
+
+    def __init__(self):
+        self.loop_profiler = cProfile.Profile()
+        self.thread_profilers: list[cProfile.Profile] = []
+
+    def runcall(self, fn, *args, **kwargs):
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+        except ValueError:  # another profiler is active; run the call unprofiled
+            return fn(*args, **kwargs)
+        self.thread_profilers.append(profiler)
+        try:
+            return fn(*args, **kwargs)
+        finally:
+            profiler.disable()
+
+    def stats(self) -> pstats.Stats:
+        stats = pstats.Stats(self.loop_profiler)
+        for profiler in self.thread_profilers:
+            stats.add(profiler)
+        return stats
+
+
+_current: contextvars.ContextVar[RequestProfile | None] = contextvars.ContextVar("request_profile", default=None)
+
+
+def _frame_name(func: tuple) -> str:
+    filename, line, name = func
+    if filename == "~":  # builtins, e.g. "<built-in method time.sleep>"
+        return name.strip("<>")
+    return f"{Path(filename).stem}.{name}:{line}"
+
+
+def collapsed_stacks(stats: pstats.Stats, max_depth: int = 64, max_repeats: int = 2) -> list[str]:
+    """Approximate folded stacks (``a;b;c <self microseconds>``) from ``stats``.
+
+    cProfile records caller -> callee edges rather than whole stacks, so each
+    function's self time is split across its call paths in proportion to the
+    cumulative time spent on each edge (as flameprof does). A function may
+    appear ``max_repeats`` times on one path: the graph has cycles wherever a
+    function is re-entered, e.g. ``Context.run`` running a threadpool call
+    that the 3.12+ profiler records under the event loop's own
+    ``Context.run``.
+    """
+    entries = stats.stats  # func -> (cc, nc, tt, ct, callers)
+    children: dict[tuple, list[tuple[tuple, float]]] = {}
+    for func, (_, _, _, _, callers) in entries.items():
+        for caller, edge in callers.items():
+            children.setdefault(caller, []).append((func, edge[3]))
+    roots = [func for func, (_, _, _, _, callers) in entries.items() if not callers]
+    # parts of the graph only reachable through a cycle (frames that were
+    # already running when profiling began) get their busiest function as root
+    reached: set[tuple] = set()
+    pending = list(roots)
+    while True:
+        while pending:
+            func = pending.pop()
+            if func not in reached:
+                reached.add(func)
+                pending.extend(child for child, _ in children.get(func, ()))
+        rest = [func for func in entries if func not in reached]
+        if not rest:
+            break
+        root = max(rest, key=lambda func: (entries[func][3], _frame_name(func)))
+        roots.append(root)
+        pending.append(root)
+
+    folded: dict[str, float] = {}
+    leaf: dict[str, tuple] = {}
+
+    def walk(func: tuple, share: float, path: tuple[str, ...], funcs: tuple[tuple, ...]) -> None:
+        _, _, tt, ct, _ = entries[func]
+        if ct * share < 1e-6:  # the whole subtree would round to nothing
+            return
+        path = path + (_frame_name(func),)
+        key = ";".join(path)
+        folded[key] = folded.get(key, 0.0) + tt * share
+        leaf[key] = func
+        if len(path) >= max_depth:
+            return
+        funcs = funcs + (func,)
+        for child, edge_time in children.get(func, ()):
+            if funcs.count(child) < max_repeats:
+                # edge times of re-entered functions can exceed their total; cap the share
+                fraction = min(1.0, edge_time / entries[child][3]) if entries[child][3] else 0.0
+                walk(child, share * fraction, path, funcs)
+
+    for root in roots:
+        walk(root, 1.0, (), ())
+    # overlapping paths through cycles can hand out more than a function's
+    # self time; scale those functions back to what was measured
+    assigned: dict[tuple, float] = {}
+    for key, seconds in folded.items():
+        assigned[leaf[key]] = assigned.get(leaf[key], 0.0) + seconds
+    for key in folded:
+        tt = entries[leaf[key]][2]
+        if assigned[leaf[key]] > tt > 0:
+            folded[key] *= tt / assigned[leaf[key]]
+    return [f"{stack} {round(seconds * 1e6)}" for stack, seconds in sorted(folded.items()) if seconds * 1e6 >= 1]
+
+
+def _profiled_sync(endpoint):
+    @functools.wraps(endpoint)
+    def wrapper(*args, **kwargs):
+        profile = _current.get()
+        if profile is None:
+            return endpoint(*args, **kwargs)
+        return profile.runcall(endpoint, *args, **kwargs)
+
+    return wrapper
+
+
+class ProfiledRoute(APIRoute):
+    """APIRoute that profiles sync endpoints on the threadpool thread they run on."""
+
+    def __init__(self, path: str, endpoint, **kwargs):
+        if not PROCESS_WIDE_PROFILER and not asyncio.iscoroutinefunction(endpoint):
+            endpoint = _profiled_sync(endpoint)
+        super().__init__(path, endpoint, **kwargs)
+
+
+class ProfilingMiddleware:
+    """Profile selected requests and write their stats to ``output_dir``."""
+
+    def __init__(self, app, output_dir: str, sample_rate: float = 0.0):
+        self.app = app
+        self.output_dir = Path(output_dir)
+        self.sample_rate = sample_rate
+        self._active = False
+
+    def _wanted(self, scope) -> bool:
+        for name, value in scope["headers"]:
+            if name == PROFILE_HEADER:
+                return value.strip().lower() in (b"1", b"true", b"yes", b"on")
+        return self.sample_rate > 0 and random.random() < self.sample_rate
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or self._active or not self._wanted(scope):
+            await self.app(scope, receive, send)
+            return
+
+        headers = dict(scope["headers"])
+        request_id = _UNSAFE.sub("", headers.get(REQUEST_ID_HEADER, b"").decode("latin-1"))[:64] or uuid.uuid4().hex[:12]
+        stem = f"{time.time_ns() // 1_000_000}-{scope['method']}-{{endpoint}}-{request_id}"
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                endpoint = getattr(scope.get("endpoint"), "__name__", "unmatched")
+                message["headers"] = list(message.get("headers", [])) + [
+                    (b"x-profile-id", stem.format(endpoint=endpoint).encode("latin-1"))
+                ]
+            await send(message)
+
+        profile = RequestProfile()
+        try:
+            profile.loop_profiler.enable()
+        except ValueError:  # another profiler (e.g. a debugger or coverage tool) is active
+            await self.app(scope, receive, send)
+            return
+        token = _current.set(profile)
+        self._active = True
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            profile.loop_profiler.disable()
+            self._active = False
+            _current.reset(token)
+            endpoint = getattr(scope.get("endpoint"), "__name__", "unmatched")
+            # folding a large profile takes a while; keep it off the event loop
+            await run_in_threadpool(self._write, profile, stem.format(endpoint=endpoint))
+
+    def _write(self, profile: RequestProfile, stem: str) -> None:
+        try:
+            self.output_dir.mkdir(parents=True, exist_ok=True)
+            stats = profile.stats()
+            stats.dump_stats(self.output_dir / f"{stem}.pstats")
+            (self.output_dir / f"{stem}.collapsed").write_text("\n".join(collapsed_stacks(stats)) + "\n")
+        except Exception:  # a failed write must not fail the request
+            logger.exception("Failed to write request profile %s", stem)
@@ -0,0 +1,53 @@
+"""Pre-encoded JSON responses for the calculation routes.
+
+A handler that returns a pydantic model with ``response_model`` set has it
+validated twice (once in the handler, again by FastAPI against the response
+model), converted by ``jsonable_encoder`` and encoded by the stdlib ``json``
+module. The helpers here validate rows once with cached ``TypeAdapter``\\ s
+and let pydantic-core encode straight to bytes; handlers return the result as
+a :class:`RawJSONResponse`, which FastAPI sends as is. ``response_model``
+stays on the routes, so the OpenAPI schema is unchanged.
+"""
+from __future__ import annotations
+
+from typing import Sequence
+
+from fastapi.responses import Response
+from pydantic import BaseModel, TypeAdapter
+from pydantic_core import to_json
+
+from .schemas import CalculationRead
+
+calculation_list_adapter = TypeAdapter(list[CalculationRead])
+
+
+class RawJSONResponse(Response):
+    """A JSON response whose content is already encoded."""
+
+    media_type = "application/json"
+
+
+def model_response(model: BaseModel, status_code: int = 200, headers: dict | None = None) -> RawJSONResponse:
+    """Encode an already validated model without re-validating it."""
+    return RawJSONResponse(model.__pydantic_serializer__.to_json(model), status_code=status_code, headers=headers)
+
+
+def calculation_rows_json(rows: Sequence) -> bytes:
+    """Encode full calculation rows (``Row`` tuples) as a JSON array.
+
+    Rows are zipped into dicts, which validate much faster than
+    ``from_attributes`` lookups, and checked once by the cached adapter.
+    """
+    if not rows:
+        return b"[]"
+    keys = rows[0]._fields
+    items = calculation_list_adapter.validate_python([dict(zip(keys, row)) for row in rows])
+    return calculation_list_adapter.dump_json(items)
+
+
+def projection_json(rows: Sequence, fields: Sequence[str]) -> bytes:
+    """Encode only ``fields`` of each row; partial objects skip validation.
+
+    Non-finite floats become null, as ``CalculationRead`` serializes them.
+    """
+    return to_json([{f: getattr(row, f) for f in fields} for row in rows], inf_nan_mode="null")
@@ -58,3 +58,43 @@ class CalculationRead(BaseModel):
     result: float | None = None
     user_id: int | None = None
     model_config = ConfigDict(from_attributes=True)
+
+
+class CalculationBatchError(BaseModel):
+    index: int
+    detail: str
+
+
+class CalculationBatchResult(BaseModel):
+    created: list[CalculationRead]
+    errors: list[CalculationBatchError]
+
+
+class CalculationTypeStats(BaseModel):
+    type: CalcType
+    count: int
+    total: float
+    minimum: float | None = None
+    maximum: float | None = None
+    mean: float | None = None
+
+
+class CalculationStatsRead(BaseModel):
+    count: int
+    types: list[CalculationTypeStats]
+
+    @classmethod
+    def from_rows(cls, rows) -> "CalculationStatsRead":
+        """Build the response from ``app.core.stats`` rows (either source)."""
+        types = [
+            CalculationTypeStats(
+                type=r.type,
+                count=r.count,
+                total=r.total,
+                minimum=r.minimum,
+                maximum=r.maximum,
+                mean=r.total / r.count if r.count else None,
+            )
+            for r in rows
+        ]
+        return cls(count=sum(t.count for t in types), types=types)
@@ -1,3 +1,3 @@
 """Authentication helpers and security utilities."""
 
-__all__ = ["security"]
+__all__ = ["security", "principals"]
@@ -0,0 +1,34 @@
+"""Command-line helper to choose pbkdf2_sha256 rounds for this machine.
+
+Usage::
+
+    python -m app.auth.calibrate --target-ms 100
+
+Prints the rounds that make one hash take about the target latency, ready
+to be exported as ``PASSWORD_HASH_ROUNDS``. Setting
+``PASSWORD_HASH_TARGET_MS`` instead runs the same calibration at startup.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+
+from .security import PasswordHasher, calibrate_rounds
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--target-ms", type=float, default=100.0, help="per-hash latency budget in milliseconds")
+    args = parser.parse_args(argv)
+
+    rounds = calibrate_rounds(args.target_ms)
+    hasher = PasswordHasher(rounds=rounds)
+    start = time.perf_counter()
+    hasher.hash("calibration-check")
+    elapsed_ms = (time.perf_counter() - start) * 1000
+    print(f"PASSWORD_HASH_ROUNDS={rounds}  # measured {elapsed_ms:.1f} ms per hash (target {args.target_ms:g} ms)")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
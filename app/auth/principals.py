@@ -0,0 +1,94 @@
+"""Authenticated-user (principal) cache.
+
+``get_current_user`` used to load the ``User`` row on every authenticated
+request. Instead it now resolves a lightweight, immutable :class:`Principal`
+through :data:`principal_cache`, keyed by the token subject. Misses load the
+row by primary key when the token carries a ``uid`` claim and fall back to a
+username lookup for older tokens. A cached principal whose id differs from
+the token's ``uid`` (the username was deleted and registered again) counts as
+a miss. :func:`load_principal_async` does the same through an
+``AsyncSession``.
+
+Entries are dropped whenever the ORM updates or deletes the user (see the
+mapper listeners below) and otherwise expire after ``PRINCIPAL_CACHE_TTL``
+seconds, which bounds staleness for changes made by other processes or by
+bulk ``update()``/``delete()`` statements, which the mapper listeners never
+see. The app's only bulk statements on users change ``password_hash``, which
+a principal does not hold.
+"""
+from __future__ import annotations
+
+from dataclasses import dataclass
+from datetime import datetime
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session
+
+from ..config.settings import settings
+from ..core import models
+from ..core.cache import TTLCache
+
+
+@dataclass(frozen=True)
+class Principal:
+    id: int
+    username: str
+    email: str
+    created_at: datetime | None = None
+
+    @classmethod
+    def from_user(cls, user: models.User) -> "Principal":
+        return cls(id=user.id, username=user.username, email=user.email, created_at=user.created_at)
+
+
+principal_cache = TTLCache(maxsize=settings.principal_cache_size, ttl=settings.principal_cache_ttl)
+
+
+def _remember(subject: str, user: models.User | None, user_id: int | None) -> Principal | None:
+    # ids can be reused after a delete; the subject must still match
+    if user is None or (user_id is not None and user.username != subject):
+        return None
+    principal = Principal.from_user(user)
+    principal_cache.set(subject, principal)
+    return principal
+
+
+def _cached(subject: str, user_id: int | None) -> Principal | None:
+    principal = principal_cache.get(subject)
+    if principal is not None and user_id is not None and principal.id != user_id:
+        return None  # a token for an earlier user with the same username
+    return principal
+
+
+def load_principal(db: Session, subject: str, user_id: int | None = None) -> Principal | None:
+    """Return the principal for ``subject``, hitting the database only on a miss."""
+    principal = _cached(subject, user_id)
+    if principal is not None:
+        return principal
+    if user_id is not None:
+        user = db.get(models.User, user_id)
+    else:
+        user = db.query(models.User).filter(models.User.username == subject).first()
+    return _remember(subject, user, user_id)
+
+
+async def load_principal_async(db, subject: str, user_id: int | None = None) -> Principal | None:
+    """:func:`load_principal` for an ``AsyncSession``."""
+    principal = _cached(subject, user_id)
+    if principal is not None:
+        return principal
+    if user_id is not None:
+        user = await db.get(models.User, user_id)
+    else:
+        user = await db.scalar(select(models.User).where(models.User.username == subject).limit(1))
+    return _remember(subject, user, user_id)
+
+
+# bulk query.update()/delete() bypass these; see the module docstring
+@event.listens_for(models.User, "after_update")
+@event.listens_for(models.User, "after_delete")
+def _invalidate_principal(mapper, connection, target) -> None:  # pylint: disable=unused-argument
+    principal_cache.pop(target.username)
+    # a rename leaves the old subject behind as well
+    for old_username in inspect(target).attrs.username.history.deleted:
+        principal_cache.pop(old_username)
@@ -3,30 +3,63 @@
 Provides a small, object-oriented wrapper `PasswordHasher` and convenience
 module-level helpers `hash_password` and `verify_password` for ease of use in
 the rest of the application.
+
+`PasswordHashPool` runs the same work on a bounded worker pool (threads or
+processes) so async routes can await it without tying up the shared anyio
+threadpool; `password_pool` is the instance used by the auth routes.
+
+passlib and PyJWT are imported on first use rather than with this module,
+which keeps them off the application's import path.
 """
 from __future__ import annotations
 
-from passlib.context import CryptContext
+import asyncio
 import base64
 import hashlib
 import hmac
 import json
+import multiprocessing
 import os
+import threading
 import time
+from concurrent.futures import Executor, ProcessPoolExecutor, ThreadPoolExecutor
 from typing import Dict, Any
 
-import jwt
-from jwt import PyJWTError
+from ..config.settings import settings
+from ..core.cache import TTLCache
+
+
+# pbkdf2 hashes within this fraction of the configured rounds are not
+# rehashed, so small calibration differences between restarts are ignored
+ROUNDS_TOLERANCE = 0.25
 
 
 class PasswordHasher:
-    def __init__(self, schemes: list[str] | None = None, deprecated: str | None = None):
+    def __init__(self, schemes: list[str] | None = None, deprecated: str | None = None, rounds: int | None = None):
         if schemes is None:
             schemes = ["pbkdf2_sha256"]
-        if deprecated is None:
-            self._pwd_context = CryptContext(schemes=schemes)
-        else:
-            self._pwd_context = CryptContext(schemes=schemes, deprecated=deprecated)
+        # picklable description used to rebuild the hasher in pool workers
+        self.config = (tuple(schemes), deprecated, rounds)
+        self.rounds = rounds
+        self._context = None
+
+    @property
+    def _pwd_context(self):
+        if self._context is None:
+            from passlib.context import CryptContext
+
+            schemes, deprecated, rounds = self.config
+            options = {}
+            if deprecated is not None:
+                options["deprecated"] = deprecated
+            if rounds is not None:
+                # hashes outside the tolerance band are flagged by needs_update
+                scheme = schemes[0]
+                options[f"{scheme}__default_rounds"] = rounds
+                options[f"{scheme}__min_rounds"] = int(rounds * (1 - ROUNDS_TOLERANCE))
+                options[f"{scheme}__max_rounds"] = int(rounds * (1 + ROUNDS_TOLERANCE))
+            self._context = CryptContext(schemes=list(schemes), **options)
+        return self._context
 
     def hash(self, raw_password: str) -> str:
         return self._pwd_context.hash(raw_password)
@@ -34,8 +67,41 @@ class PasswordHasher:
     def verify(self, raw_password: str, hashed: str) -> bool:
         return self._pwd_context.verify(raw_password, hashed)
 
+    def needs_update(self, hashed: str) -> bool:
+        return self._pwd_context.needs_update(hashed)
+
+    def verify_and_update(self, raw_password: str, hashed: str) -> tuple[bool, str | None]:
+        """Verify and, when the stored hash is stale, return a replacement hash."""
+        return self._pwd_context.verify_and_update(raw_password, hashed)
+
+
+def calibrate_rounds(target_ms: float, sample_rounds: int = 10000, samples: int = 3) -> int:
+    """Pick pbkdf2_sha256 rounds so one hash takes about ``target_ms`` here.
+
+    Times a few hashes at ``sample_rounds`` and scales linearly (PBKDF2 cost
+    is proportional to its rounds), rounding to the nearest thousand.
+    """
+    from passlib.context import CryptContext
+
+    probe = CryptContext(schemes=["pbkdf2_sha256"], pbkdf2_sha256__default_rounds=sample_rounds)
+    best = float("inf")
+    for _ in range(samples):
+        start = time.perf_counter()
+        probe.hash("calibration-probe")
+        best = min(best, time.perf_counter() - start)
+    rounds = sample_rounds * (target_ms / 1000.0) / best
+    return max(1000, int(round(rounds, -3)))
+
+
+def _configured_rounds() -> int | None:
+    if settings.password_hash_rounds:
+        return settings.password_hash_rounds
+    if settings.password_hash_target_ms:
+        return calibrate_rounds(settings.password_hash_target_ms)
+    return None
+
 
-_default_hasher = PasswordHasher()
+_default_hasher = PasswordHasher(rounds=_configured_rounds())
 
 
 def hash_password(raw_password: str) -> str:
@@ -46,6 +112,133 @@ def verify_password(raw_password: str, hashed: str) -> bool:
     return _default_hasher.verify(raw_password, hashed)
 
 
+class HasherBusyError(RuntimeError):
+    """Raised when the password hash pool's queue is full."""
+
+
+# per-process hasher used by ProcessPoolExecutor workers
+_worker_hasher: PasswordHasher | None = None
+
+
+def _init_worker(config: tuple) -> None:
+    global _worker_hasher
+    schemes, deprecated, rounds = config
+    _worker_hasher = PasswordHasher(schemes=list(schemes), deprecated=deprecated, rounds=rounds)
+
+
+def _worker_verify(raw_password: str, hashed: str) -> bool:
+    return _worker_hasher.verify(raw_password, hashed)
+
+
+def _worker_verify_and_update(raw_password: str, hashed: str) -> tuple[bool, str | None]:
+    return _worker_hasher.verify_and_update(raw_password, hashed)
+
+
+def hash_process_pool(workers: int, hasher: PasswordHasher | None = None) -> ProcessPoolExecutor:
+    """Process pool whose workers hash like ``hasher`` (default: the app's).
+
+    Submit :func:`worker_hash` to it to hash passwords.
+    """
+    # spawn avoids forking a process that already runs threads
+    return ProcessPoolExecutor(
+        max_workers=workers,
+        mp_context=multiprocessing.get_context("spawn"),
+        initializer=_init_worker,
+        initargs=((hasher or _default_hasher).config,),
+    )
+
+
+def worker_hash(raw_password: str) -> str:
+    """Hash ``raw_password`` in a :func:`hash_process_pool` worker."""
+    return _worker_hasher.hash(raw_password)
+
+
+class PasswordHashPool:
+    """Bounded pool for PBKDF2 work, awaitable from async code.
+
+    ``kind="process"`` runs hashes in worker processes, so they neither hold
+    the GIL nor an anyio worker thread; ``kind="thread"`` uses a dedicated
+    thread pool. Either way at most ``workers`` hashes run at once and at
+    most ``max_queue`` may be pending; beyond that `HasherBusyError` is
+    raised so a login storm is shed at the auth endpoints instead of queueing
+    behind everything else. The executor is created on first use.
+    """
+
+    def __init__(self, hasher: PasswordHasher, workers: int = 2, kind: str = "thread", max_queue: int = 64):
+        if kind not in ("thread", "process"):
+            raise ValueError(f"unsupported pool kind: {kind!r}")
+        self.hasher = hasher
+        self.workers = max(1, workers)
+        self.kind = kind
+        self.max_queue = max_queue
+        self._executor: Executor | None = None
+        self._lock = threading.Lock()
+        self.pending = 0
+        self.completed = 0
+        self.rejected = 0
+
+    def _get_executor(self) -> Executor:
+        if self._executor is None:
+            if self.kind == "process":
+                self._executor = hash_process_pool(self.workers, self.hasher)
+            else:
+                self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="pwhash")
+        return self._executor
+
+    async def _run(self, fn, *args):
+        with self._lock:
+            if self.pending >= self.max_queue:
+                self.rejected += 1
+                raise HasherBusyError("password hashing queue is full")
+            self.pending += 1
+            executor = self._get_executor()
+        try:
+            return await asyncio.wrap_future(executor.submit(fn, *args))
+        finally:
+            with self._lock:
+                self.pending -= 1
+                self.completed += 1
+
+    async def hash(self, raw_password: str) -> str:
+        if self.kind == "process":
+            return await self._run(worker_hash, raw_password)
+        return await self._run(self.hasher.hash, raw_password)
+
+    async def verify(self, raw_password: str, hashed: str) -> bool:
+        if self.kind == "process":
+            return await self._run(_worker_verify, raw_password, hashed)
+        return await self._run(self.hasher.verify, raw_password, hashed)
+
+    async def verify_and_update(self, raw_password: str, hashed: str) -> tuple[bool, str | None]:
+        if self.kind == "process":
+            return await self._run(_worker_verify_and_update, raw_password, hashed)
+        return await self._run(self.hasher.verify_and_update, raw_password, hashed)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "running": min(self.pending, self.workers),
+            "queued": max(0, self.pending - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+    def shutdown(self) -> None:
+        with self._lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+
+password_pool = PasswordHashPool(
+    _default_hasher,
+    workers=settings.password_hash_workers,
+    kind=settings.password_hash_pool,
+    max_queue=settings.password_hash_max_queue,
+)
+
+
 # Minimal JWT-like functions (HMAC-SHA256, no external dependency)
 _JWT_SECRET = os.environ.get("SECRET_KEY", "dev-secret-change-me")
 
@@ -66,6 +259,8 @@ def create_token(payload: Dict[str, Any], secret: str | None = None, expire_seco
 
     The `secret` parameter is optional and overrides the environment `SECRET_KEY`.
     """
+    import jwt
+
     if secret is None:
         secret = _JWT_SECRET
     now = int(time.time())
@@ -75,12 +270,45 @@ def create_token(payload: Dict[str, Any], secret: str | None = None, expire_seco
     return token
 
 
-def verify_token(token: str, secret: str | None = None) -> Dict[str, Any] | None:
-    """Verify the JWT and return the payload or None on failure."""
-    if secret is None:
-        secret = _JWT_SECRET
+# Verified-token cache: sha256(token) -> decoded payload, each entry living
+# until the token's own `exp`. Only tokens checked against the default secret
+# are cached, and the cache is emptied when that secret changes.
+token_cache = TTLCache(maxsize=settings.token_cache_size)
+_token_cache_secret: str | None = None
+
+
+def _decode(token: str, secret: str) -> Dict[str, Any] | None:
+    import jwt
+
     try:
-        payload = jwt.decode(token, secret, algorithms=["HS256"])
-        return payload
-    except PyJWTError:
+        return jwt.decode(token, secret, algorithms=["HS256"])
+    except jwt.PyJWTError:
         return None
+
+
+def verify_token(token: str, secret: str | None = None) -> Dict[str, Any] | None:
+    """Verify the JWT and return the payload or None on failure.
+
+    Tokens verified with the default secret are remembered until they
+    expire, so repeat calls skip the HMAC check and JSON parsing. Failed
+    verifications are never cached.
+    """
+    if secret is not None:
+        return _decode(token, secret)
+
+    global _token_cache_secret
+    if _token_cache_secret != _JWT_SECRET:
+        token_cache.clear()
+        _token_cache_secret = _JWT_SECRET
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    payload = token_cache.get(key)
+    if payload is None:
+        payload = _decode(token, _JWT_SECRET)
+        if payload is None:
+            return None
+        exp = payload.get("exp")
+        ttl = exp - time.time() if isinstance(exp, (int, float)) else None
+        if ttl is None or ttl > 0:
+            token_cache.set(key, payload, ttl=ttl)
+    # callers get their own copy so the cached payload stays pristine
+    return dict(payload)
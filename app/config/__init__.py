@@ -1,3 +1,3 @@
 """Configuration package for application-level concerns (logging, settings)."""
 
-__all__ = ["logging_config"]
+__all__ = ["logging_config", "settings"]
@@ -4,24 +4,180 @@ Provides a single function, :func:`configure_logging`, that applies a
 stream-based handler and a consistent formatter to the ``calculator``
 logger. Importing this module will configure logging once. The function
 is idempotent and safe to call multiple times.
+
+Two pipelines are available:
+
+* ``sync`` (default): records are formatted and written to the stream on the
+  calling thread.
+* ``async``: the calling thread only enqueues the record on a bounded queue;
+  a :class:`logging.handlers.QueueListener` thread does the formatting and
+  I/O. When the queue is full the record is dropped and counted instead of
+  blocking the request.
+
+Output is either plain text or one JSON object per line, and high-volume
+loggers (``calculator.operations``, ``calculator.access``) can be sampled
+with per-logger rates. Warnings and errors are never sampled out.
 """
+import atexit
+import json
 import logging
+import logging.handlers
+import queue
+import random
 import sys
+from typing import IO, Mapping
+
+from .settings import settings
+
+TEXT_FORMAT = "%(asctime)s %(levelname)s [%(name)s] %(message)s"
+DATE_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+_listener: logging.handlers.QueueListener | None = None
+_queue_handler: "DroppingQueueHandler | None" = None
+
+
+class JsonFormatter(logging.Formatter):
+    """Render a record as a single-line JSON object."""
+
+    def format(self, record: logging.LogRecord) -> str:
+        payload = {
+            "ts": self.formatTime(record, DATE_FORMAT),
+            "level": record.levelname,
+            "logger": record.name,
+            "message": record.getMessage(),
+        }
+        if record.exc_info:
+            payload["exc_info"] = self.formatException(record.exc_info)
+        return json.dumps(payload, default=str)
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of records per logger name.
+
+    ``rates`` maps logger names to a keep probability in ``[0, 1]``; the most
+    specific (longest) matching name wins, and loggers without a rate are
+    always kept. Records at WARNING or above bypass sampling.
+    """
+
+    def __init__(self, rates: Mapping[str, float], rng: random.Random | None = None):
+        super().__init__()
+        # longest prefix first so "calculator.access" beats "calculator"
+        self.rates = sorted(rates.items(), key=lambda item: len(item[0]), reverse=True)
+        self._random = (rng or random.Random()).random
+
+    def rate_for(self, name: str) -> float:
+        for prefix, rate in self.rates:
+            if name == prefix or name.startswith(prefix + "."):
+                return rate
+        return 1.0
+
+    def filter(self, record: logging.LogRecord) -> bool:
+        if record.levelno >= logging.WARNING:
+            return True
+        rate = self.rate_for(record.name)
+        return rate >= 1.0 or self._random() < rate
+
 
+class DroppingQueueHandler(logging.handlers.QueueHandler):
+    """QueueHandler that never blocks: records are dropped when the queue is full."""
 
-def configure_logging(level: int = logging.INFO) -> None:
+    def __init__(self, log_queue: queue.Queue):
+        super().__init__(log_queue)
+        self.dropped = 0
+
+    def enqueue(self, record: logging.LogRecord) -> None:
+        try:
+            self.queue.put_nowait(record)
+        except queue.Full:
+            self.dropped += 1
+
+
+def parse_sample_rates(spec: str) -> dict[str, float]:
+    """Parse ``"calculator.access=0.1,calculator.operations=0.01"`` into a dict."""
+    rates = {}
+    for part in spec.split(","):
+        if not part.strip():
+            continue
+        name, _, rate = part.partition("=")
+        rates[name.strip()] = float(rate)
+    return rates
+
+
+def logging_stats() -> dict:
+    """Queue depth and drop counter of the async pipeline (zeros in sync mode)."""
+    if _queue_handler is None:
+        return {"mode": "sync", "queue_depth": 0, "dropped": 0}
+    return {
+        "mode": "async",
+        "queue_depth": _queue_handler.queue.qsize(),
+        "dropped": _queue_handler.dropped,
+    }
+
+
+def shutdown_logging() -> None:
+    """Flush and stop the async listener, if one is running."""
+    global _listener, _queue_handler
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+    _queue_handler = None
+
+
+def configure_logging(
+    level: int = logging.INFO,
+    mode: str | None = None,
+    fmt: str | None = None,
+    sample_rates: Mapping[str, float] | None = None,
+    queue_size: int | None = None,
+    stream: IO[str] | None = None,
+    force: bool = False,
+) -> None:
+    """Attach the app's handler to the ``calculator`` logger.
+
+    Arguments left as ``None`` fall back to the ``LOG_MODE``, ``LOG_FORMAT``,
+    ``LOG_SAMPLE_RATES`` and ``LOG_QUEUE_SIZE`` settings. Unless ``force`` is
+    set, nothing happens when the logger is already configured.
+    """
+    global _listener, _queue_handler
     root_logger = logging.getLogger("calculator")
-    if root_logger.handlers:
+    if root_logger.handlers and not force:
         return
 
-    handler = logging.StreamHandler(sys.stdout)
-    formatter = logging.Formatter(
-        "%(asctime)s %(levelname)s [%(name)s] %(message)s", datefmt="%Y-%m-%d %H:%M:%S"
-    )
+    mode = mode or settings.log_mode
+    fmt = fmt or settings.log_format
+    if sample_rates is None:
+        sample_rates = parse_sample_rates(settings.log_sample_rates)
+    if queue_size is None:
+        queue_size = settings.log_queue_size
+    if mode not in ("sync", "async"):
+        raise ValueError(f"unsupported logging mode: {mode!r}")
+    if fmt not in ("text", "json"):
+        raise ValueError(f"unsupported logging format: {fmt!r}")
+
+    shutdown_logging()
+    for existing in list(root_logger.handlers):
+        root_logger.removeHandler(existing)
+
+    handler = logging.StreamHandler(stream or sys.stdout)
+    if fmt == "json":
+        formatter = JsonFormatter()
+    else:
+        formatter = logging.Formatter(TEXT_FORMAT, datefmt=DATE_FORMAT)
     handler.setFormatter(formatter)
+
+    if mode == "async":
+        _queue_handler = DroppingQueueHandler(queue.Queue(maxsize=queue_size))
+        _listener = logging.handlers.QueueListener(_queue_handler.queue, handler, respect_handler_level=True)
+        _listener.start()
+        handler = _queue_handler
+
+    if sample_rates:
+        handler.addFilter(SamplingFilter(sample_rates))
     root_logger.addHandler(handler)
     root_logger.setLevel(level)
 
 
+atexit.register(shutdown_logging)
+
 # Configure at import time so modules importing calculator get logging configured
 configure_logging()
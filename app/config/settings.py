@@ -0,0 +1,153 @@
+"""Environment-driven application settings.
+
+Settings are read once from the environment when this module is imported and
+exposed as the module-level :data:`settings` instance. Tests that need other
+values can build their own :class:`Settings` or patch attributes on the
+consumers that read them.
+"""
+from __future__ import annotations
+
+import os
+from dataclasses import dataclass
+
+
+def _env_int(name: str, default: int) -> int:
+    value = os.getenv(name)
+    return default if value in (None, "") else int(value)
+
+
+def _env_float(name: str, default: float) -> float:
+    value = os.getenv(name)
+    return default if value in (None, "") else float(value)
+
+
+def _env_bool(name: str, default: bool) -> bool:
+    value = os.getenv(name)
+    return default if value in (None, "") else value.strip().lower() in ("1", "true", "yes", "on")
+
+
+def _env_str(name: str, default: str) -> str:
+    value = os.getenv(name)
+    return default if value in (None, "") else value
+
+
+@dataclass(frozen=True)
+class Settings:
+    # memoizing cache for the stateless /add, /sub, /mul, /div routes;
+    # a size of 0 disables it
+    result_cache_size: int = 1024
+    result_cache_ttl: float = 300.0
+    # max-age advertised in Cache-Control for those routes
+    result_cache_max_age: int = 86400
+    # logging pipeline: "sync" or "async" (queue + listener thread), "text" or
+    # "json" output, bounded queue size for async mode, and per-logger sample
+    # rates such as "calculator.access=0.1,calculator.operations=0.01"
+    log_mode: str = "sync"
+    log_format: str = "text"
+    log_queue_size: int = 10000
+    log_sample_rates: str = ""
+    # authenticated-user cache consulted by get_current_user; 0 disables it
+    principal_cache_size: int = 4096
+    principal_cache_ttl: float = 60.0
+    # verified-token cache in verify_token; entries expire with the token
+    token_cache_size: int = 4096
+    # bounded worker pool for PBKDF2 hashing in the auth routes: "thread" or
+    # "process", number of workers and max pending hashes before shedding
+    password_hash_pool: str = "thread"
+    password_hash_workers: int = 2
+    password_hash_max_queue: int = 64
+    # pbkdf2_sha256 cost: explicit rounds, or a per-hash latency budget in ms
+    # to calibrate rounds against at startup (0 = passlib's default rounds)
+    password_hash_rounds: int = 0
+    password_hash_target_ms: float = 0.0
+    # "sync" serves the user and calculation routes from SessionLocal on the
+    # threadpool; "async" swaps in the AsyncSession versions (aiosqlite or
+    # asyncpg, derived from DATABASE_URL)
+    db_mode: str = "sync"
+    # create missing tables on first database use; deployments that manage the
+    # schema with `alembic upgrade head` should turn this off
+    db_auto_create: bool = True
+    # connection pool for file-backed databases: persistent connections, extra
+    # connections allowed under load, seconds to wait for one before failing,
+    # liveness check on checkout and max connection age in seconds (-1 = never)
+    db_pool_size: int = 5
+    db_max_overflow: int = 10
+    db_pool_timeout: float = 30.0
+    db_pool_pre_ping: bool = False
+    db_pool_recycle: int = -1
+    # PRAGMAs applied to every new SQLite connection (SQLite's own defaults
+    # are journal_mode=delete and synchronous=full; mmap size 0 disables mmap)
+    sqlite_journal_mode: str = "wal"
+    sqlite_synchronous: str = "normal"
+    sqlite_busy_timeout_ms: int = 5000
+    sqlite_mmap_size: int = 256 * 1024 * 1024
+    # SQL statements slower than this are logged to calculator.sql (0 = off);
+    # a statement repeated this many times in one request is logged as a
+    # likely N+1 (0 = off)
+    db_slow_query_ms: float = 100.0
+    db_n_plus_one_threshold: int = 5
+    # group commit for POST /calculations (see app.core.writequeue): off by
+    # default; when on, inserts are collected for up to flush_ms or
+    # batch_size rows and committed together, with at most queue_depth
+    # waiting and requests giving up after timeout seconds
+    db_write_coalesce: bool = False
+    db_write_flush_ms: float = 2.0
+    db_write_batch_size: int = 100
+    db_write_queue_depth: int = 1000
+    db_write_timeout: float = 30.0
+    # responses stored for replay by Idempotency-Key (see
+    # app.api.idempotency): max entries (0 = off) and seconds kept
+    idempotency_cache_size: int = 10000
+    idempotency_ttl: float = 86400.0
+    # per-request cProfile capture (see app.api.profiling): off unless
+    # enabled; then requests sending "X-Profile: 1", plus a random fraction
+    # of all requests, are profiled into profile_dir
+    profile_enabled: bool = False
+    profile_sample_rate: float = 0.0
+    profile_dir: str = "profiles"
+
+    @classmethod
+    def from_env(cls) -> "Settings":
+        return cls(
+            result_cache_size=_env_int("RESULT_CACHE_SIZE", cls.result_cache_size),
+            result_cache_ttl=_env_float("RESULT_CACHE_TTL", cls.result_cache_ttl),
+            result_cache_max_age=_env_int("RESULT_CACHE_MAX_AGE", cls.result_cache_max_age),
+            log_mode=_env_str("LOG_MODE", cls.log_mode),
+            log_format=_env_str("LOG_FORMAT", cls.log_format),
+            log_queue_size=_env_int("LOG_QUEUE_SIZE", cls.log_queue_size),
+            log_sample_rates=_env_str("LOG_SAMPLE_RATES", cls.log_sample_rates),
+            principal_cache_size=_env_int("PRINCIPAL_CACHE_SIZE", cls.principal_cache_size),
+            principal_cache_ttl=_env_float("PRINCIPAL_CACHE_TTL", cls.principal_cache_ttl),
+            token_cache_size=_env_int("TOKEN_CACHE_SIZE", cls.token_cache_size),
+            password_hash_pool=_env_str("PASSWORD_HASH_POOL", cls.password_hash_pool),
+            password_hash_workers=_env_int("PASSWORD_HASH_WORKERS", cls.password_hash_workers),
+            password_hash_max_queue=_env_int("PASSWORD_HASH_MAX_QUEUE", cls.password_hash_max_queue),
+            password_hash_rounds=_env_int("PASSWORD_HASH_ROUNDS", cls.password_hash_rounds),
+            password_hash_target_ms=_env_float("PASSWORD_HASH_TARGET_MS", cls.password_hash_target_ms),
+            db_mode=_env_str("DB_MODE", cls.db_mode),
+            db_auto_create=_env_bool("DB_AUTO_CREATE", cls.db_auto_create),
+            db_pool_size=_env_int("DB_POOL_SIZE", cls.db_pool_size),
+            db_max_overflow=_env_int("DB_MAX_OVERFLOW", cls.db_max_overflow),
+            db_pool_timeout=_env_float("DB_POOL_TIMEOUT", cls.db_pool_timeout),
+            db_pool_pre_ping=_env_bool("DB_POOL_PRE_PING", cls.db_pool_pre_ping),
+            db_pool_recycle=_env_int("DB_POOL_RECYCLE", cls.db_pool_recycle),
+            sqlite_journal_mode=_env_str("SQLITE_JOURNAL_MODE", cls.sqlite_journal_mode),
+            sqlite_synchronous=_env_str("SQLITE_SYNCHRONOUS", cls.sqlite_synchronous),
+            sqlite_busy_timeout_ms=_env_int("SQLITE_BUSY_TIMEOUT_MS", cls.sqlite_busy_timeout_ms),
+            sqlite_mmap_size=_env_int("SQLITE_MMAP_SIZE", cls.sqlite_mmap_size),
+            db_slow_query_ms=_env_float("DB_SLOW_QUERY_MS", cls.db_slow_query_ms),
+            db_n_plus_one_threshold=_env_int("DB_N_PLUS_ONE_THRESHOLD", cls.db_n_plus_one_threshold),
+            db_write_coalesce=_env_bool("DB_WRITE_COALESCE", cls.db_write_coalesce),
+            db_write_flush_ms=_env_float("DB_WRITE_FLUSH_MS", cls.db_write_flush_ms),
+            db_write_batch_size=_env_int("DB_WRITE_BATCH_SIZE", cls.db_write_batch_size),
+            db_write_queue_depth=_env_int("DB_WRITE_QUEUE_DEPTH", cls.db_write_queue_depth),
+            db_write_timeout=_env_float("DB_WRITE_TIMEOUT", cls.db_write_timeout),
+            idempotency_cache_size=_env_int("IDEMPOTENCY_CACHE_SIZE", cls.idempotency_cache_size),
+            idempotency_ttl=_env_float("IDEMPOTENCY_TTL", cls.idempotency_ttl),
+            profile_enabled=_env_bool("PROFILE_ENABLED", cls.profile_enabled),
+            profile_sample_rate=_env_float("PROFILE_SAMPLE_RATE", cls.profile_sample_rate),
+            profile_dir=_env_str("PROFILE_DIR", cls.profile_dir),
+        )
+
+
+settings = Settings.from_env()
@@ -6,4 +6,10 @@ __all__ = [
     "database",
     "models",
     "factory",
+    "cache",
+    "pool",
+    "querystats",
+    "stats",
+    "writequeue",
+    "bulk",
 ]
@@ -0,0 +1,26 @@
+"""Multi-row ``INSERT ... RETURNING`` with each returned row matched to its parameters.
+
+SQLAlchemy batches an executemany ``INSERT ... RETURNING`` into multi-row
+statements ("insertmanyvalues"), and the database may return their rows in
+any order. :func:`insert_returning` pairs them back up:
+
+* On dialects that can sort the returned rows cheaply (Postgres, via an
+  autoincrement sentinel), it asks for ``sort_by_parameter_order=True``.
+* Elsewhere (SQLite), that option would fall back to one statement per row.
+  Instead the rows are sorted by id. This relies on ids being assigned in
+  VALUES order, and on the batches running one after another inside a
+  transaction that holds SQLite's single write lock.
+"""
+from __future__ import annotations
+
+from typing import Any, Callable, Iterable
+
+from sqlalchemy import insert
+from sqlalchemy.sql.compiler import InsertmanyvaluesSentinelOpts
+
+
+def insert_returning(model, dialect) -> tuple[Any, Callable[[Iterable], list]]:
+    """``(stmt, ordered)``: ``ordered(db.scalars(stmt, rows))`` lists the new objects in ``rows`` order."""
+    if dialect.insertmanyvalues_implicit_sentinel & InsertmanyvaluesSentinelOpts.ANY_AUTOINCREMENT:
+        return insert(model).returning(model, sort_by_parameter_order=True), list
+    return insert(model).returning(model), lambda created: sorted(created, key=lambda obj: obj.id)
@@ -2,24 +2,180 @@
 
 This module reads `DATABASE_URL` from the environment when present so the
 application can use Postgres in Docker/CI and SQLite locally as a fallback.
+
+`get_async_sessionmaker` is the asyncio counterpart used when `DB_MODE=async`:
+the same database through aiosqlite or asyncpg. Its engine is created on
+first use, so the async drivers are only imported when that mode is enabled.
+
+Nothing here touches the database at import time. With `DB_AUTO_CREATE`
+(the default) missing tables are created once per process by
+`ensure_schema` on first use; otherwise the schema is managed with the
+Alembic migrations in `alembic/`.
+
+Pool sizing (`DB_POOL_*`) and the SQLite PRAGMAs (`SQLITE_*`) come from
+:mod:`app.config.settings`; both engines use the instrumented pools from
+:mod:`app.core.pool` so checkout waits and timeouts show up on `/metrics`,
+and both are timed statement by statement by :mod:`app.core.querystats`.
 """
 
+import asyncio
 import os
+import threading
+import weakref
 
-from sqlalchemy import create_engine
+from sqlalchemy import create_engine, event, text
+from sqlalchemy.engine import make_url
 from sqlalchemy.orm import sessionmaker
 from sqlalchemy.ext.declarative import declarative_base
 
+from ..config.settings import settings
+from .pool import InstrumentedAsyncAdaptedQueuePool, InstrumentedQueuePool
+from .querystats import instrument_engine
+
 # Prefer DATABASE_URL from environment (used in Docker/CI). Fall back to
 # a local SQLite file for development and tests that don't set DATABASE_URL.
 SQLALCHEMY_DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./test.db")
 
-if SQLALCHEMY_DATABASE_URL.startswith("sqlite"):
-    engine = create_engine(SQLALCHEMY_DATABASE_URL, connect_args={"check_same_thread": False})
-else:
-    engine = create_engine(SQLALCHEMY_DATABASE_URL)
+
+def sqlite_pragmas() -> list[str]:
+    """PRAGMA statements run on each new SQLite connection."""
+    pragmas = []
+    if settings.sqlite_journal_mode:
+        pragmas.append(f"PRAGMA journal_mode={settings.sqlite_journal_mode}")
+    if settings.sqlite_synchronous:
+        pragmas.append(f"PRAGMA synchronous={settings.sqlite_synchronous}")
+    pragmas.append(f"PRAGMA busy_timeout={int(settings.sqlite_busy_timeout_ms)}")
+    pragmas.append(f"PRAGMA mmap_size={int(settings.sqlite_mmap_size)}")
+    return pragmas
+
+
+def _apply_sqlite_pragmas(dbapi_connection, connection_record) -> None:  # pylint: disable=unused-argument
+    cursor = dbapi_connection.cursor()
+    try:
+        for pragma in sqlite_pragmas():
+            cursor.execute(pragma)
+    finally:
+        cursor.close()
+
+
+def engine_options(url: str, poolclass) -> dict:
+    """Keyword arguments for ``create_engine`` built from the pool settings.
+
+    In-memory SQLite keeps SQLAlchemy's single-connection pool, since every
+    new connection would see an empty database.
+    """
+    parsed = make_url(url)
+    options = {"pool_pre_ping": settings.db_pool_pre_ping, "pool_recycle": settings.db_pool_recycle}
+    if parsed.get_backend_name() == "sqlite":
+        options["connect_args"] = {"check_same_thread": False}
+        if parsed.database in (None, "", ":memory:"):
+            return options
+    options.update(
+        poolclass=poolclass,
+        pool_size=settings.db_pool_size,
+        max_overflow=settings.db_max_overflow,
+        pool_timeout=settings.db_pool_timeout,
+    )
+    return options
+
+
+engine = create_engine(SQLALCHEMY_DATABASE_URL, **engine_options(SQLALCHEMY_DATABASE_URL, InstrumentedQueuePool))
+if engine.dialect.name == "sqlite":
+    event.listen(engine, "connect", _apply_sqlite_pragmas)
+instrument_engine(engine)
 
 # SessionLocal is a factory used by the application to create sessions.
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)  # pylint: disable=invalid-name
 
 Base = declarative_base()
+
+_schema_ready = False
+_schema_lock = threading.Lock()
+# one per event loop: an asyncio.Lock cannot be shared between loops
+_async_schema_locks: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+def _create_schema(connection) -> None:
+    from . import models
+
+    # models.Base is the Base the tables were declared on
+    models.Base.metadata.create_all(bind=connection)
+    # create_all skips existing tables together with their indexes; bring
+    # the indexes of a database created by an older version up to date
+    for table in models.Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(connection, checkfirst=True)
+    for name in models.Calculation.replaced_indexes:
+        connection.execute(text(f"DROP INDEX IF EXISTS {name}"))
+
+
+def ensure_schema(bind=None) -> None:
+    """Create missing tables and indexes on ``bind`` (default `engine`), once per process."""
+    global _schema_ready  # pylint: disable=global-statement
+    if _schema_ready or not settings.db_auto_create:
+        return
+    with _schema_lock:
+        if not _schema_ready:
+            with (bind if bind is not None else engine).begin() as conn:
+                _create_schema(conn)
+            _schema_ready = True
+
+
+async def ensure_schema_async(async_engine) -> None:
+    """`ensure_schema` through an async engine."""
+    global _schema_ready  # pylint: disable=global-statement
+    if _schema_ready or not settings.db_auto_create:
+        return
+    lock = _async_schema_locks.setdefault(asyncio.get_running_loop(), asyncio.Lock())
+    async with lock:
+        if not _schema_ready:
+            async with async_engine.begin() as conn:
+                await conn.run_sync(_create_schema)
+            _schema_ready = True
+
+
+# sync driver -> asyncio driver for the same database
+_ASYNC_DRIVERS = {"sqlite": "sqlite+aiosqlite", "postgresql": "postgresql+asyncpg"}
+
+_async_sessionmaker = None
+
+
+def async_database_url(url: str) -> str:
+    """Return ``url`` rewritten to use the asyncio driver for its backend."""
+    parsed = make_url(url)
+    backend = parsed.get_backend_name()
+    if backend not in _ASYNC_DRIVERS:
+        raise ValueError(f"no async driver configured for {backend!r}")
+    return parsed.set(drivername=_ASYNC_DRIVERS[backend]).render_as_string(hide_password=False)
+
+
+def get_async_sessionmaker():
+    """Return the lazily created ``async_sessionmaker`` for `DATABASE_URL`."""
+    global _async_sessionmaker  # pylint: disable=global-statement
+    if _async_sessionmaker is None:
+        # imported here so sync-only deployments never load the asyncio extension
+        from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+        url = async_database_url(SQLALCHEMY_DATABASE_URL)
+        options = engine_options(url, InstrumentedAsyncAdaptedQueuePool)
+        options.pop("connect_args", None)  # aiosqlite connections are not thread-bound
+        async_engine = create_async_engine(url, **options)
+        if async_engine.dialect.name == "sqlite":
+            event.listen(async_engine.sync_engine, "connect", _apply_sqlite_pragmas)
+        instrument_engine(async_engine.sync_engine)
+        # objects stay readable after commit without an implicit (awaitable) refresh
+        _async_sessionmaker = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    return _async_sessionmaker
+
+
+def current_async_engine():
+    """The async engine if `get_async_sessionmaker` has created it, else None."""
+    return None if _async_sessionmaker is None else _async_sessionmaker.kw["bind"]
+
+
+async def dispose_async_engine() -> None:
+    """Close the async engine's pooled connections, if it was ever created."""
+    global _async_sessionmaker  # pylint: disable=global-statement
+    if _async_sessionmaker is not None:
+        maker, _async_sessionmaker = _async_sessionmaker, None
+        await maker.kw["bind"].dispose()
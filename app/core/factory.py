@@ -1,7 +1,10 @@
 """Factory module providing operation objects for calculations."""
 from __future__ import annotations
 
-from typing import Protocol, runtime_checkable
+from typing import TYPE_CHECKING, NamedTuple, Protocol, Sequence, runtime_checkable
+
+if TYPE_CHECKING:
+    import numpy as np
 
 
 @runtime_checkable
@@ -39,10 +42,73 @@ class CalculationFactory:
         "multiply": MultiplyOperation,
         "divide": DivideOperation,
     }
+    # operations are stateless, so a single shared instance per type is enough
+    _instances: dict[str, Operation] = {}
 
     def get(self, calc_type: str) -> Operation:
+        try:
+            return self._instances[calc_type]
+        except KeyError:
+            pass
         try:
             cls = self._mapping[calc_type]
         except KeyError as exc:
             raise ValueError(f"unsupported calculation type: {calc_type!r}") from exc
-        return cls()
+        op = self._instances[calc_type] = cls()
+        return op
+
+
+class BatchResult(NamedTuple):
+    """Column-wise output of :func:`compute_many`.
+
+    ``results`` holds one float per input row (``nan`` where the row could not
+    be computed) and ``zero_division`` flags the rows that divided by zero.
+    """
+
+    results: np.ndarray
+    zero_division: np.ndarray
+
+
+# calculation types double as the names of their NumPy ufuncs
+_TYPE_NAMES = ("add", "subtract", "multiply", "divide")
+_TYPE_CODES = {name: code for code, name in enumerate(_TYPE_NAMES)}
+
+
+def compute_many(types: Sequence[str], a: Sequence[float], b: Sequence[float]) -> BatchResult:
+    """Evaluate many calculations at once, grouped by operation type.
+
+    Each distinct type is evaluated over its whole column with a single NumPy
+    ufunc call instead of one operation object per row. Division by zero does
+    not raise; the affected rows are reported through ``zero_division`` and
+    their result is ``nan``. Unknown types raise ``ValueError`` like
+    :meth:`CalculationFactory.get`.
+    """
+    # numpy is only needed for batches, so keep it out of application start-up
+    import numpy as np
+
+    a_arr = np.asarray(a, dtype=np.float64)
+    b_arr = np.asarray(b, dtype=np.float64)
+    if a_arr.ndim != 1 or a_arr.shape != b_arr.shape or len(types) != len(a_arr):
+        raise ValueError("types, a and b must be one-dimensional and of equal length")
+
+    results = np.full(a_arr.shape, np.nan, dtype=np.float64)
+    zero_division = np.zeros(a_arr.shape, dtype=bool)
+    try:
+        codes = np.fromiter((_TYPE_CODES[t] for t in types), dtype=np.int8, count=len(a_arr))
+    except KeyError as exc:
+        raise ValueError(f"unsupported calculation type: {exc.args[0]!r}") from exc
+
+    for code in np.unique(codes).tolist():
+        calc_type = _TYPE_NAMES[code]
+        rows = np.flatnonzero(codes == code)
+        col_a = a_arr[rows]
+        col_b = b_arr[rows]
+        if calc_type == "divide":
+            zero = col_b == 0
+            zero_division[rows] = zero
+            out = np.full(rows.shape, np.nan, dtype=np.float64)
+            np.divide(col_a, col_b, out=out, where=~zero)
+            results[rows] = out
+        else:
+            results[rows] = getattr(np, calc_type)(col_a, col_b)
+    return BatchResult(results, zero_division)
@@ -1,10 +1,15 @@
 """SQLAlchemy models for the application."""
 
-from sqlalchemy import Column, Integer, String, DateTime, func
-from sqlalchemy import Float, ForeignKey
+from typing import Sequence
+
+from sqlalchemy import DDL, Column, Integer, String, DateTime, event, func, text
+from sqlalchemy import Float, ForeignKey, Index
 from sqlalchemy.orm import relationship
 
 from .database import Base
+from .factory import BatchResult, CalculationFactory, compute_many
+
+_factory = CalculationFactory()
 
 
 class User(Base):
@@ -38,22 +43,26 @@ class User(Base):
 
 class Calculation(Base):
     __tablename__ = "calculations"
-
-    id = Column(Integer, primary_key=True, index=True)
+    # Every route reads a user's rows by id: single rows by (id, user_id) via
+    # the primary key, pages and exports by user_id ordered by id. The one
+    # composite index serves the latter without a sort; see
+    # tests/integration/test_query_plans.py.
+    __table_args__ = (Index("ix_calculations_user_id_id", "user_id", "id"),)
+    # the single-column indexes it replaced (migration 0002); ensure_schema
+    # drops them from databases created before then
+    replaced_indexes = ("ix_calculations_id", "ix_calculations_type", "ix_calculations_user_id")
+
+    id = Column(Integer, primary_key=True)
     a = Column(Float, nullable=False)
     b = Column(Float, nullable=False)
-    type = Column(String, nullable=False, index=True)
+    type = Column(String, nullable=False)
     result = Column(Float, nullable=True)
-    user_id = Column(Integer, ForeignKey("users.id"), nullable=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=True)
 
     user = relationship("User", backref="calculations")
 
     def compute_result(self, persist: bool = True, force: bool = False) -> float:
-        # local import to avoid circular imports at module import time
-        from .factory import CalculationFactory
-
-        factory = CalculationFactory()
-        op = factory.get(self.type)
+        op = _factory.get(self.type)
         computed = op.compute(self.a, self.b)
 
         if persist and (self.result is None or force):
@@ -61,8 +70,140 @@ class Calculation(Base):
 
         return computed
 
+    @classmethod
+    def compute_results(
+        cls, calcs: Sequence["Calculation"], persist: bool = True, force: bool = False
+    ) -> BatchResult:
+        """Bulk counterpart of :meth:`compute_result` backed by :func:`compute_many`.
+
+        Rows that divide by zero are flagged in the returned mask and keep
+        their current ``result`` instead of raising.
+        """
+        batch = compute_many([c.type for c in calcs], [c.a for c in calcs], [c.b for c in calcs])
+        if persist:
+            for calc, value, zero in zip(calcs, batch.results.tolist(), batch.zero_division.tolist()):
+                if not zero and (calc.result is None or force):
+                    calc.result = value
+        return batch
+
     def __repr__(self) -> str:
         return f"<Calculation id={self.id!r} type={self.type!r} a={self.a!r} b={self.b!r} result={self.result!r}>"
 
     def to_dict(self) -> dict:
         return {"id": self.id, "a": self.a, "b": self.b, "type": self.type, "result": self.result}
+
+
+class CalculationStats(Base):
+    """Per-user, per-type aggregates of ``calculations.result``.
+
+    Maintained by database triggers on ``calculations`` (below), so every
+    insert, update and delete - ORM, bulk or raw SQL - adjusts it in the same
+    transaction. ``total`` treats a NULL result as 0; ``minimum``/``maximum``
+    ignore NULLs, like ``SUM``/``MIN``/``MAX``. See :mod:`app.core.stats`.
+    """
+
+    __tablename__ = "calculation_stats"
+
+    user_id = Column(Integer, ForeignKey("users.id"), primary_key=True)
+    type = Column(String, primary_key=True)
+    count = Column(Integer, nullable=False)
+    total = Column(Float, nullable=False)
+    minimum = Column(Float, nullable=True)
+    maximum = Column(Float, nullable=True)
+
+    def __repr__(self) -> str:
+        return f"<CalculationStats user_id={self.user_id!r} type={self.type!r} count={self.count!r}>"
+
+
+# Removing a row recomputes minimum/maximum only when the row held one of
+# them; that subquery reads the user's rows through ix_calculations_user_id_id.
+_SQLITE_REMOVE_OLD = """
+    UPDATE calculation_stats SET
+        count = count - 1,
+        total = total - coalesce(OLD.result, 0),
+        minimum = CASE WHEN OLD.result <= minimum THEN
+            (SELECT min(result) FROM calculations WHERE user_id = OLD.user_id AND type = OLD.type)
+            ELSE minimum END,
+        maximum = CASE WHEN OLD.result >= maximum THEN
+            (SELECT max(result) FROM calculations WHERE user_id = OLD.user_id AND type = OLD.type)
+            ELSE maximum END
+    WHERE user_id = OLD.user_id AND type = OLD.type;
+    DELETE FROM calculation_stats WHERE user_id = OLD.user_id AND type = OLD.type AND count <= 0;
+"""
+
+_SQLITE_ADD_NEW = """
+    INSERT INTO calculation_stats (user_id, type, count, total, minimum, maximum)
+    SELECT NEW.user_id, NEW.type, 1, coalesce(NEW.result, 0), NEW.result, NEW.result
+    WHERE NEW.user_id IS NOT NULL
+    ON CONFLICT (user_id, type) DO UPDATE SET
+        count = count + 1,
+        total = total + excluded.total,
+        minimum = CASE WHEN minimum IS NULL OR excluded.minimum < minimum
+            THEN coalesce(excluded.minimum, minimum) ELSE minimum END,
+        maximum = CASE WHEN maximum IS NULL OR excluded.maximum > maximum
+            THEN coalesce(excluded.maximum, maximum) ELSE maximum END;
+"""
+
+SQLITE_STATS_TRIGGERS = (
+    f"CREATE TRIGGER IF NOT EXISTS calculation_stats_insert AFTER INSERT ON calculations BEGIN {_SQLITE_ADD_NEW} END",
+    f"CREATE TRIGGER IF NOT EXISTS calculation_stats_delete AFTER DELETE ON calculations BEGIN {_SQLITE_REMOVE_OLD} END",
+    "CREATE TRIGGER IF NOT EXISTS calculation_stats_update AFTER UPDATE OF type, result, user_id ON calculations "
+    f"BEGIN {_SQLITE_REMOVE_OLD} {_SQLITE_ADD_NEW} END",
+)
+
+POSTGRES_STATS_TRIGGERS = (
+    """
+    CREATE OR REPLACE FUNCTION calculation_stats_maintain() RETURNS trigger AS $$
+    BEGIN
+        IF TG_OP IN ('UPDATE', 'DELETE') AND OLD.user_id IS NOT NULL THEN
+            UPDATE calculation_stats SET
+                count = count - 1,
+                total = total - coalesce(OLD.result, 0),
+                minimum = CASE WHEN OLD.result <= minimum THEN
+                    (SELECT min(result) FROM calculations WHERE user_id = OLD.user_id AND type = OLD.type)
+                    ELSE minimum END,
+                maximum = CASE WHEN OLD.result >= maximum THEN
+                    (SELECT max(result) FROM calculations WHERE user_id = OLD.user_id AND type = OLD.type)
+                    ELSE maximum END
+            WHERE user_id = OLD.user_id AND type = OLD.type;
+            DELETE FROM calculation_stats WHERE user_id = OLD.user_id AND type = OLD.type AND count <= 0;
+        END IF;
+        IF TG_OP IN ('INSERT', 'UPDATE') AND NEW.user_id IS NOT NULL THEN
+            INSERT INTO calculation_stats AS s (user_id, type, count, total, minimum, maximum)
+            VALUES (NEW.user_id, NEW.type, 1, coalesce(NEW.result, 0), NEW.result, NEW.result)
+            ON CONFLICT (user_id, type) DO UPDATE SET
+                count = s.count + 1,
+                total = s.total + excluded.total,
+                minimum = LEAST(s.minimum, excluded.minimum),
+                maximum = GREATEST(s.maximum, excluded.maximum);
+        END IF;
+        RETURN NULL;
+    END
+    $$ LANGUAGE plpgsql
+    """,
+    "DROP TRIGGER IF EXISTS calculation_stats_maintain ON calculations",
+    "CREATE TRIGGER calculation_stats_maintain AFTER INSERT OR UPDATE OF type, result, user_id OR DELETE "
+    "ON calculations FOR EACH ROW EXECUTE FUNCTION calculation_stats_maintain()",
+)
+
+for _statement in SQLITE_STATS_TRIGGERS:
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="sqlite"))
+for _statement in POSTGRES_STATS_TRIGGERS:
+    event.listen(Base.metadata, "after_create", DDL(_statement).execute_if(dialect="postgresql"))
+
+# Fills calculation_stats from the rows already in calculations when
+# create_all adds the table to an existing database (the DB_AUTO_CREATE
+# upgrade path; migration 0003 does the same). This hooks the metadata rather
+# than the table because on a fresh database calculation_stats is created
+# before calculations; ``tables`` lists only the tables created in this call.
+STATS_BACKFILL = (
+    "INSERT INTO calculation_stats (user_id, type, count, total, minimum, maximum) "
+    "SELECT user_id, type, count(*), coalesce(sum(result), 0), min(result), max(result) "
+    "FROM calculations WHERE user_id IS NOT NULL GROUP BY user_id, type"
+)
+
+
+@event.listens_for(Base.metadata, "after_create")
+def _backfill_calculation_stats(target, connection, tables=(), **kw):  # pylint: disable=unused-argument
+    if CalculationStats.__table__ in tables:
+        connection.execute(text(STATS_BACKFILL))
@@ -0,0 +1,83 @@
+"""Connection pool instrumentation.
+
+:class:`InstrumentedQueuePool` and :class:`InstrumentedAsyncAdaptedQueuePool`
+time every checkout from the pool (waiting for a free connection, or opening
+a new one) and count checkouts that fail with ``sqlalchemy.exc.TimeoutError``.
+Together with the pool's own gauges (:func:`pool_status`) this makes pool
+exhaustion visible on ``/metrics`` before requests start timing out.
+
+Statistics live on the pool class, so they survive ``engine.dispose()``
+(which replaces the pool instance) and each class reports one engine.
+"""
+from __future__ import annotations
+
+import threading
+import time
+
+from sqlalchemy import exc
+from sqlalchemy.pool import AsyncAdaptedQueuePool, Pool, QueuePool
+
+
+class PoolStats:
+    """Thread-safe checkout counters for one pool class."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self) -> None:
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_ns = 0
+        self.max_wait_ns = 0
+
+    def record(self, wait_ns: int, timed_out: bool = False) -> None:
+        with self._lock:
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+            self.wait_ns += wait_ns
+            self.max_wait_ns = max(self.max_wait_ns, wait_ns)
+
+    def snapshot(self) -> dict:
+        with self._lock:
+            return {
+                "checkouts": self.checkouts,
+                "timeouts": self.timeouts,
+                "wait_seconds": self.wait_ns / 1e9,
+                "max_wait_seconds": self.max_wait_ns / 1e9,
+            }
+
+
+class _InstrumentedPoolMixin:
+    stats: PoolStats
+
+    def _do_get(self):
+        start = time.perf_counter_ns()
+        try:
+            conn = super()._do_get()
+        except exc.TimeoutError:
+            self.stats.record(time.perf_counter_ns() - start, timed_out=True)
+            raise
+        self.stats.record(time.perf_counter_ns() - start)
+        return conn
+
+
+class InstrumentedQueuePool(_InstrumentedPoolMixin, QueuePool):
+    stats = PoolStats()
+
+
+class InstrumentedAsyncAdaptedQueuePool(_InstrumentedPoolMixin, AsyncAdaptedQueuePool):
+    stats = PoolStats()
+
+
+def pool_status(pool: Pool) -> dict:
+    """Gauges for ``pool`` plus its class's checkout statistics, if any."""
+    status = {"size": 0, "checked_out": 0, "overflow": 0}
+    if isinstance(pool, QueuePool):
+        status.update(size=pool.size(), checked_out=pool.checkedout(), overflow=max(0, pool.overflow()))
+    stats = getattr(pool, "stats", None)
+    if isinstance(stats, PoolStats):
+        status.update(stats.snapshot())
+    return status
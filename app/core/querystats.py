@@ -0,0 +1,141 @@
+"""Per-request SQL statement accounting.
+
+:func:`instrument_engine` hooks ``before_cursor_execute``,
+``after_cursor_execute`` and ``handle_error`` on an engine. Every statement
+is timed, including ones that fail; those over
+``DB_SLOW_QUERY_MS`` are logged to ``calculator.sql``, and when a
+:class:`QueryStats` is active (:func:`track_queries`, which the API's
+``QueryStatsMiddleware`` opens around each request) the statement is counted
+in it. The active stats live in a context variable, so statements issued from
+the threadpool on behalf of a request are attributed to that request.
+
+Repeating the same SQL text many times in one request is the signature of an
+N+1 pattern (e.g. touching the lazy ``User.calculations`` backref in a loop);
+:meth:`QueryStats.repeated` lists such statements.
+
+:func:`assert_max_queries` is the test-side helper: it counts every
+statement an engine executes inside a block, from any thread.
+"""
+from __future__ import annotations
+
+import contextlib
+import contextvars
+import logging
+import threading
+import time
+from collections import Counter
+from typing import Iterator
+
+from sqlalchemy import event
+
+from ..config.settings import settings
+
+sql_logger = logging.getLogger("calculator.sql")
+
+
+class QueryStats:
+    """Statements executed while this object was the active one."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.count = 0
+        self.duration_ns = 0
+        self.statements: Counter[str] = Counter()
+
+    def record(self, statement: str, duration_ns: int) -> None:
+        with self._lock:
+            self.count += 1
+            self.duration_ns += duration_ns
+            self.statements[statement] += 1
+
+    @property
+    def duration_ms(self) -> float:
+        return self.duration_ns / 1e6
+
+    def repeated(self, threshold: int) -> list[tuple[str, int]]:
+        """Statements executed at least ``threshold`` times, most frequent first."""
+        if threshold <= 0:
+            return []
+        with self._lock:
+            return [(sql, n) for sql, n in self.statements.most_common() if n >= threshold]
+
+    def server_timing(self) -> str:
+        """A ``Server-Timing`` header value, e.g. ``db;dur=1.25;desc="3 queries"``."""
+        return f'db;dur={self.duration_ms:.2f};desc="{self.count} queries"'
+
+
+_current: contextvars.ContextVar[QueryStats | None] = contextvars.ContextVar("query_stats", default=None)
+
+
+@contextlib.contextmanager
+def track_queries() -> Iterator[QueryStats]:
+    """Count the statements run in this context (and contexts copied from it)."""
+    stats = QueryStats()
+    token = _current.set(stats)
+    try:
+        yield stats
+    finally:
+        _current.reset(token)
+
+
+def _record(statement: str, elapsed: int) -> None:
+    stats = _current.get()
+    if stats is not None:
+        stats.record(statement, elapsed)
+    if settings.db_slow_query_ms > 0 and elapsed >= settings.db_slow_query_ms * 1e6:
+        # parameters are left out: they can hold password hashes and tokens
+        sql_logger.warning("Slow query (%.1f ms): %s", elapsed / 1e6, " ".join(statement.split()))
+
+
+# the start time lives on the execution context rather than the connection,
+# so a statement that fails cannot leave it behind on a pooled connection
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=unused-argument
+    if context is not None:
+        context.query_start_ns = time.perf_counter_ns()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):  # pylint: disable=unused-argument
+    start = getattr(context, "query_start_ns", None)
+    if start is not None:
+        context.query_start_ns = None
+        _record(statement, time.perf_counter_ns() - start)
+
+
+def _handle_error(exception_context) -> None:
+    context = exception_context.execution_context
+    start = getattr(context, "query_start_ns", None)
+    if start is not None and exception_context.statement is not None:
+        context.query_start_ns = None
+        _record(exception_context.statement, time.perf_counter_ns() - start)
+
+
+def instrument_engine(engine) -> None:
+    """Attach the timing hooks to a (sync) engine; idempotent."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+        event.listen(engine, "handle_error", _handle_error)
+
+
+@contextlib.contextmanager
+def assert_max_queries(limit: int, engine) -> Iterator[list[str]]:
+    """Fail if more than ``limit`` statements run on ``engine`` inside the block.
+
+    Yields the list of executed statements, which fills as the block runs::
+
+        with assert_max_queries(3, engine):
+            client.get("/calculations/1", headers=auth)
+    """
+    executed: list[str] = []
+
+    def record(conn, cursor, statement, *args):  # pylint: disable=unused-argument
+        executed.append(statement)
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        yield executed
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+    if len(executed) > limit:
+        listing = "\n".join(f"  {i + 1}. {' '.join(sql.split())}" for i, sql in enumerate(executed))
+        raise AssertionError(f"expected at most {limit} queries, {len(executed)} were executed:\n{listing}")
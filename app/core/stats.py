@@ -0,0 +1,114 @@
+"""Per-user calculation statistics.
+
+``calculation_stats`` (:class:`~app.core.models.CalculationStats`) holds one
+row per user and calculation type with the count, sum, minimum and maximum
+of ``result``. Triggers on ``calculations`` keep it current in the same
+transaction as every write, so :func:`summary_stats_stmt` reads a handful of
+rows however many calculations a user has.
+
+:func:`live_stats_stmt` computes the same figures with ``GROUP BY`` over
+``calculations``; :func:`rebuild` repopulates the table from it and
+:func:`verify` reports where the two disagree. From the command line::
+
+    python -m app.core.stats verify
+    python -m app.core.stats rebuild
+"""
+from __future__ import annotations
+
+import argparse
+import math
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+
+from . import models
+
+STATS_COLUMNS = ("type", "count", "total", "minimum", "maximum")
+
+
+def summary_stats_stmt(user_id: int | None = None):
+    """Rows of ``calculation_stats``, for one user or (``None``) all of them."""
+    stats = models.CalculationStats
+    stmt = select(stats.user_id, stats.type, stats.count, stats.total, stats.minimum, stats.maximum)
+    if user_id is not None:
+        stmt = stmt.where(stats.user_id == user_id)
+    return stmt.order_by(stats.user_id, stats.type)
+
+
+def live_stats_stmt(user_id: int | None = None):
+    """The figures of :func:`summary_stats_stmt` aggregated from ``calculations``."""
+    calc = models.Calculation
+    stmt = select(
+        calc.user_id,
+        calc.type,
+        func.count().label("count"),
+        func.coalesce(func.sum(calc.result), 0.0).label("total"),
+        func.min(calc.result).label("minimum"),
+        func.max(calc.result).label("maximum"),
+    )
+    stmt = stmt.where(calc.user_id.is_not(None) if user_id is None else calc.user_id == user_id)
+    return stmt.group_by(calc.user_id, calc.type).order_by(calc.user_id, calc.type)
+
+
+def rebuild(db: Session) -> int:
+    """Replace the contents of ``calculation_stats`` with the live aggregates.
+
+    Runs in the caller's transaction; commit to keep the result. Returns the
+    number of summary rows written.
+    """
+    db.execute(delete(models.CalculationStats))
+    live = live_stats_stmt()
+    result = db.execute(
+        insert(models.CalculationStats).from_select([c.name for c in live.selected_columns], live)
+    )
+    return result.rowcount
+
+
+def _same(a, b) -> bool:
+    if a is None or b is None:
+        return a is b
+    # sums accumulated row by row drift from a fresh SUM in the last bits
+    return math.isclose(a, b, rel_tol=1e-9, abs_tol=1e-9)
+
+
+def verify(db: Session, user_id: int | None = None) -> list[tuple]:
+    """``(user_id, type, summary_row, live_row)`` for every mismatch.
+
+    Either row is ``None`` when that side has no entry for the pair.
+    """
+    summary = {(r.user_id, r.type): r for r in db.execute(summary_stats_stmt(user_id))}
+    live = {(r.user_id, r.type): r for r in db.execute(live_stats_stmt(user_id))}
+    mismatches = []
+    for key in sorted(summary.keys() | live.keys()):
+        have, want = summary.get(key), live.get(key)
+        if have is not None and want is not None and have.count == want.count and all(
+            _same(getattr(have, col), getattr(want, col)) for col in STATS_COLUMNS[2:]
+        ):
+            continue
+        mismatches.append((*key, have, want))
+    return mismatches
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description="Check or rebuild the calculation_stats summary table.")
+    parser.add_argument("command", choices=("verify", "rebuild"))
+    args = parser.parse_args(argv)
+
+    from .database import SessionLocal, ensure_schema
+
+    ensure_schema()
+    with SessionLocal() as db:
+        if args.command == "rebuild":
+            rows = rebuild(db)
+            db.commit()
+            print(f"rebuilt calculation_stats: {rows} rows")
+            return 0
+        mismatches = verify(db)
+    for user_id, calc_type, have, want in mismatches:
+        print(f"user {user_id} {calc_type}: summary {have and tuple(have)} != live {want and tuple(want)}")
+    print(f"{len(mismatches)} mismatched rows")
+    return 1 if mismatches else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,213 @@
+"""Group commit for single-row inserts.
+
+:class:`GroupCommitQueue` lets concurrent requests share one transaction.
+:meth:`~GroupCommitQueue.submit` queues a row and returns a future; a writer
+thread takes the first queued row, keeps collecting until ``batch_size`` rows
+are waiting or ``flush_ms`` has passed, and writes them with one multi-row
+``INSERT ... RETURNING`` and a single commit. Each future is then resolved
+with its own returned row (id and all), so callers see the same result as
+with a per-request insert, at the cost of up to ``flush_ms`` extra latency.
+
+Durability is unchanged: a future resolves only after its batch has
+committed, so a request is never answered for a row that is not yet in the
+database (how durable a commit is still depends on the database, e.g.
+``SQLITE_SYNCHRONOUS``). Rows still queued when the process dies are lost,
+but their requests have not been answered either, exactly as when a process
+dies mid-request. Rows of one batch commit or roll back together; if a batch
+fails, its rows are retried one by one so a bad row only fails its own
+request. At most ``max_depth`` rows may wait; beyond that
+:class:`WriteQueueFullError` is raised so the caller can shed load.
+
+A caller that gives up can cancel its future while the row is still queued;
+the writer then skips the row. Once the writer has taken a row it can no
+longer be cancelled. An unexpected error while writing a batch fails that
+batch's futures and the writer carries on with the next one.
+"""
+from __future__ import annotations
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from typing import Any, Callable
+
+from .bulk import insert_returning
+
+logger = logging.getLogger("calculator")
+
+_STOP = object()
+
+
+class WriteQueueFullError(RuntimeError):
+    """Raised when ``max_depth`` rows are already waiting to be written."""
+
+
+class GroupCommitQueue:
+    """Coalesce inserts into ``model`` from many threads into shared commits.
+
+    ``convert`` turns each returned ORM object into the value handed back to
+    the caller; it runs before the commit expires the objects. The writer
+    thread is started on first use.
+    """
+
+    def __init__(
+        self,
+        session_factory,
+        model,
+        convert: Callable[[Any], Any] = lambda obj: obj,
+        batch_size: int = 100,
+        flush_ms: float = 2.0,
+        max_depth: int = 1000,
+    ):
+        self.session_factory = session_factory
+        self.model = model
+        self.convert = convert
+        self.batch_size = max(1, batch_size)
+        self.flush_ms = max(0.0, flush_ms)
+        self.max_depth = max_depth
+        self._queue: queue.Queue = queue.Queue(maxsize=max(1, max_depth))
+        self._lock = threading.Lock()
+        self._thread: threading.Thread | None = None
+        self.batches = 0
+        self.rows = 0
+        self.failed = 0
+        self.rejected = 0
+        self.max_batch = 0
+        self.flush_seconds = 0.0
+        self.wait_seconds = 0.0
+
+    def submit(self, values: dict) -> Future:
+        """Queue ``values`` for insertion; the future resolves after the commit."""
+        future: Future = Future()
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="group-commit", daemon=True)
+                self._thread.start()
+        try:
+            self._queue.put_nowait((values, future, time.perf_counter()))
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            raise WriteQueueFullError("write queue is full") from None
+        return future
+
+    def insert(self, values: dict):
+        """Blocking :meth:`submit`: the converted row once it is committed."""
+        return self.submit(values).result()
+
+    def _next_batch(self) -> tuple[list, bool]:
+        item = self._queue.get()
+        if item is _STOP:
+            return [], True
+        # cancelled futures are dropped; the rest can no longer be cancelled
+        batch = [item] if item[1].set_running_or_notify_cancel() else []
+        deadline = time.perf_counter() + self.flush_ms / 1000
+        while len(batch) < self.batch_size:
+            remaining = deadline - time.perf_counter()
+            try:
+                item = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if item is _STOP:
+                return batch, True
+            if item[1].set_running_or_notify_cancel():
+                batch.append(item)
+        return batch, False
+
+    def _run(self) -> None:
+        stopping, batch = False, []
+        try:
+            while not stopping:
+                batch = []
+                batch, stopping = self._next_batch()
+                if batch:
+                    try:
+                        self._flush(batch)
+                    except Exception as exc:  # pylint: disable=broad-except
+                        logger.exception("Group commit writer failed on %d rows", len(batch))
+                        self._fail(batch, exc)
+        finally:
+            if not stopping:
+                self._abandon(batch)
+
+    def _fail(self, batch: list, exc: BaseException) -> None:
+        pending = [future for _, future, _ in batch if not future.done()]
+        with self._lock:
+            self.failed += len(pending)
+        for future in pending:
+            future.set_exception(exc)
+
+    def _abandon(self, batch: list) -> None:
+        # the writer thread is dying: fail its batch and everything queued,
+        # and let the next submit() start a new writer
+        with self._lock:
+            if self._thread is threading.current_thread():
+                self._thread = None
+        exc = RuntimeError("group commit writer stopped")
+        self._fail(batch, exc)
+        while True:
+            try:
+                item = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            if item is not _STOP and item[1].set_running_or_notify_cancel():
+                self._fail([item], exc)
+
+    def _flush(self, batch: list) -> None:
+        start = time.perf_counter()
+        with self.session_factory() as db:
+            stmt, ordered = insert_returning(self.model, db.get_bind().dialect)
+            try:
+                created = ordered(db.scalars(stmt, [values for values, _, _ in batch]))
+                results = [self.convert(obj) for obj in created]
+                db.commit()
+                outcomes = [(future, result, None) for (_, future, _), result in zip(batch, results)]
+            except Exception:  # retry one by one so only the bad rows fail
+                db.rollback()
+                logger.warning("Group commit of %d rows failed; retrying them one by one", len(batch), exc_info=True)
+                outcomes = []
+                for values, future, _ in batch:
+                    try:
+                        result = self.convert(db.scalars(stmt, [values]).one())
+                        db.commit()
+                        outcomes.append((future, result, None))
+                    except Exception as exc:  # pylint: disable=broad-except
+                        db.rollback()
+                        outcomes.append((future, None, exc))
+
+        done = time.perf_counter()
+        with self._lock:
+            self.batches += 1
+            self.rows += sum(exc is None for _, _, exc in outcomes)
+            self.failed += sum(exc is not None for _, _, exc in outcomes)
+            self.max_batch = max(self.max_batch, len(batch))
+            self.flush_seconds += done - start
+            self.wait_seconds += sum(done - queued for _, _, queued in batch)
+        for future, result, exc in outcomes:
+            if exc is None:
+                future.set_result(result)
+            else:
+                future.set_exception(exc)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "depth": self._queue.qsize(),
+                "max_depth": self.max_depth,
+                "batches": self.batches,
+                "rows": self.rows,
+                "failed": self.failed,
+                "rejected": self.rejected,
+                "max_batch": self.max_batch,
+                "flush_seconds": self.flush_seconds,
+                "wait_seconds": self.wait_seconds,
+            }
+
+    def shutdown(self) -> None:
+        """Write whatever is queued, then stop the writer thread."""
+        with self._lock:
+            thread, self._thread = self._thread, None
+        if thread is not None:
+            self._queue.put(_STOP)
+            thread.join()
@@ -0,0 +1,289 @@
+"""Closed-loop load generator for the calculator API.
+
+Usage::
+
+    python -m app.loadtest --users 50 --duration 30
+    python -m app.loadtest --server uvicorn --mix create=1,list=4,get=4 --json load.json
+    python -m app.loadtest --url http://staging:8000 --users 200 --duration 120
+
+Each of ``--users`` virtual users registers, fetches a token and then loops
+over calculation requests picked at random according to ``--mix``
+(``create``, ``list``, ``get``, ``update``, ``delete``), issuing the next
+request as soon as the previous one completes (plus ``--think-ms``). Users
+only touch their own calculations; ``get``/``update``/``delete`` fall back to
+``create`` until a user has one.
+
+The app runs in-process behind httpx's ASGI transport (``--server asgi``,
+the default) or behind a real uvicorn server on a free local port
+(``--server uvicorn``); ``--url`` targets an already running deployment
+instead. In-process runs use the configured ``DATABASE_URL`` unless
+``--database-url`` is given, and default ``DB_POOL_SIZE`` to the number of
+users: sync routes hold their connection until the response is sent, so
+fewer connections than requests in flight can stall the threadpool.
+
+Prints throughput, error rate and p50/p95/p99 latency per endpoint; ``--json``
+also writes the report to a file.
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import random
+import sys
+import threading
+import time
+import uuid
+from typing import AsyncIterator
+
+OPERATIONS = ("create", "list", "get", "update", "delete")
+DEFAULT_MIX = "create=2,list=2,get=4,update=1,delete=1"
+
+
+def parse_mix(spec: str) -> dict[str, float]:
+    """``"create=2,get=4"`` -> ``{"create": 2.0, "get": 4.0}``."""
+    mix: dict[str, float] = {}
+    for part in filter(None, (p.strip() for p in spec.split(","))):
+        name, sep, weight = part.partition("=")
+        if not sep or name not in OPERATIONS:
+            raise ValueError(f"invalid mix entry {part!r}; expected <op>=<weight> with op in {', '.join(OPERATIONS)}")
+        mix[name] = float(weight)
+        if mix[name] < 0:
+            raise ValueError(f"negative weight for {name!r}")
+    if not any(mix.values()):
+        raise ValueError("mix needs at least one positive weight")
+    return mix
+
+
+def percentile(ordered: list[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list."""
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+class Recorder:
+    """Latencies and error counts per endpoint label."""
+
+    def __init__(self):
+        self.latencies: dict[str, list[float]] = {}
+        self.errors: dict[str, int] = {}
+
+    def record(self, endpoint: str, seconds: float, ok: bool) -> None:
+        self.latencies.setdefault(endpoint, []).append(seconds)
+        self.errors[endpoint] = self.errors.get(endpoint, 0) + (not ok)
+
+    def report(self, elapsed: float) -> dict:
+        endpoints = {}
+        for endpoint, samples in sorted(self.latencies.items()):
+            ordered = sorted(samples)
+            errors = self.errors[endpoint]
+            endpoints[endpoint] = {
+                "requests": len(ordered),
+                "errors": errors,
+                "error_rate": errors / len(ordered),
+                "rps": len(ordered) / elapsed,
+                "p50_ms": percentile(ordered, 0.50) * 1000,
+                "p95_ms": percentile(ordered, 0.95) * 1000,
+                "p99_ms": percentile(ordered, 0.99) * 1000,
+                "max_ms": ordered[-1] * 1000,
+            }
+        total = sum(e["requests"] for e in endpoints.values())
+        errors = sum(e["errors"] for e in endpoints.values())
+        return {
+            "elapsed_s": elapsed,
+            "requests": total,
+            "errors": errors,
+            "error_rate": errors / total if total else 0.0,
+            "rps": total / elapsed if elapsed else 0.0,
+            "endpoints": endpoints,
+        }
+
+
+class VirtualUser:
+    def __init__(self, client, recorder: Recorder, rng: random.Random, mix: dict[str, float], think: float):
+        self.client = client
+        self.recorder = recorder
+        self.rng = rng
+        self.ops = list(mix)
+        self.weights = list(mix.values())
+        self.think = think
+        self.headers: dict[str, str] = {}
+        self.ids: list[int] = []
+
+    async def _request(self, endpoint: str, method: str, url: str, **kwargs):
+        start = time.perf_counter()
+        try:
+            response = await self.client.request(method, url, **kwargs)
+        except Exception:  # connection errors count against the endpoint
+            self.recorder.record(endpoint, time.perf_counter() - start, ok=False)
+            return None
+        self.recorder.record(endpoint, time.perf_counter() - start, ok=response.status_code < 400)
+        return response if response.status_code < 400 else None
+
+    async def login(self) -> bool:
+        name = f"load_{uuid.uuid4().hex[:12]}"
+        creds = {"username": name, "password": "load-test-password"}
+        if not await self._request(
+            "POST /users/register", "POST", "/users/register", json={**creds, "email": f"{name}@example.com"}
+        ):
+            return False
+        response = await self._request("POST /users/token", "POST", "/users/token", json=creds)
+        if not response:
+            return False
+        self.headers = {"Authorization": f"Bearer {response.json()['access_token']}"}
+        return True
+
+    def _payload(self) -> dict:
+        calc_type = self.rng.choice(("add", "subtract", "multiply", "divide"))
+        return {"a": self.rng.randint(-1000, 1000), "b": self.rng.randint(1, 100), "type": calc_type}
+
+    async def step(self) -> None:
+        op = self.rng.choices(self.ops, self.weights)[0]
+        if op in ("get", "update", "delete") and not self.ids:
+            op = "create"
+        if op == "create":
+            response = await self._request(
+                "POST /calculations", "POST", "/calculations", json=self._payload(), headers=self.headers
+            )
+            if response:
+                self.ids.append(response.json()["id"])
+        elif op == "list":
+            await self._request("GET /calculations", "GET", "/calculations", headers=self.headers)
+        elif op == "get":
+            calc_id = self.rng.choice(self.ids)
+            await self._request("GET /calculations/{id}", "GET", f"/calculations/{calc_id}", headers=self.headers)
+        elif op == "update":
+            calc_id = self.rng.choice(self.ids)
+            await self._request(
+                "PUT /calculations/{id}", "PUT", f"/calculations/{calc_id}", json=self._payload(), headers=self.headers
+            )
+        else:
+            calc_id = self.ids.pop(self.rng.randrange(len(self.ids)))
+            await self._request("DELETE /calculations/{id}", "DELETE", f"/calculations/{calc_id}", headers=self.headers)
+
+    async def run(self, deadline: float, max_requests: int | None) -> None:
+        if not await self.login():
+            return
+        done = 0
+        while time.perf_counter() < deadline and (max_requests is None or done < max_requests):
+            await self.step()
+            done += 1
+            if self.think:
+                await asyncio.sleep(self.think)
+
+
+@contextlib.contextmanager
+def _uvicorn_server(app):
+    import uvicorn
+
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=0, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+    while not server.started:
+        if not thread.is_alive():
+            raise RuntimeError("uvicorn failed to start")
+        time.sleep(0.01)
+    port = server.servers[0].sockets[0].getsockname()[1]
+    try:
+        yield f"http://127.0.0.1:{port}"
+    finally:
+        server.should_exit = True
+        thread.join()
+
+
+@contextlib.asynccontextmanager
+async def _client(args) -> AsyncIterator:
+    import httpx
+
+    limits = httpx.Limits(max_connections=args.users, max_keepalive_connections=args.users)
+    timeout = httpx.Timeout(args.timeout)
+    if args.url:
+        async with httpx.AsyncClient(base_url=args.url, limits=limits, timeout=timeout) as client:
+            yield client
+        return
+
+    from .api.main import app
+
+    # per-request INFO logs would swamp the report (and cost time)
+    logging.getLogger("calculator").setLevel(args.log_level)
+    if args.server == "uvicorn":
+        with _uvicorn_server(app) as url:
+            async with httpx.AsyncClient(base_url=url, limits=limits, timeout=timeout) as client:
+                yield client
+    else:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://loadtest", timeout=timeout) as client:
+            yield client
+
+
+async def run_load(args, mix: dict[str, float]) -> dict:
+    recorder = Recorder()
+    async with _client(args) as client:
+        rng = random.Random(args.seed)
+        users = [VirtualUser(client, recorder, random.Random(rng.random()), mix, args.think_ms / 1000) for _ in range(args.users)]
+        start = time.perf_counter()
+        deadline = start + args.duration
+        await asyncio.gather(*(user.run(deadline, args.requests) for user in users))
+        elapsed = time.perf_counter() - start
+    report = recorder.report(elapsed)
+    report["config"] = {
+        "users": args.users,
+        "duration_s": args.duration,
+        "requests_per_user": args.requests,
+        "mix": mix,
+        "think_ms": args.think_ms,
+        "target": args.url or args.server,
+    }
+    return report
+
+
+def format_table(report: dict) -> str:
+    lines = [f"{'endpoint':<28} {'reqs':>7} {'err%':>6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}"]
+    rows = list(report["endpoints"].items()) + [("TOTAL", report)]
+    for endpoint, e in rows:
+        pct = "" if endpoint == "TOTAL" else f" {e['p50_ms']:>8.1f} {e['p95_ms']:>8.1f} {e['p99_ms']:>8.1f}"
+        lines.append(f"{endpoint:<28} {e['requests']:>7} {e['error_rate'] * 100:>6.1f} {e['rps']:>8.1f}{pct}")
+    return "\n".join(lines)
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--users", type=int, default=10, help="concurrent virtual users")
+    parser.add_argument("--duration", type=float, default=10.0, help="seconds to run after the first user starts")
+    parser.add_argument("--requests", type=int, default=None, help="stop each user after this many calculation requests")
+    parser.add_argument("--mix", default=DEFAULT_MIX, help=f"operation weights (default {DEFAULT_MIX})")
+    parser.add_argument("--think-ms", type=float, default=0.0, help="pause between a user's requests")
+    parser.add_argument("--server", choices=("asgi", "uvicorn"), default="asgi", help="how to run the in-process app")
+    parser.add_argument("--url", help="load an already running server instead of the in-process app")
+    parser.add_argument("--database-url", help="DATABASE_URL for the in-process app")
+    parser.add_argument("--log-level", default="WARNING", help="level for the in-process app's calculator loggers")
+    parser.add_argument("--timeout", type=float, default=30.0, help="per-request timeout in seconds")
+    parser.add_argument("--seed", type=int, default=0, help="seed for the operation mix")
+    parser.add_argument("--json", dest="json_path", help="also write the report to this file")
+    args = parser.parse_args(argv)
+    try:
+        mix = parse_mix(args.mix)
+    except ValueError as exc:
+        parser.error(str(exc))
+
+    if not args.url:
+        # read by app.core.database / settings when the app is imported
+        if args.database_url:
+            os.environ["DATABASE_URL"] = args.database_url
+        os.environ.setdefault("DB_POOL_SIZE", str(args.users))
+
+    report = asyncio.run(run_load(args, mix))
+    print(format_table(report))
+    if args.json_path:
+        with open(args.json_path, "w", encoding="utf-8") as fh:
+            json.dump(report, fh, indent=2)
+            fh.write("\n")
+    return 1 if report["requests"] == 0 else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
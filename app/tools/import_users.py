@@ -0,0 +1,218 @@
+"""Bulk-create users from a CSV file.
+
+Usage::
+
+    python -m app.tools.import_users users.csv --workers 8 --chunk-size 1000 --errors rejected.csv
+
+The file needs ``username``, ``email`` and ``password`` columns. Rows are
+validated like ``POST /users/register`` and processed in chunks: usernames
+and emails already in the database (or earlier in the file) are set aside
+with one query per chunk, the remaining passwords are hashed in parallel on
+a process pool, and the chunk is written with a single ``executemany``
+INSERT and one commit. If a concurrent registration makes that INSERT hit
+the unique constraints, the chunk is retried row by row so only the
+conflicting rows are rejected.
+
+Prints the imported/duplicate/invalid counts and throughput; ``--errors``
+writes every rejected row, with its line number and reason, to a CSV file.
+"""
+from __future__ import annotations
+
+import argparse
+import csv
+import os
+import sys
+import time
+from dataclasses import dataclass, field
+from typing import Callable, Iterable, Iterator
+
+from pydantic import ValidationError
+from sqlalchemy import insert, or_, select
+from sqlalchemy.exc import IntegrityError
+
+from ..api.schemas import UserCreate
+from ..auth.security import hash_password, hash_process_pool, worker_hash
+from ..core import models
+
+REQUIRED_COLUMNS = ("username", "email", "password")
+DEFAULT_CHUNK_SIZE = 1000
+
+
+@dataclass
+class ImportReport:
+    imported: int = 0
+    # (line, username, email, reason)
+    rejected: list[tuple[int, str, str, str]] = field(default_factory=list)
+    duplicates: int = 0
+    invalid: int = 0
+    hashed: int = 0
+    hash_seconds: float = 0.0
+    inserted_seconds: float = 0.0
+    elapsed: float = 0.0
+
+    def reject(self, line: int, username: str, email: str, reason: str, duplicate: bool = True) -> None:
+        self.rejected.append((line, username, email, reason))
+        if duplicate:
+            self.duplicates += 1
+        else:
+            self.invalid += 1
+
+    def summary(self) -> str:
+        rate = self.imported / self.elapsed if self.elapsed else 0.0
+        hash_rate = self.hashed / self.hash_seconds if self.hash_seconds else 0.0
+        insert_rate = self.imported / self.inserted_seconds if self.inserted_seconds else 0.0
+        return (
+            f"imported {self.imported} users, {self.duplicates} duplicates, {self.invalid} invalid "
+            f"in {self.elapsed:.2f}s ({rate:,.0f} users/s; hashing {hash_rate:,.0f}/s, inserting {insert_rate:,.0f} rows/s)"
+        )
+
+
+def _chunks(rows: Iterable[tuple[int, UserCreate]], size: int) -> Iterator[list[tuple[int, UserCreate]]]:
+    chunk: list[tuple[int, UserCreate]] = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def _valid_rows(records: Iterable[dict], report: ImportReport) -> Iterator[tuple[int, UserCreate]]:
+    """Validate records (line 2 onwards) and drop repeats of an earlier row's username/email."""
+    seen_names: set[str] = set()
+    seen_emails: set[str] = set()
+    for line, record in enumerate(records, start=2):
+        username, email = record.get("username") or "", record.get("email") or ""
+        try:
+            user = UserCreate.model_validate({k: record.get(k) for k in REQUIRED_COLUMNS})
+        except ValidationError as exc:
+            reason = "; ".join(f"{'.'.join(map(str, e['loc']))}: {e['msg']}" for e in exc.errors())
+            report.reject(line, username, email, reason, duplicate=False)
+            continue
+        if user.username in seen_names:
+            report.reject(line, user.username, user.email, "duplicate username in file")
+        elif user.email in seen_emails:
+            report.reject(line, user.username, user.email, "duplicate email in file")
+        else:
+            seen_names.add(user.username)
+            seen_emails.add(user.email)
+            yield line, user
+
+
+def _import_chunk(db, chunk: list[tuple[int, UserCreate]], hash_many, report: ImportReport) -> None:
+    names = [user.username for _, user in chunk]
+    emails = [user.email for _, user in chunk]
+    existing = db.execute(
+        select(models.User.username, models.User.email).where(
+            or_(models.User.username.in_(names), models.User.email.in_(emails))
+        )
+    ).all()
+    db.commit()
+    taken_names = {row.username for row in existing}
+    taken_emails = {row.email for row in existing}
+
+    fresh = []
+    for line, user in chunk:
+        if user.username in taken_names:
+            report.reject(line, user.username, user.email, "username already exists")
+        elif user.email in taken_emails:
+            report.reject(line, user.username, user.email, "email already exists")
+        else:
+            fresh.append((line, user))
+    if not fresh:
+        return
+
+    start = time.perf_counter()
+    hashes = hash_many([user.password for _, user in fresh])
+    report.hash_seconds += time.perf_counter() - start
+    report.hashed += len(hashes)
+
+    rows = [
+        {"username": user.username, "email": user.email, "password_hash": hashed}
+        for (_, user), hashed in zip(fresh, hashes)
+    ]
+    start = time.perf_counter()
+    try:
+        db.execute(insert(models.User), rows)
+        db.commit()
+        report.imported += len(rows)
+    except IntegrityError:
+        # registered concurrently since the check above: find the culprits
+        db.rollback()
+        for (line, user), row in zip(fresh, rows):
+            try:
+                db.execute(insert(models.User), [row])
+                db.commit()
+                report.imported += 1
+            except IntegrityError:
+                db.rollback()
+                report.reject(line, user.username, user.email, "username or email already exists")
+    report.inserted_seconds += time.perf_counter() - start
+
+
+def import_users(
+    records: Iterable[dict],
+    session_factory,
+    hash_many: Callable[[list[str]], list[str]] | None = None,
+    chunk_size: int = DEFAULT_CHUNK_SIZE,
+) -> ImportReport:
+    """Import ``records`` (dicts with username, email and password).
+
+    ``hash_many`` hashes a list of passwords; by default they are hashed one
+    by one in this process.
+    """
+    hash_many = hash_many or (lambda passwords: [hash_password(p) for p in passwords])
+    report = ImportReport()
+    start = time.perf_counter()
+    with session_factory() as db:
+        for chunk in _chunks(_valid_rows(records, report), chunk_size):
+            _import_chunk(db, chunk, hash_many, report)
+    report.elapsed = time.perf_counter() - start
+    return report
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("csv_path", help="CSV file with username, email and password columns")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="hashing processes (0 = hash in-process)")
+    parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="users per INSERT and commit")
+    parser.add_argument("--errors", help="write rejected rows (line, username, email, reason) to this CSV file")
+    args = parser.parse_args(argv)
+
+    from ..core.database import SessionLocal, ensure_schema
+
+    ensure_schema()
+    with open(args.csv_path, newline="", encoding="utf-8") as fh:
+        reader = csv.DictReader(fh)
+        missing = [c for c in REQUIRED_COLUMNS if c not in (reader.fieldnames or ())]
+        if missing:
+            print(f"{args.csv_path}: missing columns: {', '.join(missing)}", file=sys.stderr)
+            return 2
+        if args.workers > 0:
+            with hash_process_pool(args.workers) as pool:
+                chunksize = max(1, args.chunk_size // (args.workers * 4))
+                report = import_users(
+                    reader,
+                    SessionLocal,
+                    hash_many=lambda passwords: list(pool.map(worker_hash, passwords, chunksize=chunksize)),
+                    chunk_size=args.chunk_size,
+                )
+        else:
+            report = import_users(reader, SessionLocal, chunk_size=args.chunk_size)
+
+    for line, username, _, reason in report.rejected[:10]:
+        print(f"line {line}: {username!r}: {reason}")
+    if len(report.rejected) > 10:
+        print(f"... {len(report.rejected) - 10} more rejected rows" + (f" (see {args.errors})" if args.errors else ""))
+    if args.errors:
+        with open(args.errors, "w", newline="", encoding="utf-8") as fh:
+            writer = csv.writer(fh)
+            writer.writerow(("line", "username", "email", "reason"))
+            writer.writerows(report.rejected)
+    print(report.summary())
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
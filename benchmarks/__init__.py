@@ -0,0 +1,8 @@
+"""Performance benchmarks for the calculator app.
+
+Each ``bench_*`` module is a standalone script, e.g.
+``python -m benchmarks.bench_compute_many``. They run offline and are not
+collected by pytest. ``python -m benchmarks.suite`` times every endpoint and
+the core functions together and compares the run against a saved JSON
+baseline.
+"""
@@ -0,0 +1,64 @@
+"""Throughput of the per-object compute loop vs. the vectorized batch engine.
+
+Run with ``python -m benchmarks.bench_compute_many [rows]``.
+"""
+from __future__ import annotations
+
+import random
+import sys
+import time
+
+from app.core.factory import CalculationFactory, compute_many
+from app.core.models import Calculation
+
+TYPES = ("add", "subtract", "multiply", "divide")
+
+
+def make_rows(n: int, seed: int = 0):
+    rng = random.Random(seed)
+    types = [rng.choice(TYPES) for _ in range(n)]
+    a = [rng.uniform(-1000, 1000) for _ in range(n)]
+    b = [rng.uniform(-1000, 1000) or 1.0 for _ in range(n)]
+    return types, a, b
+
+
+def per_object_loop(types, a, b):
+    """What recomputing rows looked like before: one factory and op per row."""
+    out = []
+    for t, x, y in zip(types, a, b):
+        out.append(CalculationFactory().get(t).compute(x, y))
+    return out
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 100_000
+    types, a, b = make_rows(n)
+    calcs = [Calculation(a=x, b=y, type=t) for t, x, y in zip(types, a, b)]
+
+    cases = {
+        "per-object loop": lambda: per_object_loop(types, a, b),
+        "compute_many": lambda: compute_many(types, a, b),
+        "Calculation.compute_result loop": lambda: [c.compute_result(force=True) for c in calcs],
+        "Calculation.compute_results": lambda: Calculation.compute_results(calcs, force=True),
+    }
+    baseline = None
+    print(f"{'case':<32} {'rows/s':>14} {'speedup':>8}")
+    for name, fn in cases.items():
+        elapsed = _best_of(fn)
+        rate = n / elapsed
+        baseline = baseline or rate
+        print(f"{name:<32} {rate:>14,.0f} {rate / baseline:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""Sync (threadpool + SessionLocal) vs async (AsyncSession) routes under load.
+
+Builds two copies of the application's routes - the sync ones from
+``app.api.main`` and the same app with :func:`app.api.async_routes.install`
+applied - and drives each in-process through httpx's ASGI transport with
+``concurrency`` requests in flight, alternating ``GET /calculations/{id}``
+and ``GET /calculations?limit=20`` for one user. Reports throughput and
+latency percentiles per mode.
+
+Both modes get a connection pool of ``pool`` connections (default: one per
+request in flight), so the sync routes are bounded by the 40-thread anyio
+pool and the async ones by the database pool. Keep ``pool`` at least
+``concurrency``: a sync request holds its connection until its dependency
+teardown, which runs only after the response has been serialized on the
+threadpool, so with more requests than connections the threads can all end
+up blocked on the pool while the connection holders wait for a thread.
+
+Run with ``python -m benchmarks.bench_db_modes [requests] [concurrency] [pool]``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import sys
+import time
+import uuid
+
+import httpx
+from fastapi import FastAPI
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import create_async_engine
+from sqlalchemy.pool import AsyncAdaptedQueuePool
+
+from app.api import async_routes
+from app.api import main as app_main
+from app.core import database
+
+
+def _configure_pools(pool: int) -> None:
+    url = app_main.engine.url
+    connect_args = {"check_same_thread": False} if url.get_backend_name() == "sqlite" else {}
+    app_main.SessionLocal.configure(
+        bind=create_engine(url, pool_size=pool, max_overflow=0, connect_args=connect_args)
+    )
+    async_url = database.async_database_url(url.render_as_string(hide_password=False))
+    # aiosqlite defaults to NullPool for files; pool it like the sync engine
+    async_engine = create_async_engine(async_url, poolclass=AsyncAdaptedQueuePool, pool_size=pool, max_overflow=0)
+    database.get_async_sessionmaker().configure(bind=async_engine)
+
+
+def _app(mode: str) -> FastAPI:
+    app = FastAPI()
+    app.router.routes.extend(app_main.app.router.routes)
+    if mode == "async":
+        async_routes.install(app)
+    return app
+
+
+async def _setup(client: httpx.AsyncClient) -> tuple[dict, list[int]]:
+    name = f"bench_{uuid.uuid4().hex[:8]}"
+    creds = {"username": name, "password": "pw"}
+    await client.post("/users/register", json={**creds, "email": f"{name}@example.com"})
+    token = (await client.post("/users/token", json=creds)).json()["access_token"]
+    headers = {"Authorization": f"Bearer {token}"}
+    items = [{"a": i, "b": 2, "type": "multiply"} for i in range(100)]
+    created = (await client.post("/calculations/batch", json=items, headers=headers)).json()["created"]
+    return headers, [c["id"] for c in created]
+
+
+async def _run(mode: str, requests: int, concurrency: int) -> tuple[float, list[float]]:
+    transport = httpx.ASGITransport(app=_app(mode))
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        headers, ids = await _setup(client)
+        latencies: list[float] = []
+        gate = asyncio.Semaphore(concurrency)
+
+        async def one(i: int):
+            url = f"/calculations/{ids[i % len(ids)]}" if i % 2 else "/calculations?limit=20"
+            async with gate:
+                start = time.perf_counter()
+                r = await client.get(url, headers=headers)
+                latencies.append((time.perf_counter() - start) * 1000)
+            r.raise_for_status()
+
+        start = time.perf_counter()
+        await asyncio.gather(*(one(i) for i in range(requests)))
+        elapsed = time.perf_counter() - start
+    if mode == "async":
+        # aiosqlite connections are threads bound to this event loop
+        await database.dispose_async_engine()
+    return requests / elapsed, sorted(latencies)
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    requests = int(argv[0]) if argv else 2000
+    concurrency = int(argv[1]) if len(argv) > 1 else 200
+    pool = int(argv[2]) if len(argv) > 2 else concurrency
+    logging.getLogger("calculator").setLevel(logging.WARNING)
+    _configure_pools(pool)
+    print(f"{requests} requests, {concurrency} in flight, {pool} connections")
+    print(f"{'mode':<6} {'req/s':>8} {'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+    for mode in ("sync", "async"):
+        rps, lat = asyncio.run(_run(mode, requests, concurrency))
+        p50, p95, p99 = (lat[int(len(lat) * q)] for q in (0.5, 0.95, 0.99))
+        print(f"{mode:<6} {rps:>8.0f} {p50:>8.1f} {p95:>8.1f} {p99:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
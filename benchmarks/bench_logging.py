@@ -0,0 +1,62 @@
+"""Request latency under each logging pipeline.
+
+Drives ``GET /add`` in-process with the result cache disabled, so every
+request logs through the calculator and access loggers, and writes the logs
+to a temporary file. Run with ``python -m benchmarks.bench_logging [requests]``.
+"""
+from __future__ import annotations
+
+import statistics
+import sys
+import tempfile
+import time
+
+from fastapi.testclient import TestClient
+
+from app.api import main as app_main
+from app.config.logging_config import configure_logging, logging_stats, shutdown_logging
+from app.core.cache import TTLCache
+
+MODES = {
+    "sync text": dict(mode="sync", fmt="text", sample_rates={}),
+    "sync json": dict(mode="sync", fmt="json", sample_rates={}),
+    "async text": dict(mode="async", fmt="text", sample_rates={}),
+    "async json": dict(mode="async", fmt="json", sample_rates={}),
+    "async text, sampled 1%": dict(
+        mode="async", fmt="text", sample_rates={"calculator.access": 0.01, "calculator.operations": 0.01}
+    ),
+}
+
+
+def _percentile(samples: list[float], pct: float) -> float:
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * pct / 100))]
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 2000
+    app_main.result_cache = TTLCache(maxsize=0)
+    client = TestClient(app_main.app)
+    print(f"{'mode':<24} {'p50 us':>8} {'p99 us':>8} {'mean us':>8} {'dropped':>8}")
+    with tempfile.TemporaryFile("w+") as sink:
+        for name, options in MODES.items():
+            configure_logging(stream=sink, force=True, **options)
+            for i in range(50):  # warm-up
+                client.get("/add", params={"a": i, "b": 1})
+            samples = []
+            for i in range(n):
+                start = time.perf_counter_ns()
+                client.get("/add", params={"a": i, "b": 1})
+                samples.append((time.perf_counter_ns() - start) / 1000)
+            dropped = logging_stats()["dropped"]
+            shutdown_logging()
+            print(
+                f"{name:<24} {_percentile(samples, 50):>8.0f} {_percentile(samples, 99):>8.0f} "
+                f"{statistics.fmean(samples):>8.0f} {dropped:>8}"
+            )
+    configure_logging(force=True)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,113 @@
+"""Latency of an authenticated calculation route during a login burst.
+
+Drives the app in-process through httpx's ASGI transport. A steady stream of
+``GET /calculations`` requests is timed while a burst of concurrent
+``POST /users/token`` logins runs, once per hashing setup:
+
+* ``anyio threadpool`` - what the old sync routes did (verify on the shared
+  anyio worker threads),
+* ``thread pool`` / ``process pool`` - the bounded ``PasswordHashPool``.
+
+Run with ``python -m benchmarks.bench_login_burst [logins] [workers]``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import statistics
+import sys
+import time
+import uuid
+
+import httpx
+from fastapi.concurrency import run_in_threadpool
+
+from app.api import main as app_main
+from app.auth.security import PasswordHasher, PasswordHashPool
+
+
+class AnyioThreadpoolHasher:
+    """Stand-in for the previous behaviour: hashing on the shared threadpool."""
+
+    def __init__(self, hasher: PasswordHasher):
+        self.hasher = hasher
+
+    async def hash(self, raw_password: str) -> str:
+        return await run_in_threadpool(self.hasher.hash, raw_password)
+
+    async def verify(self, raw_password: str, hashed: str) -> bool:
+        return await run_in_threadpool(self.hasher.verify, raw_password, hashed)
+
+    def stats(self) -> dict:
+        return {"running": 0, "queued": 0, "completed": 0, "rejected": 0}
+
+
+async def _scenario(client: httpx.AsyncClient, creds: dict, headers: dict, logins: int) -> tuple[list[float], int]:
+    samples: list[float] = []
+    burst_done = asyncio.Event()
+    statuses: list[int] = []
+
+    async def login():
+        r = await client.post("/users/token", json=creds)
+        statuses.append(r.status_code)
+
+    async def burst():
+        await asyncio.gather(*(login() for _ in range(logins)))
+        burst_done.set()
+
+    async def probe():
+        while not burst_done.is_set() or len(samples) < 20:
+            start = time.perf_counter()
+            await client.get("/calculations", headers=headers)
+            samples.append((time.perf_counter() - start) * 1000)
+
+    if logins:
+        await asyncio.gather(burst(), probe())
+    else:
+        burst_done.set()
+        await probe()
+    return samples, sum(1 for s in statuses if s == 503)
+
+
+async def _main(logins: int, workers: int) -> None:
+    transport = httpx.ASGITransport(app=app_main.app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        username = f"bench_{uuid.uuid4().hex[:8]}"
+        creds = {"username": username, "password": "pw"}
+        await client.post("/users/register", json={**creds, "email": f"{username}@example.com"})
+        tok = (await client.post("/users/token", json=creds)).json()["access_token"]
+        headers = {"Authorization": f"Bearer {tok}"}
+
+        setups = {
+            "no burst": (None, 0),
+            "anyio threadpool": (AnyioThreadpoolHasher(PasswordHasher()), logins),
+            "thread pool": (PasswordHashPool(PasswordHasher(), workers=workers, max_queue=logins), logins),
+            "process pool": (PasswordHashPool(PasswordHasher(), workers=workers, kind="process", max_queue=logins), logins),
+        }
+        print(f"{'setup':<18} {'p50 ms':>8} {'p99 ms':>8} {'max ms':>8} {'probes':>7} {'shed':>5}")
+        original = app_main.password_pool
+        for name, (pool, n) in setups.items():
+            if pool is not None:
+                app_main.password_pool = pool
+                await pool.verify("warm-up", PasswordHasher().hash("warm-up"))
+            samples, shed = await _scenario(client, creds, headers, n)
+            samples.sort()
+            print(
+                f"{name:<18} {statistics.median(samples):>8.2f} {samples[int(len(samples) * 0.99)]:>8.2f} "
+                f"{samples[-1]:>8.2f} {len(samples):>7} {shed:>5}"
+            )
+            if isinstance(pool, PasswordHashPool):
+                pool.shutdown()
+        app_main.password_pool = original
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    logins = int(argv[0]) if argv else 200
+    workers = int(argv[1]) if len(argv) > 1 else 2
+    logging.getLogger("calculator").setLevel(logging.WARNING)
+    asyncio.run(_main(logins, workers))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,124 @@
+"""Overhead of the request middleware, measured by calling the ASGI app directly.
+
+Compares a bare FastAPI app against the old ``@app.middleware("http")``
+(``BaseHTTPMiddleware``) wrapper and the pure ASGI access-log and metrics
+middleware. Log output is silenced so only the wrapper cost is measured.
+Run with ``python -m benchmarks.bench_metrics_middleware [requests]``.
+"""
+from __future__ import annotations
+
+import asyncio
+import logging
+import statistics
+import sys
+import time
+
+from fastapi import FastAPI, Request
+
+from app.api.metrics import MetricsRegistry
+from app.api.middleware import AccessLogMiddleware, MetricsMiddleware
+
+
+def _base_app() -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/ping")
+    async def ping():
+        return {"ok": True}
+
+    return app
+
+
+def bare() -> FastAPI:
+    return _base_app()
+
+
+def base_http_middleware() -> FastAPI:
+    """The previous ``log_requests`` wrapper."""
+    app = _base_app()
+    log = logging.getLogger("calculator")
+
+    @app.middleware("http")
+    async def log_requests(request: Request, call_next):
+        start = time.time()
+        log.info("Incoming request %s %s", request.method, request.url)
+        response = await call_next(request)
+        log.info("Completed %s %s with status=%s in %.3fs", request.method, request.url,
+                 response.status_code, time.time() - start)
+        return response
+
+    return app
+
+
+def pure_asgi() -> FastAPI:
+    app = _base_app()
+    app.add_middleware(AccessLogMiddleware)
+    app.add_middleware(MetricsMiddleware, registry=MetricsRegistry())
+    return app
+
+
+def metrics_only() -> FastAPI:
+    app = _base_app()
+    app.add_middleware(MetricsMiddleware, registry=MetricsRegistry())
+    return app
+
+
+SCOPE = {
+    "type": "http",
+    "asgi": {"version": "3.0"},
+    "http_version": "1.1",
+    "method": "GET",
+    "scheme": "http",
+    "path": "/ping",
+    "raw_path": b"/ping",
+    "root_path": "",
+    "query_string": b"",
+    "headers": [(b"host", b"bench")],
+    "client": ("127.0.0.1", 1),
+    "server": ("bench", 80),
+}
+
+
+async def _run(app, n: int) -> list[float]:
+    async def send(message):
+        pass
+
+    samples = []
+    for i in range(n + 200):
+        messages = iter([{"type": "http.request", "body": b"", "more_body": False}])
+
+        async def receive(messages=messages):
+            message = next(messages, None)
+            if message is None:  # client stays connected until cancelled
+                await asyncio.Future()
+            return message
+
+        start = time.perf_counter_ns()
+        # run each request in its own task, as servers do; BaseHTTPMiddleware
+        # relies on that to cancel its pending receive()
+        await asyncio.create_task(app(dict(SCOPE), receive, send))
+        if i >= 200:  # warm-up
+            samples.append((time.perf_counter_ns() - start) / 1000)
+    return samples
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 5000
+    logging.getLogger("calculator").setLevel(logging.WARNING)
+    variants = {
+        "bare app": bare,
+        "BaseHTTPMiddleware (before)": base_http_middleware,
+        "pure ASGI log + metrics": pure_asgi,
+        "metrics middleware only": metrics_only,
+    }
+    print(f"{'variant':<30} {'p50 us':>8} {'p99 us':>8} {'mean us':>8}")
+    for name, factory in variants.items():
+        samples = sorted(asyncio.run(_run(factory(), n)))
+        p50 = samples[len(samples) // 2]
+        p99 = samples[int(len(samples) * 0.99)]
+        print(f"{name:<30} {p50:>8.1f} {p99:>8.1f} {statistics.fmean(samples):>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
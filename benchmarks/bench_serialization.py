@@ -0,0 +1,104 @@
+"""Encoding a page of calculations: response_model path vs. app.api.responses.
+
+Selects ``rows`` calculation rows (default 10,000) into an in-memory SQLite
+database and times turning them into response bytes two ways:
+
+* ``response_model``: what ``GET /calculations`` used to do - dicts from the
+  rows, re-validated by FastAPI against ``List[CalculationRead]``, passed
+  through ``jsonable_encoder`` and the stdlib ``json`` encoder.
+* ``calculation_rows_json``: one validation with the cached ``TypeAdapter``
+  and pydantic-core encoding straight to bytes.
+
+Also reports the same two paths end to end, through a ``TestClient`` request
+to a route returning each. Run with
+``python -m benchmarks.bench_serialization [rows]``.
+"""
+from __future__ import annotations
+
+import asyncio
+import json
+import sys
+import time
+from typing import List
+
+from fastapi import FastAPI
+from fastapi.routing import serialize_response
+from fastapi.testclient import TestClient
+from fastapi.utils import create_response_field
+from sqlalchemy import create_engine, insert, select
+from sqlalchemy.orm import Session
+
+from app.api.responses import RawJSONResponse, calculation_rows_json
+from app.api.schemas import CalculationRead
+from app.core import models
+
+FIELDS = tuple(CalculationRead.model_fields)
+
+
+def make_rows(n: int):
+    engine = create_engine("sqlite://")
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        db.add(models.User(id=1, username="bench", email="bench@example.com", password_hash="x"))
+        db.flush()
+        values = [{"a": i, "b": 2.5, "type": "multiply", "result": i * 2.5, "user_id": 1} for i in range(n)]
+        db.execute(insert(models.Calculation), values)
+        columns = [getattr(models.Calculation, f) for f in FIELDS]
+        return db.execute(select(*columns).order_by(models.Calculation.id)).all()
+
+
+def response_model_bytes(rows, field) -> bytes:
+    items = [{f: getattr(row, f) for f in FIELDS} for row in rows]
+    content = asyncio.run(serialize_response(field=field, response_content=items))
+    return json.dumps(content, ensure_ascii=False, allow_nan=False, separators=(",", ":")).encode("utf-8")
+
+
+def _app(rows) -> FastAPI:
+    app = FastAPI()
+
+    @app.get("/response_model", response_model=List[CalculationRead])
+    def old():
+        return [{f: getattr(row, f) for f in FIELDS} for row in rows]
+
+    @app.get("/calculation_rows_json", response_model=List[CalculationRead])
+    def new():
+        return RawJSONResponse(calculation_rows_json(rows))
+
+    return app
+
+
+def _best_of(fn, repeat: int = 5) -> float:
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 10_000
+    rows = make_rows(n)
+    field = create_response_field(name="Response_bench", type_=List[CalculationRead])
+    assert json.loads(response_model_bytes(rows, field)) == json.loads(calculation_rows_json(rows))
+
+    client = TestClient(_app(rows))
+    cases = {
+        "encode: response_model": lambda: response_model_bytes(rows, field),
+        "encode: calculation_rows_json": lambda: calculation_rows_json(rows),
+        "request: response_model": lambda: client.get("/response_model"),
+        "request: calculation_rows_json": lambda: client.get("/calculation_rows_json"),
+    }
+    print(f"{n} rows")
+    print(f"{'case':<32} {'ms':>8} {'speedup':>8}")
+    baseline = None
+    for name, fn in cases.items():
+        elapsed = _best_of(fn)
+        if name.endswith("response_model"):
+            baseline = elapsed
+        print(f"{name:<32} {elapsed * 1000:>8.1f} {baseline / elapsed:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
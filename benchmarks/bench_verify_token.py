@@ -0,0 +1,32 @@
+"""Cost of a full JWT verification vs. a verified-token cache hit.
+
+Run with ``python -m benchmarks.bench_verify_token [iterations]``.
+"""
+from __future__ import annotations
+
+import sys
+import timeit
+
+from app.auth import security
+
+
+def main(argv: list[str] | None = None) -> None:
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 20000
+    tok = security.create_token({"sub": "bench", "uid": 1})
+    security.verify_token(tok)  # prime the cache
+
+    cases = {
+        "jwt.decode (no cache)": lambda: security.verify_token(tok, secret=security._JWT_SECRET),
+        "verify_token cache hit": lambda: security.verify_token(tok),
+    }
+    baseline = None
+    print(f"{'case':<26} {'us/call':>8} {'speedup':>8}")
+    for name, fn in cases.items():
+        per_call = min(timeit.repeat(fn, number=n, repeat=5)) / n * 1e6
+        baseline = baseline or per_call
+        print(f"{name:<26} {per_call:>8.2f} {baseline / per_call:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,247 @@
+"""Benchmark suite: every endpoint plus the core functions, with baselines.
+
+Endpoints are driven in-process, one request at a time, through httpx's ASGI
+transport against ``app.api.main.app`` on a throwaway SQLite database, so
+the suite runs offline and never touches ``DATABASE_URL``. Micro-benchmarks
+cover ``calculator.add``..``div``, ``CalculationFactory.get``,
+``hash_password``/``verify_password`` and ``create_token``/``verify_token``
+(a cache hit, and a full check with an explicit secret).
+
+Each case reports mean, p50 and p95 seconds per call. Results can be saved
+as a JSON baseline and later runs compared against it: a case whose p50 is
+more than ``--threshold`` (default 0.25, i.e. 25%) slower than the baseline
+is a regression, and the run exits with status 1. Baselines are only
+comparable on the same machine and configuration; record one per machine::
+
+    python -m benchmarks.suite --save benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json --threshold 0.3
+    python -m benchmarks.suite -k calculations --iterations 500
+"""
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Awaitable, Callable
+
+DEFAULT_ITERATIONS = 200
+DEFAULT_THRESHOLD = 0.25
+WARMUP = 3
+# password hashing is deliberately slow; these cases run 1/10 of the iterations
+SLOW_CASES = ("hash_password", "verify_password", "POST /users/register", "POST /users/token", "POST /users/login")
+
+
+def _summary(samples: list[float]) -> dict:
+    ordered = sorted(samples)
+    return {
+        "iterations": len(ordered),
+        "mean_s": statistics.fmean(ordered),
+        "p50_s": ordered[len(ordered) // 2],
+        "p95_s": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+
+
+def _iterations(name: str, iterations: int) -> int:
+    return max(5, iterations // 10) if name in SLOW_CASES else iterations
+
+
+def _time_sync(fn: Callable[[int], object], n: int) -> list[float]:
+    for i in range(WARMUP):
+        fn(i)
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        fn(WARMUP + i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+async def _time_async(fn: Callable[[int], Awaitable[object]], n: int) -> list[float]:
+    for i in range(WARMUP):
+        await fn(i)
+    samples = []
+    for i in range(n):
+        start = time.perf_counter()
+        await fn(WARMUP + i)
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+def micro_cases() -> dict[str, Callable[[int], object]]:
+    from app.auth import security
+    from app.core import calculator
+    from app.core.factory import CalculationFactory
+
+    factory = CalculationFactory()
+    hashed = security.hash_password("bench-password")
+    token = security.create_token({"sub": "bench", "uid": 1})
+    return {
+        "calculator.add": lambda i: calculator.add(i, 2.5),
+        "calculator.sub": lambda i: calculator.sub(i, 2.5),
+        "calculator.mul": lambda i: calculator.mul(i, 2.5),
+        "calculator.div": lambda i: calculator.div(i, 2.5),
+        "CalculationFactory.get": lambda i: factory.get(("add", "subtract", "multiply", "divide")[i % 4]),
+        "hash_password": lambda i: security.hash_password("bench-password"),
+        "verify_password": lambda i: security.verify_password("bench-password", hashed),
+        "create_token": lambda i: security.create_token({"sub": "bench", "uid": 1}),
+        "verify_token (cached)": lambda i: security.verify_token(token),
+        "verify_token (uncached)": lambda i: security.verify_token(token, secret=security._JWT_SECRET),
+    }
+
+
+def _ok(response) -> None:
+    response.raise_for_status()
+
+
+async def _endpoint_results(selected: Callable[[str], bool], iterations: int) -> dict[str, dict]:
+    import httpx
+
+    from app.api.main import app
+
+    results: dict[str, dict] = {}
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://bench") as client:
+        name = f"bench_{uuid.uuid4().hex[:8]}"
+        creds = {"username": name, "password": "bench-password"}
+
+        async def login(username: str) -> dict:
+            user = {"username": username, "password": "bench-password"}
+            _ok(await client.post("/users/register", json={**user, "email": f"{username}@example.com"}))
+            token = (await client.post("/users/token", json=user)).json()["access_token"]
+            return {"Authorization": f"Bearer {token}"}
+
+        # reads run against a fixed 100-row history; writes that add rows go
+        # to a second user so they don't grow it
+        auth = await login(name)
+        writer = await login(f"{name}_writer")
+        seed = [{"a": i, "b": 2, "type": "multiply"} for i in range(100)]
+        ids = [c["id"] for c in (await client.post("/calculations/batch", json=seed, headers=auth)).json()["created"]]
+
+        async def register(i: int):
+            user = f"{name}_{i}"
+            _ok(await client.post("/users/register", json={"username": user, "email": f"{user}@example.com", "password": "pw"}))
+
+        async def delete(i: int):
+            created = await client.post("/calculations", json={"a": i, "b": 1, "type": "add"}, headers=writer)
+            _ok(await client.delete(f"/calculations/{created.json()['id']}", headers=writer))
+
+        cases: dict[str, Callable[[int], Awaitable[object]]] = {
+            "GET /add": lambda i: client.get("/add", params={"a": i, "b": 2}),
+            "GET /sub": lambda i: client.get("/sub", params={"a": i, "b": 2}),
+            "GET /mul": lambda i: client.get("/mul", params={"a": i, "b": 2}),
+            "GET /div": lambda i: client.get("/div", params={"a": i, "b": 2}),
+            "GET /metrics": lambda i: client.get("/metrics"),
+            "POST /users/register": register,
+            "POST /users/token": lambda i: client.post("/users/token", json=creds),
+            "POST /users/login": lambda i: client.post("/users/login", json=creds),
+            "POST /calculations": lambda i: client.post("/calculations", json={"a": i, "b": 3, "type": "add"}, headers=writer),
+            "POST /calculations/batch (100)": lambda i: client.post("/calculations/batch", json=seed, headers=writer),
+            "GET /calculations": lambda i: client.get("/calculations", params={"limit": 100}, headers=auth),
+            "GET /calculations/{id}": lambda i: client.get(f"/calculations/{ids[i % len(ids)]}", headers=auth),
+            "PUT /calculations/{id}": lambda i: client.put(
+                f"/calculations/{ids[i % len(ids)]}", json={"a": i, "b": 4, "type": "subtract"}, headers=auth
+            ),
+            "POST+DELETE /calculations/{id}": delete,
+            "GET /calculations/stats": lambda i: client.get("/calculations/stats", headers=auth),
+            "GET /calculations/export": lambda i: client.get("/calculations/export", headers=auth),
+        }
+        for case, fn in cases.items():
+            if not selected(case):
+                continue
+
+            async def checked(i: int, fn=fn):
+                response = await fn(i)
+                if response is not None:
+                    _ok(response)
+
+            results[case] = _summary(await _time_async(checked, _iterations(case, iterations)))
+    return results
+
+
+def run(selected: Callable[[str], bool], iterations: int) -> dict[str, dict]:
+    import app.api.main  # noqa: F401  configures logging on import
+
+    # keep per-call INFO logs (calculator.operations, access logs) out of the timings
+    logging.getLogger("calculator").setLevel(logging.WARNING)
+    results = {
+        name: _summary(_time_sync(fn, _iterations(name, iterations)))
+        for name, fn in micro_cases().items()
+        if selected(name)
+    }
+    results.update(asyncio.run(_endpoint_results(selected, iterations)))
+    return results
+
+
+def compare(baseline: dict[str, dict], current: dict[str, dict], threshold: float) -> list[tuple[str, float, float]]:
+    """``(case, baseline p50, current p50)`` for every case slower than allowed."""
+    regressions = []
+    for name, result in current.items():
+        base = baseline.get(name)
+        if base and result["p50_s"] > base["p50_s"] * (1 + threshold):
+            regressions.append((name, base["p50_s"], result["p50_s"]))
+    return regressions
+
+
+def save_baseline(path: Path, results: dict[str, dict]) -> None:
+    document = {
+        "created": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "results": results,
+    }
+    path.write_text(json.dumps(document, indent=2) + "\n")
+
+
+def load_baseline(path: Path) -> dict[str, dict]:
+    return json.loads(path.read_text())["results"]
+
+
+def _print_table(results: dict[str, dict], baseline: dict[str, dict]) -> None:
+    print(f"{'case':<34} {'n':>5} {'mean us':>10} {'p50 us':>10} {'p95 us':>10} {'vs base':>8}")
+    for name, r in results.items():
+        base = baseline.get(name)
+        change = f"{r['p50_s'] / base['p50_s'] - 1:>+7.0%}" if base else f"{'-':>7}"
+        print(
+            f"{name:<34} {r['iterations']:>5} {r['mean_s'] * 1e6:>10.1f} {r['p50_s'] * 1e6:>10.1f} "
+            f"{r['p95_s'] * 1e6:>10.1f} {change:>8}"
+        )
+
+
+def main(argv: list[str] | None = None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("-k", dest="pattern", help="only run cases whose name contains this substring")
+    parser.add_argument("--iterations", type=int, default=DEFAULT_ITERATIONS, help="timed calls per case")
+    parser.add_argument("--baseline", type=Path, help="JSON baseline to compare against")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD, help="allowed p50 slowdown (0.25 = 25%%)")
+    parser.add_argument("--save", type=Path, help="write this run's results as a JSON baseline")
+    args = parser.parse_args(argv)
+
+    with tempfile.TemporaryDirectory() as tmp:
+        # must be set before the app (and its engine) is imported
+        os.environ["DATABASE_URL"] = f"sqlite:///{Path(tmp) / 'bench.db'}"
+        results = run(lambda name: not args.pattern or args.pattern in name, args.iterations)
+
+    baseline = load_baseline(args.baseline) if args.baseline else {}
+    _print_table(results, baseline)
+    if args.save:
+        save_baseline(args.save, results)
+        print(f"saved baseline to {args.save}")
+
+    regressions = compare(baseline, results, args.threshold)
+    for name, base, now in regressions:
+        print(f"REGRESSION {name}: p50 {base * 1e6:.1f} us -> {now * 1e6:.1f} us (+{now / base - 1:.0%})")
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,118 @@
+import asyncio
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app.api import async_routes
+from app.core import database
+from app.core.database import async_database_url
+
+
+@pytest.fixture(autouse=True)
+def sqlite_async_engine(monkeypatch):
+    # app.core.database may have been reloaded with another URL by other tests;
+    # point the async engine at the database main's sync engine uses
+    from app.api.main import engine
+
+    monkeypatch.setattr(database, "SQLALCHEMY_DATABASE_URL", engine.url.render_as_string(hide_password=False))
+    monkeypatch.setattr(database, "_async_sessionmaker", None)
+
+
+def _client():
+    app = FastAPI()
+    async_routes.install(app)
+    return TestClient(app)
+
+
+def test_async_database_url():
+    assert async_database_url("sqlite:///./test.db") == "sqlite+aiosqlite:///./test.db"
+    assert (
+        async_database_url("postgresql+psycopg2://u:p@db:5432/app")
+        == "postgresql+asyncpg://u:p@db:5432/app"
+    )
+    with pytest.raises(ValueError):
+        async_database_url("mysql://u:p@db/app")
+
+
+def test_install_replaces_sync_routes():
+    from app.api.main import app as sync_app
+
+    app = FastAPI()
+    app.router.routes.extend(sync_app.router.routes)
+    async_routes.install(app)
+    endpoints = {(r.path, m): r.endpoint for r in app.routes if hasattr(r, "methods") for m in r.methods}
+    assert endpoints[("/calculations/{calc_id}", "GET")] is async_routes.get_calculation
+    assert endpoints[("/users/register", "POST")] is async_routes.register_user
+    # routes without an async version stay
+    assert endpoints[("/calculations/export", "GET")].__module__ == "app.api.main"
+    assert len([k for k in endpoints if k == ("/calculations", "GET")]) == 1
+
+
+def test_async_user_and_calculation_flow():
+    unique = uuid4().hex[:8]
+    user = {"username": f"async_{unique}", "email": f"async_{unique}@example.com", "password": "pw"}
+    with _client() as client:
+        r = client.post("/users/register", json=user)
+        assert r.status_code == 200
+        assert r.json()["created_at"]
+        assert client.post("/users/register", json=user).status_code == 400
+
+        assert client.post("/users/token", json={"username": user["username"], "password": "nope"}).status_code == 401
+        assert client.post("/users/login", json={"username": "missing", "password": "pw"}).status_code == 401
+        assert client.post("/users/login", json={"username": user["username"], "password": "pw"}).status_code == 200
+        tok = client.post("/users/token", json={"username": user["username"], "password": "pw"}).json()["access_token"]
+        headers = {"Authorization": f"Bearer {tok}"}
+
+        calc = client.post("/calculations", json={"a": 6, "b": 3, "type": "divide"}, headers=headers).json()
+        assert calc["result"] == 2
+        batch = client.post(
+            "/calculations/batch",
+            json=[{"a": 1, "b": 2, "type": "add"}, {"a": 1, "b": 0, "type": "divide"}],
+            headers=headers,
+        ).json()
+        assert [c["result"] for c in batch["created"]] == [3]
+        assert [e["index"] for e in batch["errors"]] == [1]
+
+        r = client.get("/calculations", params={"limit": 1}, headers=headers)
+        assert [c["id"] for c in r.json()] == [calc["id"]]
+        r = client.get("/calculations", params={"cursor": r.headers["x-next-cursor"]}, headers=headers)
+        assert [c["id"] for c in r.json()] == [batch["created"][0]["id"]]
+
+        stats = client.get("/calculations/stats", headers=headers).json()
+        assert [(t["type"], t["count"], t["total"]) for t in stats["types"]] == [("add", 1, 3.0), ("divide", 1, 2.0)]
+        assert client.get("/calculations/stats", params={"source": "live"}, headers=headers).json() == stats
+
+        url = f"/calculations/{calc['id']}"
+        assert client.get(url, headers=headers).json() == calc
+        r = client.put(url, json={"a": 2, "b": 5, "type": "multiply"}, headers=headers)
+        assert r.json()["result"] == 10
+        assert client.delete(url, headers=headers).status_code == 204
+        assert client.get(url, headers=headers).status_code == 404
+        assert client.delete(url, headers=headers).status_code == 404
+
+        assert client.get("/calculations").status_code == 401
+        assert client.get("/calculations", headers={"Authorization": "Bearer junk"}).status_code == 401
+
+
+def test_concurrent_first_requests_create_the_schema_once(monkeypatch, tmp_path):
+    from sqlalchemy.ext.asyncio import create_async_engine
+
+    created = []
+    create_schema = database._create_schema
+
+    def counting(connection):
+        created.append(1)
+        create_schema(connection)
+
+    monkeypatch.setattr(database, "_create_schema", counting)
+    monkeypatch.setattr(database, "_schema_ready", False)
+
+    async def first_requests():
+        engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'schema.db'}")
+        await asyncio.gather(*(database.ensure_schema_async(engine) for _ in range(5)))
+        await engine.dispose()
+
+    asyncio.run(first_requests())
+    assert created == [1] and database._schema_ready
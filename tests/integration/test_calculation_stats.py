@@ -0,0 +1,83 @@
+"""The trigger-maintained calculation_stats table and its GROUP BY fallback."""
+from sqlalchemy import create_engine, insert, text, update
+from sqlalchemy.orm import Session
+
+from app.core import models, stats
+
+
+def _session(tmp_path) -> Session:
+    engine = create_engine(f"sqlite:///{tmp_path / 'stats.db'}")
+    models.Base.metadata.create_all(engine)
+    db = Session(engine)
+    db.add_all([models.User(id=uid, username=f"s{uid}", email=f"s{uid}@example.com", password_hash="x") for uid in (1, 2)])
+    db.flush()
+    return db
+
+
+def test_triggers_track_bulk_and_raw_writes(tmp_path):
+    with _session(tmp_path) as db:
+        rows = [{"a": i, "b": 1, "type": "add", "result": i + 1.0, "user_id": 1 + i % 2} for i in range(10)]
+        rows.append({"a": 1, "b": 1, "type": "add", "result": None, "user_id": None})
+        db.execute(insert(models.Calculation), rows)
+        db.execute(update(models.Calculation).where(models.Calculation.result > 8).values(type="multiply"))
+        db.execute(text("DELETE FROM calculations WHERE result = 1"))
+        db.execute(insert(models.Calculation), [{"a": 0, "b": 0, "type": "add", "result": None, "user_id": 2}])
+
+        assert stats.verify(db) == []
+        summary = {(r.user_id, r.type): tuple(r)[2:] for r in db.execute(stats.summary_stats_stmt())}
+        assert summary == {
+            (1, "add"): (3, 15.0, 3.0, 7.0),
+            (1, "multiply"): (1, 9.0, 9.0, 9.0),
+            (2, "add"): (5, 20.0, 2.0, 8.0),
+            (2, "multiply"): (1, 10.0, 10.0, 10.0),
+        }
+        assert [tuple(r) for r in db.execute(stats.summary_stats_stmt(2))][0] == (2, "add", 5, 20.0, 2.0, 8.0)
+
+
+def test_verify_reports_drift_and_rebuild_repairs_it(tmp_path):
+    with _session(tmp_path) as db:
+        db.execute(insert(models.Calculation), [{"a": 1, "b": 1, "type": "add", "result": 2.0, "user_id": 1}])
+        db.execute(text("UPDATE calculation_stats SET count = 7"))
+        db.execute(text("INSERT INTO calculation_stats VALUES (2, 'divide', 1, 1.0, 1.0, 1.0)"))
+
+        mismatches = stats.verify(db)
+        assert [(uid, calc_type) for uid, calc_type, *_ in mismatches] == [(1, "add"), (2, "divide")]
+        assert mismatches[1][3] is None
+
+        assert stats.rebuild(db) == 1
+        assert stats.verify(db) == []
+
+
+def test_create_all_backfills_stats_for_an_existing_database(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'old.db'}")
+    # a database from before calculation_stats existed (Table.create skips the metadata's trigger DDL)
+    models.User.__table__.create(engine)
+    models.Calculation.__table__.create(engine)
+    with Session(engine) as db:
+        db.add(models.User(id=1, username="old", email="old@example.com", password_hash="x"))
+        db.execute(insert(models.Calculation), [{"a": i, "b": 1, "type": "add", "result": i + 1.0, "user_id": 1} for i in range(3)])
+        db.commit()
+
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        assert [tuple(r)[1:] for r in db.execute(stats.summary_stats_stmt(1))] == [("add", 3, 6.0, 1.0, 3.0)]
+        db.execute(insert(models.Calculation), [{"a": 9, "b": 1, "type": "add", "result": 10.0, "user_id": 1}])
+        db.execute(text("DELETE FROM calculations WHERE result = 1"))
+        assert stats.verify(db) == []
+
+    # running create_all again leaves the populated table alone
+    models.Base.metadata.create_all(engine)
+    with Session(engine) as db:
+        assert stats.verify(db) == []
+
+
+def test_cli_verify_and_rebuild(monkeypatch, capsys):
+    from app.api.main import SessionLocal, engine, ensure_schema
+
+    # app.core.database may have been reloaded with another URL by other tests
+    monkeypatch.setattr("app.core.database.SessionLocal", SessionLocal)
+    monkeypatch.setattr("app.core.database.ensure_schema", lambda: ensure_schema(engine))
+    assert stats.main(["rebuild"]) == 0
+    assert stats.main(["verify"]) == 0
+    out = capsys.readouterr().out
+    assert "rebuilt calculation_stats" in out and "0 mismatched rows" in out
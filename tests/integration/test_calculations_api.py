@@ -1,3 +1,5 @@
+import json
+import base64
 from uuid import uuid4
 
 from fastapi.testclient import TestClient
@@ -62,3 +64,191 @@ def test_calculation_crud_flow():
     # ensure gone
     r = client.get(f"/calculations/{calc_id}", headers=headers)
     assert r.status_code == 404
+
+
+def test_calculation_batch_create_reports_per_item_errors():
+    unique = uuid4().hex[:8]
+    username = f"u_{unique}"
+    r = client.post("/users/register", json={"username": username, "email": f"{unique}@example.com", "password": "pw"})
+    assert r.status_code == 200
+    headers = {"Authorization": f"Bearer {get_token(username, 'pw')}"}
+
+    items = [
+        {"a": 1, "b": 2, "type": "add"},
+        {"a": 1, "b": 0, "type": "divide"},
+        {"a": 6, "b": 3, "type": "Divide"},
+        {"a": 1, "b": 2, "type": "noop"},
+        {"a": 4, "b": 5, "type": "multiply"},
+        5,
+    ]
+    r = client.post("/calculations/batch", json=items, headers=headers)
+    assert r.status_code == 200
+    body = r.json()
+    assert [c["result"] for c in body["created"]] == [3, 2, 20]
+    assert [c["type"] for c in body["created"]] == ["add", "divide", "multiply"]
+    assert [e["index"] for e in body["errors"]] == [1, 3, 5]
+    assert "division by zero" in body["errors"][0]["detail"]
+
+    listed = {c["id"] for c in client.get("/calculations", headers=headers).json()}
+    assert {c["id"] for c in body["created"]} <= listed
+
+
+def test_calculation_batch_all_invalid_and_too_large(monkeypatch):
+    from app.api import main
+
+    unique = uuid4().hex[:8]
+    username = f"u_{unique}"
+    client.post("/users/register", json={"username": username, "email": f"{unique}@example.com", "password": "pw"})
+    headers = {"Authorization": f"Bearer {get_token(username, 'pw')}"}
+
+    r = client.post("/calculations/batch", json=[{"a": 1, "type": "add"}, 5, None], headers=headers)
+    assert r.status_code == 200
+    assert r.json()["created"] == []
+    errors = r.json()["errors"]
+    assert [e["index"] for e in errors] == [0, 1, 2]
+    assert errors[0]["detail"] == "b: Field required"
+    assert errors[1]["detail"] == errors[2]["detail"] == "item must be a JSON object"
+
+    monkeypatch.setattr(main, "MAX_BATCH_SIZE", 1)
+    r = client.post("/calculations/batch", json=[{"a": 1, "b": 1, "type": "add"}] * 2, headers=headers)
+    assert r.status_code == 400
+
+
+def _new_user_headers():
+    unique = uuid4().hex[:8]
+    username = f"u_{unique}"
+    client.post("/users/register", json={"username": username, "email": f"{unique}@example.com", "password": "pw"})
+    return {"Authorization": f"Bearer {get_token(username, 'pw')}"}
+
+
+def test_list_calculations_keyset_pagination():
+    headers = _new_user_headers()
+    items = [{"a": i, "b": 1, "type": "add"} for i in range(5)]
+    created = client.post("/calculations/batch", json=items, headers=headers).json()["created"]
+    ids = [c["id"] for c in created]
+
+    seen = []
+    cursor = None
+    pages = 0
+    while True:
+        params = {"limit": 2}
+        if cursor:
+            params["cursor"] = cursor
+        r = client.get("/calculations", params=params, headers=headers)
+        assert r.status_code == 200
+        seen += [c["id"] for c in r.json()]
+        pages += 1
+        cursor = r.headers.get("x-next-cursor")
+        if not cursor:
+            assert "link" not in r.headers
+            break
+        assert 'rel="next"' in r.headers["link"]
+    assert seen == ids
+    assert pages == 3
+
+    # a page that exactly fits has no next cursor
+    r = client.get("/calculations", params={"limit": 5}, headers=headers)
+    assert len(r.json()) == 5
+    assert "x-next-cursor" not in r.headers
+
+
+def test_list_calculations_projection_and_validation():
+    headers = _new_user_headers()
+    client.post("/calculations", json={"a": 2, "b": 3, "type": "multiply"}, headers=headers)
+    client.post("/calculations", json={"a": 2, "b": 3, "type": "add"}, headers=headers)
+
+    r = client.get("/calculations", params={"fields": "result, type", "limit": 1}, headers=headers)
+    assert r.status_code == 200
+    assert r.json() == [{"result": 6, "type": "multiply"}]
+    next_url = r.headers["link"].split(">")[0].lstrip("<")
+    assert " " not in next_url and "fields=result%2C+type" in next_url
+    following = client.get(next_url, headers=headers)
+    assert following.json() == [{"result": 5, "type": "add"}]
+
+    assert client.get("/calculations", params={"fields": "result,password"}, headers=headers).status_code == 400
+    assert client.get("/calculations", params={"fields": ","}, headers=headers).status_code == 400
+    assert client.get("/calculations", params={"cursor": "not-a-cursor"}, headers=headers).status_code == 400
+    bad_type = base64.urlsafe_b64encode(b'{"after": "x"}').decode()
+    assert client.get("/calculations", params={"cursor": bad_type}, headers=headers).status_code == 400
+    assert client.get("/calculations", params={"limit": 0}, headers=headers).status_code == 422
+    assert client.get("/calculations", params={"limit": 100000}, headers=headers).status_code == 422
+
+
+def test_export_calculations_ndjson_and_csv():
+    headers = _new_user_headers()
+    items = [{"a": 1, "b": 2, "type": "add"}, {"a": 6, "b": 3, "type": "divide"}]
+    created = client.post("/calculations/batch", json=items, headers=headers).json()["created"]
+
+    r = client.get("/calculations/export", headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"] == "application/x-ndjson"
+    assert [json.loads(line) for line in r.text.splitlines()] == created
+
+    r = client.get("/calculations/export", params={"format": "csv"}, headers=headers)
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/csv")
+    assert 'filename="calculations.csv"' in r.headers["content-disposition"]
+    lines = r.text.splitlines()
+    assert lines[0] == "id,a,b,type,result,user_id"
+    assert lines[2] == f"{created[1]['id']},6.0,3.0,divide,2.0,{created[1]['user_id']}"
+
+    assert client.get("/calculations/export", params={"format": "xml"}, headers=headers).status_code == 422
+    assert client.get("/calculations/export").status_code in (401, 403)
+
+
+def test_calculation_stats_follow_every_write():
+    headers = _new_user_headers()
+    empty = client.get("/calculations/stats", headers=headers).json()
+    assert empty == {"count": 0, "types": []}
+
+    first = client.post("/calculations", json={"a": 1, "b": 2, "type": "add"}, headers=headers).json()
+    items = [{"a": 5, "b": 5, "type": "add"}, {"a": 2, "b": 4, "type": "multiply"}, {"a": 9, "b": 3, "type": "divide"}]
+    created = client.post("/calculations/batch", json=items, headers=headers).json()["created"]
+    # add: 3, 10; multiply: 8; divide: 3 -> move the divide to multiply (4 * 3 = 12)
+    client.put(f"/calculations/{created[2]['id']}", json={"a": 4, "b": 3, "type": "multiply"}, headers=headers)
+    # dropping the add minimum forces it to be recomputed
+    assert client.delete(f"/calculations/{first['id']}", headers=headers).status_code == 204
+
+    summary = client.get("/calculations/stats", headers=headers).json()
+    assert summary == {
+        "count": 3,
+        "types": [
+            {"type": "add", "count": 1, "total": 10.0, "minimum": 10.0, "maximum": 10.0, "mean": 10.0},
+            {"type": "multiply", "count": 2, "total": 20.0, "minimum": 8.0, "maximum": 12.0, "mean": 10.0},
+        ],
+    }
+    assert client.get("/calculations/stats", params={"source": "live"}, headers=headers).json() == summary
+    assert client.get("/calculations/stats", params={"source": "cache"}, headers=headers).status_code == 422
+    assert client.get("/calculations/stats").status_code in (401, 403)
+
+
+def test_calculation_mutations_are_single_statements():
+    from sqlalchemy import event
+
+    from app.api.main import engine
+
+    headers = _new_user_headers()
+    other = _new_user_headers()
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if "calculations" in statement and "calculation_stats" not in statement:
+            statements.append(statement.split()[0])
+
+    event.listen(engine, "before_cursor_execute", record)
+    try:
+        calc = client.post("/calculations", json={"a": 2, "b": 5, "type": "multiply"}, headers=headers).json()
+        assert calc["result"] == 10
+        r = client.put(f"/calculations/{calc['id']}", json={"a": 9, "b": 3, "type": "DIVIDE"}, headers=headers)
+        assert r.json() == {**calc, "a": 9, "b": 3, "type": "divide", "result": 3}
+        assert client.delete(f"/calculations/{calc['id']}", headers=headers).status_code == 204
+        assert statements == ["INSERT", "UPDATE", "DELETE"]
+    finally:
+        event.remove(engine, "before_cursor_execute", record)
+
+    # someone else's calculation is indistinguishable from a missing one
+    theirs = client.post("/calculations", json={"a": 1, "b": 1, "type": "add"}, headers=other).json()
+    assert client.put(f"/calculations/{theirs['id']}", json={"a": 1, "b": 1, "type": "add"}, headers=headers).status_code == 404
+    assert client.delete(f"/calculations/{theirs['id']}", headers=headers).status_code == 404
+    assert client.delete(f"/calculations/{calc['id']}", headers=headers).status_code == 404
+    assert client.get(f"/calculations/{theirs['id']}", headers=other).json() == theirs
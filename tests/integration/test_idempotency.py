@@ -0,0 +1,137 @@
+"""Idempotency-Key replays for POST /calculations and /users/register."""
+import asyncio
+import dataclasses
+import threading
+from uuid import uuid4
+
+import httpx
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+from fastapi.testclient import TestClient
+
+from app.api import main
+from app.api.idempotency import IdempotencyMiddleware
+from app.core import models
+from app.core.cache import TTLCache
+from app.core.writequeue import GroupCommitQueue
+
+client = TestClient(main.app)
+
+
+def _user() -> dict:
+    unique = uuid4().hex[:8]
+    return {"username": f"idem_{unique}", "email": f"idem_{unique}@example.com", "password": "pw"}
+
+
+def _login(user: dict) -> dict:
+    assert client.post("/users/register", json=user).status_code == 200
+    token = client.post("/users/token", json=user).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_register_retry_is_replayed_without_hashing_again():
+    user = _user()
+    headers = {"Idempotency-Key": uuid4().hex}
+    first = client.post("/users/register", json=user, headers=headers)
+    hashed = main.password_pool.stats()["completed"]
+    retry = client.post("/users/register", json=user, headers=headers)
+
+    assert first.status_code == retry.status_code == 200
+    assert retry.json() == first.json()
+    assert retry.headers["idempotent-replayed"] == "true"
+    assert "idempotent-replayed" not in first.headers
+    assert main.password_pool.stats()["completed"] == hashed
+    # without the key the handler runs and finds the user exists
+    assert client.post("/users/register", json=user).status_code == 400
+
+
+def test_calculation_keys_are_scoped_per_user_and_request():
+    auth, other = _login(_user()), _login(_user())
+    payload = {"a": 2, "b": 3, "type": "add"}
+    key = {"Idempotency-Key": "create-1"}
+
+    first = client.post("/calculations", json=payload, headers={**auth, **key})
+    retry = client.post("/calculations", json=payload, headers={**auth, **key})
+    assert first.status_code == retry.status_code == 201
+    assert retry.json()["id"] == first.json()["id"]
+    assert len(client.get("/calculations", headers=auth).json()) == 1
+
+    # the same key from another user is a different request
+    theirs = client.post("/calculations", json=payload, headers={**other, **key})
+    assert theirs.status_code == 201 and theirs.json()["id"] != first.json()["id"]
+
+    changed = client.post("/calculations", json={**payload, "b": 4}, headers={**auth, **key})
+    assert changed.status_code == 422
+    assert client.post("/calculations", json=payload, headers={**auth, "Idempotency-Key": "x" * 256}).status_code == 400
+    # a bad token is left for the route to reject
+    bad = client.post("/calculations", json=payload, headers={"Authorization": "Bearer nope", **key})
+    assert bad.status_code == 401
+
+
+def test_concurrent_duplicates_wait_for_the_first_request():
+    auth = _login(_user())
+    headers = {**auth, "Idempotency-Key": uuid4().hex}
+
+    async def send_twice():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            return await asyncio.gather(
+                *(ac.post("/calculations", json={"a": 1, "b": 1, "type": "add"}, headers=headers) for _ in range(5))
+            )
+
+    responses = asyncio.run(send_twice())
+    assert {r.status_code for r in responses} == {201}
+    assert len({r.json()["id"] for r in responses}) == 1
+    assert sum("idempotent-replayed" in r.headers for r in responses) == 4
+    assert len(client.get("/calculations", headers=auth).json()) == 1
+
+
+def test_server_errors_are_not_replayed():
+    calls = []
+    app = FastAPI()
+
+    @app.post("/flaky")
+    def flaky():
+        calls.append(1)
+        return JSONResponse({"attempt": len(calls)}, status_code=503 if len(calls) == 1 else 200)
+
+    app.add_middleware(IdempotencyMiddleware, store=TTLCache(16, ttl=60), paths=("/flaky",), principal=lambda scope: "")
+    tc = TestClient(app)
+    headers = {"Idempotency-Key": "k"}
+    assert tc.post("/flaky", headers=headers).status_code == 503
+    assert tc.post("/flaky", headers=headers).json() == {"attempt": 2}
+    assert tc.post("/flaky", headers=headers).json() == {"attempt": 2}
+    assert len(calls) == 2
+
+
+def test_timed_out_write_is_stored_for_the_retry_once_it_commits(monkeypatch):
+    auth = _login(_user())
+    headers = {**auth, "Idempotency-Key": uuid4().hex}
+    release = threading.Event()
+
+    def slow_commit(obj):
+        release.wait(5)
+        return main.CalculationRead.model_validate(obj)
+
+    writer = GroupCommitQueue(main.SessionLocal, models.Calculation, convert=slow_commit)
+    monkeypatch.setattr(main, "calculation_writer", writer)
+    monkeypatch.setattr(main, "settings", dataclasses.replace(main.settings, db_write_timeout=0.05))
+
+    async def timeout_then_retry():
+        transport = httpx.ASGITransport(app=main.app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as ac:
+            payload = {"a": 4, "b": 5, "type": "add"}
+            first = await ac.post("/calculations", json=payload, headers=headers)
+            # the write is still under way, so the retry waits for its outcome
+            retry = asyncio.ensure_future(ac.post("/calculations", json=payload, headers=headers))
+            await asyncio.sleep(0.1)
+            assert not retry.done()
+            release.set()
+            return first, await retry
+
+    first, retry = asyncio.run(timeout_then_retry())
+    writer.shutdown()
+    assert first.status_code == 504
+    assert retry.status_code == 201 and retry.headers["idempotent-replayed"] == "true"
+    assert retry.json()["result"] == 9
+    assert [c["id"] for c in client.get("/calculations", headers=auth).json()] == [retry.json()["id"]]
@@ -0,0 +1,101 @@
+"""The bulk user import CLI (app.tools.import_users)."""
+import csv
+import uuid
+
+from app.auth.security import verify_password
+from app.core import models
+from app.tools import import_users
+
+
+def _write_csv(path, rows):
+    with open(path, "w", newline="") as fh:
+        writer = csv.writer(fh)
+        writer.writerow(("username", "email", "password"))
+        writer.writerows(rows)
+
+
+def _patch_database(monkeypatch):
+    from app.api.main import SessionLocal, engine, ensure_schema
+
+    # app.core.database may have been reloaded with another URL by other tests
+    monkeypatch.setattr("app.core.database.SessionLocal", SessionLocal)
+    monkeypatch.setattr("app.core.database.ensure_schema", lambda: ensure_schema(engine))
+    return SessionLocal
+
+
+def test_import_reports_duplicates_and_invalid_rows(monkeypatch, tmp_path, capsys):
+    SessionLocal = _patch_database(monkeypatch)
+    p = f"imp_{uuid.uuid4().hex[:8]}"
+    with SessionLocal() as db:
+        db.add(models.User(username=f"{p}_taken", email=f"{p}_other@example.com", password_hash="x"))
+        db.commit()
+    _write_csv(
+        tmp_path / "users.csv",
+        [(f"{p}_{i}", f"{p}_{i}@example.com", f"pw{i}") for i in range(5)]
+        + [
+            (f"{p}_1", f"{p}_new@example.com", "pw"),  # line 7
+            (f"{p}_x", f"{p}_2@example.com", "pw"),
+            (f"{p}_taken", f"{p}_taken@example.com", "pw"),
+            (f"{p}_y", f"{p}_other@example.com", "pw"),
+            (f"{p}_z", "not-an-email", "pw"),
+        ],
+    )
+
+    args = [str(tmp_path / "users.csv"), "--workers", "0", "--chunk-size", "3", "--errors", str(tmp_path / "errors.csv")]
+    assert import_users.main(args) == 0
+    out = capsys.readouterr().out
+    assert "imported 5 users, 4 duplicates, 1 invalid" in out and "users/s" in out
+
+    with open(tmp_path / "errors.csv", newline="") as fh:
+        errors = {int(r["line"]): r["reason"] for r in csv.DictReader(fh)}
+    assert errors.pop(11).startswith("email:")
+    assert errors == {
+        7: "duplicate username in file",
+        8: "duplicate email in file",
+        9: "username already exists",
+        10: "email already exists",
+    }
+
+    with SessionLocal() as db:
+        user = db.query(models.User).filter_by(username=f"{p}_3").one()
+        assert verify_password("pw3", user.password_hash)
+
+    # running it again imports nothing and still succeeds
+    assert import_users.main(args) == 0
+    assert "imported 0 users, 9 duplicates, 1 invalid" in capsys.readouterr().out
+
+
+def test_import_hashes_on_a_process_pool(monkeypatch, tmp_path, capsys):
+    SessionLocal = _patch_database(monkeypatch)
+    p = f"imp_{uuid.uuid4().hex[:8]}"
+    _write_csv(tmp_path / "users.csv", [(f"{p}_{i}", f"{p}_{i}@example.com", f"pw{i}") for i in range(4)])
+
+    assert import_users.main([str(tmp_path / "users.csv"), "--workers", "1"]) == 0
+    assert "imported 4 users" in capsys.readouterr().out
+    with SessionLocal() as db:
+        user = db.query(models.User).filter_by(username=f"{p}_2").one()
+        assert verify_password("pw2", user.password_hash)
+
+
+def test_conflicting_rows_fall_back_to_row_by_row_inserts(monkeypatch):
+    SessionLocal = _patch_database(monkeypatch)
+    p = f"imp_{uuid.uuid4().hex[:8]}"
+
+    def hash_many(passwords):
+        # someone registers one of the names between the duplicate check and the insert
+        with SessionLocal() as other:
+            other.add(models.User(username=f"{p}_1", email=f"{p}_race@example.com", password_hash="x"))
+            other.commit()
+        return ["hashed"] * len(passwords)
+
+    records = [{"username": f"{p}_{i}", "email": f"{p}_{i}@example.com", "password": "pw"} for i in range(3)]
+    report = import_users.import_users(records, SessionLocal, hash_many=hash_many)
+    assert report.imported == 2
+    assert report.rejected == [(3, f"{p}_1", f"{p}_1@example.com", "username or email already exists")]
+
+
+def test_missing_columns_are_rejected(monkeypatch, tmp_path, capsys):
+    _patch_database(monkeypatch)
+    (tmp_path / "users.csv").write_text("username,password\nbob,pw\n")
+    assert import_users.main([str(tmp_path / "users.csv"), "--workers", "0"]) == 2
+    assert "missing columns: email" in capsys.readouterr().err
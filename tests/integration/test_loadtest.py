@@ -0,0 +1,45 @@
+import json
+
+import pytest
+
+from app import loadtest
+
+
+def test_parse_mix_and_percentile():
+    assert loadtest.parse_mix("create=1, get=3") == {"create": 1.0, "get": 3.0}
+    for bad in ("create", "fly=1", "get=-1", "get=0"):
+        with pytest.raises(ValueError):
+            loadtest.parse_mix(bad)
+    ordered = [float(i) for i in range(1, 101)]
+    assert [loadtest.percentile(ordered, q) for q in (0.5, 0.95, 0.99)] == [50.0, 95.0, 99.0]
+    assert loadtest.percentile([], 0.5) == 0.0
+
+
+def test_in_process_run_reports_every_endpoint(tmp_path, monkeypatch, capsys):
+    monkeypatch.setenv("DB_POOL_SIZE", "5")
+    out = tmp_path / "load.json"
+    argv = ["--users", "3", "--requests", "40", "--duration", "60", "--mix", loadtest.DEFAULT_MIX, "--json", str(out)]
+    assert loadtest.main(argv) == 0
+
+    report = json.loads(out.read_text())
+    assert report["errors"] == 0
+    assert report["config"]["users"] == 3
+    # register + token per user, then exactly --requests calculation requests each
+    assert report["requests"] == 3 * 2 + 3 * 40
+    assert set(report["endpoints"]) == {
+        "POST /users/register",
+        "POST /users/token",
+        "POST /calculations",
+        "GET /calculations",
+        "GET /calculations/{id}",
+        "PUT /calculations/{id}",
+        "DELETE /calculations/{id}",
+    }
+    for stats in report["endpoints"].values():
+        assert stats["p50_ms"] <= stats["p95_ms"] <= stats["p99_ms"] <= stats["max_ms"]
+    assert "TOTAL" in capsys.readouterr().out
+
+
+def test_bad_mix_is_a_usage_error():
+    with pytest.raises(SystemExit):
+        loadtest.main(["--mix", "explode=1"])
@@ -17,4 +17,27 @@ def test_division_by_zero_api():
 @pytest.mark.asyncio
 async def test_startup_event_runs_and_logs():
     # Directly call the startup event to exercise the simple logging path
-    await main.startup_event()
\ No newline at end of file
+    await main.startup_event()
+
+
+def test_arithmetic_routes_are_memoized_and_cacheable():
+    main.result_cache.clear()
+    before = main.result_cache.stats()
+    r1 = client.get("/mul", params={"a": 1.25, "b": 8})
+    r2 = client.get("/mul", params={"a": 1.25, "b": 8})
+    assert r1.json() == r2.json() == {"operation": "mul", "a": 1.25, "b": 8, "result": 10}
+    after = client.get("/debug/cache").json()["result_cache"]
+    assert after["hits"] == before["hits"] + 1
+    assert after["misses"] == before["misses"] + 1
+
+    etag = r1.headers["etag"]
+    assert "max-age=" in r1.headers["cache-control"]
+    r3 = client.get("/mul", params={"a": 1.25, "b": 8}, headers={"If-None-Match": etag})
+    assert r3.status_code == 304
+    assert r3.headers["etag"] == etag
+
+    # signed zeros are distinct keys
+    assert client.get("/add", params={"a": -0.0, "b": -0.0}).headers["etag"] != etag
+    assert client.get("/add", params={"a": 0.0, "b": 0.0}).headers["etag"] != client.get(
+        "/add", params={"a": -0.0, "b": -0.0}
+    ).headers["etag"]
@@ -0,0 +1,73 @@
+from fastapi.testclient import TestClient
+
+from app.api import main
+from app.api.metrics import Histogram, MetricsRegistry, cache_metric_lines
+
+
+client = TestClient(main.app)
+
+
+def test_metrics_endpoint_reports_route_templates_and_statuses():
+    main.metrics_registry.reset()
+    client.get("/div", params={"a": 4, "b": 2})
+    client.get("/div", params={"a": 1, "b": 0})
+    client.get("/calculations/123")
+    client.get("/static/index.html")
+    client.get("/no/such/path")
+
+    r = client.get("/metrics")
+    assert r.status_code == 200
+    assert r.headers["content-type"].startswith("text/plain; version=0.0.4")
+    text = r.text
+    assert 'http_requests_total{method="GET",route="/div",status="200"} 1' in text
+    assert 'http_requests_total{method="GET",route="/div",status="400"} 1' in text
+    assert 'route="/calculations/{calc_id}"' in text
+    assert 'route="/static/{path}"' in text
+    assert 'route="<unmatched>",status="404"' in text
+    assert 'http_request_duration_seconds_count{method="GET",route="/div"} 2' in text
+    assert 'http_requests_in_flight{method="GET"} 1' in text  # the scrape itself
+    assert "calculator_result_cache_hits_total" in text
+    assert "calculator_log_dropped_total 0" in text
+    assert 'calculator_db_pool_size{engine="sync"}' in text
+    assert 'calculator_db_pool_timeouts_total{engine="sync"}' in text
+
+    summary = main.metrics_registry.summary()
+    assert summary["GET /div"]["count"] == 2
+    assert 0 < summary["GET /div"]["p50"] <= summary["GET /div"]["p99"]
+
+
+def test_metrics_middleware_counts_unhandled_errors_as_500():
+    async def _explode():
+        raise RuntimeError("boom")
+
+    main.app.add_api_route("/explode-metrics", _explode)
+    main.metrics_registry.reset()
+    tc = TestClient(main.app, raise_server_exceptions=False)
+    assert tc.get("/explode-metrics").status_code == 500
+    assert main.metrics_registry.status_counts[("GET", "/explode-metrics", 500)] == 1
+    assert main.metrics_registry.in_flight["GET"] == 0
+
+
+def test_histogram_quantiles_and_rendering():
+    hist = Histogram(buckets=(0.001, 0.01))
+    assert hist.quantile(0.5) == 0.0
+    for value_ns in (500_000, 500_000, 5_000_000, 50_000_000):
+        hist.observe_ns(value_ns)
+    assert hist.counts == [2, 1, 1]
+    assert hist.quantile(0.5) == 0.001
+    assert hist.quantile(0.75) == 0.01
+    assert hist.quantile(0.99) == float("inf")
+
+    reg = MetricsRegistry(buckets=(0.001,))
+    reg.observe("GET", '/q"uote', 200, 2_000_000, 10)
+    text = reg.render()
+    assert 'route="/q\\"uote",le="0.001"} 0' in text
+    assert 'le="+Inf"} 1' in text
+    assert 'http_response_size_bytes_sum{method="GET",route="/q\\"uote"} 10' in text
+
+
+def test_cache_metric_lines():
+    lines = cache_metric_lines("c", {"hits": 1, "misses": 2, "size": 3})
+    assert "c_hits_total 1" in lines
+    assert "c_misses_total 2" in lines
+    assert "c_size 3" in lines
@@ -0,0 +1,105 @@
+from uuid import uuid4
+
+from fastapi.testclient import TestClient
+from sqlalchemy import delete
+
+from app.api.main import app
+from app.auth import security
+from app.auth.principals import Principal, load_principal, principal_cache
+from app.core import models
+from app.core.database import SessionLocal
+
+
+client = TestClient(app)
+
+
+def _register(password: str = "pw"):
+    username = f"p_{uuid4().hex[:8]}"
+    r = client.post("/users/register", json={"username": username, "email": f"{username}@example.com", "password": password})
+    assert r.status_code == 200
+    tok = client.post("/users/token", json={"username": username, "password": password}).json()["access_token"]
+    return username, r.json()["id"], {"Authorization": f"Bearer {tok}"}
+
+
+def test_token_carries_uid_and_principal_is_cached():
+    username, user_id, headers = _register()
+    tok = headers["Authorization"].split()[1]
+    assert security.verify_token(tok)["uid"] == user_id
+
+    principal_cache.pop(username)
+    before = principal_cache.stats()
+    assert client.get("/calculations", headers=headers).status_code == 200
+    assert client.get("/calculations", headers=headers).status_code == 200
+    after = client.get("/debug/cache").json()["principal_cache"]
+    assert after["misses"] == before["misses"] + 1
+    assert after["hits"] == before["hits"] + 1
+    cached = principal_cache.get(username)
+    assert isinstance(cached, Principal)
+    assert (cached.id, cached.username, cached.email) == (user_id, username, f"{username}@example.com")
+
+
+def test_principal_invalidated_on_update_and_delete():
+    username, user_id, headers = _register()
+    assert client.get("/calculations", headers=headers).status_code == 200
+    assert principal_cache.get(username) is not None
+
+    db = SessionLocal()
+    try:
+        user = db.get(models.User, user_id)
+        user.email = f"changed-{username}@example.com"
+        db.commit()
+        assert principal_cache.get(username) is None
+
+        assert client.get("/calculations", headers=headers).status_code == 200
+        assert principal_cache.get(username).email.startswith("changed-")
+
+        user = db.get(models.User, user_id)
+        user.username = f"{username}-renamed"
+        db.commit()
+        assert principal_cache.get(username) is None
+
+        client.get("/calculations", headers=headers)
+        user = db.get(models.User, user_id)
+        db.delete(user)
+        db.commit()
+    finally:
+        db.close()
+
+    # the old subject no longer resolves, neither from cache nor database
+    assert client.get("/calculations", headers=headers).status_code == 401
+
+
+def test_uid_claim_must_match_subject():
+    username, user_id, _ = _register()
+    other, _, _ = _register()
+    principal_cache.pop(other)
+    tok = security.create_token({"sub": other, "uid": user_id})
+    r = client.get("/calculations", headers={"Authorization": f"Bearer {tok}"})
+    assert r.status_code == 401
+
+    db = SessionLocal()
+    try:
+        # tokens issued before the uid claim fall back to a username lookup
+        principal_cache.pop(username)
+        assert load_principal(db, username).id == user_id
+    finally:
+        db.close()
+
+
+def test_tokens_of_a_deleted_and_reregistered_username_are_told_apart():
+    username, old_id, old_headers = _register()
+    assert client.get("/calculations", headers=old_headers).status_code == 200
+
+    # a bulk delete skips the mapper listeners, so the old principal stays cached
+    with SessionLocal() as db:
+        db.execute(delete(models.User).where(models.User.id == old_id))
+        db.commit()
+    assert principal_cache.get(username).id == old_id
+    _register()  # takes the freed id, which SQLite would otherwise reuse
+    r = client.post("/users/register", json={"username": username, "email": f"{username}@example.com", "password": "pw"})
+    new_id = r.json()["id"]
+    tok = client.post("/users/token", json={"username": username, "password": "pw"}).json()["access_token"]
+
+    created = client.post("/calculations", json={"a": 1, "b": 1, "type": "add"}, headers={"Authorization": f"Bearer {tok}"})
+    assert created.json()["user_id"] == new_id
+    assert client.get("/calculations", headers=old_headers).status_code == 401
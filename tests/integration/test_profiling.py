@@ -0,0 +1,117 @@
+import pstats
+import threading
+import time
+
+from fastapi import FastAPI
+from fastapi.routing import APIRoute
+from fastapi.testclient import TestClient
+
+from app.api.profiling import ProfiledRoute, ProfilingMiddleware
+
+
+def busy_sync_work():
+    time.sleep(0.01)
+    return sum(range(10000))
+
+
+async def busy_async_work():
+    return sum(range(10000))
+
+
+def _app(tmp_path, sample_rate=0.0) -> FastAPI:
+    app = FastAPI()
+    app.router.route_class = ProfiledRoute
+    app.add_middleware(ProfilingMiddleware, output_dir=str(tmp_path / "profiles"), sample_rate=sample_rate)
+
+    @app.get("/sync")
+    def sync_endpoint(n: int = 1):
+        return {"total": busy_sync_work() * n}
+
+    @app.get("/async")
+    async def async_endpoint():
+        return {"total": await busy_async_work()}
+
+    return app
+
+
+def _profiles(tmp_path, suffix):
+    return sorted((tmp_path / "profiles").glob(f"*{suffix}")) if (tmp_path / "profiles").exists() else []
+
+
+def test_header_profiles_sync_endpoint_on_its_worker_thread(tmp_path):
+    client = TestClient(_app(tmp_path))
+    r = client.get("/sync", params={"n": 2}, headers={"X-Profile": "1", "X-Request-ID": "req/../42"})
+    assert r.status_code == 200 and r.json()["total"] == 2 * sum(range(10000))
+    assert r.headers["x-profile-id"].endswith("-GET-sync_endpoint-req..42")
+
+    (pstats_file,) = _profiles(tmp_path, ".pstats")
+    assert pstats_file.stem == r.headers["x-profile-id"]
+    functions = {name for _, _, name in pstats.Stats(str(pstats_file)).stats}
+    # busy_sync_work only ever runs on the threadpool
+    assert {"sync_endpoint", "busy_sync_work"} <= functions
+
+    (collapsed,) = _profiles(tmp_path, ".collapsed")
+    lines = collapsed.read_text().splitlines()
+    assert any("sync_endpoint" in line and "busy_sync_work" in line for line in lines)
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in lines)
+
+
+def test_profiles_are_written_off_the_event_loop(tmp_path, monkeypatch):
+    threads = []
+    write = ProfilingMiddleware._write
+
+    def recording_write(self, profile, stem):
+        threads.append(threading.current_thread())
+        write(self, profile, stem)
+
+    monkeypatch.setattr(ProfilingMiddleware, "_write", recording_write)
+    app = _app(tmp_path)
+
+    @app.get("/loop-thread")
+    async def loop_thread():
+        return {"name": threading.current_thread().name}
+
+    loop_name = TestClient(app).get("/loop-thread", headers={"X-Profile": "1"}).json()["name"]
+    assert [t.name for t in threads] != [loop_name] and len(threads) == 1
+    assert len(_profiles(tmp_path, ".collapsed")) == 1
+
+
+def test_unprofiled_requests_write_nothing(tmp_path):
+    client = TestClient(_app(tmp_path))
+    assert "x-profile-id" not in client.get("/sync").headers
+    assert "x-profile-id" not in client.get("/sync", headers={"X-Profile": "0"}).headers
+    assert _profiles(tmp_path, ".pstats") == []
+
+
+def test_sample_rate_profiles_async_endpoints(tmp_path):
+    client = TestClient(_app(tmp_path, sample_rate=1.0))
+    r = client.get("/async")
+    assert "-GET-async_endpoint-" in r.headers["x-profile-id"]
+    functions = {name for _, _, name in pstats.Stats(str(_profiles(tmp_path, ".pstats")[0])).stats}
+    assert "busy_async_work" in functions
+
+
+def test_disabled_by_default_installs_nothing():
+    from app.api.main import app
+
+    assert not any(m.cls is ProfilingMiddleware for m in app.user_middleware)
+    assert all(type(route) is APIRoute for route in app.routes if isinstance(route, APIRoute))
+
+
+class _BusyProfile:
+    """Stands in for cProfile.Profile while another profiling tool is active."""
+
+    def enable(self):
+        raise ValueError("Another profiling tool is already active")
+
+
+def test_requests_run_unprofiled_when_another_profiler_is_active(tmp_path, monkeypatch):
+    from app.api import profiling
+
+    monkeypatch.setattr(profiling.cProfile, "Profile", _BusyProfile)
+    assert profiling.RequestProfile().runcall(sum, [1, 2]) == 3
+
+    r = TestClient(_app(tmp_path)).get("/sync", headers={"X-Profile": "1"})
+    assert r.status_code == 200
+    assert "x-profile-id" not in r.headers
+    assert _profiles(tmp_path, ".pstats") == []
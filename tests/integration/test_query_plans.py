@@ -0,0 +1,122 @@
+"""Query-plan regression tests for the statements behind each route.
+
+Every statement is run through SQLite's ``EXPLAIN QUERY PLAN`` against a
+database built by the Alembic migrations; a full table scan (``SCAN <table>``)
+or a temporary B-tree for ORDER BY fails the test. The statements inside the
+``calculation_stats`` triggers, which run on every write, are checked too.
+"""
+import re
+from pathlib import Path
+
+import pytest
+from alembic import command
+from alembic.config import Config
+from sqlalchemy import create_engine, inspect, select
+
+from app.api.export import export_stmt
+from app.api.main import (
+    delete_calculation_stmt,
+    list_calculations_stmt,
+    owned_calculation_stmt,
+    update_calculation_stmt,
+)
+from app.core import database, models
+from app.core.stats import summary_stats_stmt
+
+ROOT = Path(__file__).resolve().parents[2]
+
+
+def migrate(url: str, revision: str) -> None:
+    cfg = Config(str(ROOT / "alembic.ini"))
+    cfg.set_main_option("script_location", str(ROOT / "alembic"))
+    cfg.set_main_option("sqlalchemy.url", url)
+    cfg.attributes["configure_logger"] = False
+    command.upgrade(cfg, revision)
+
+
+@pytest.fixture(scope="module")
+def conn(tmp_path_factory):
+    url = f"sqlite:///{tmp_path_factory.mktemp('plans') / 'plans.db'}"
+    migrate(url, "head")
+    engine = create_engine(url)
+    with engine.connect() as connection:
+        yield connection
+    engine.dispose()
+
+
+def query_plan(conn, stmt) -> list[str]:
+    sql = stmt if isinstance(stmt, str) else str(stmt.compile(dialect=conn.dialect, compile_kwargs={"literal_binds": True}))
+    return [row[-1] for row in conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {sql}")]
+
+
+def assert_indexed(conn, stmt) -> list[str]:
+    plan = query_plan(conn, stmt)
+    # SCAN CONSTANT ROW is the single row of an INSERT ... SELECT without FROM
+    bad = [step for step in plan if (step.startswith("SCAN ") and step != "SCAN CONSTANT ROW") or "TEMP B-TREE" in step]
+    assert not bad, f"full scan or sort in plan {plan}"
+    return plan
+
+
+ROUTE_QUERIES = {
+    "list first page": list_calculations_stmt(1, None, 101),
+    "list next page": list_calculations_stmt(1, 500, 101),
+    "list projected": list_calculations_stmt(1, 500, 101, ("result",)),
+    "export": export_stmt(1),
+    "get by id": owned_calculation_stmt(7, 1),
+    "update by id": update_calculation_stmt(7, 1, {"a": 1.0, "b": 2.0, "type": "add", "result": 3.0, "user_id": 1}),
+    "delete by id": delete_calculation_stmt(7, 1),
+    "login by username": select(models.User).where(models.User.username == "someone").limit(1),
+    "principal by id": select(models.User).where(models.User.id == 1),
+    "stats summary": summary_stats_stmt(1),
+}
+
+
+@pytest.mark.parametrize("name", ROUTE_QUERIES)
+def test_route_queries_use_an_index(conn, name):
+    assert_indexed(conn, ROUTE_QUERIES[name])
+
+
+def trigger_statements(conn) -> list[str]:
+    """The statements in each stats trigger, with OLD/NEW columns filled in."""
+    values = {"user_id": "1", "type": "'add'", "result": "2.0"}
+    statements = []
+    for (sql,) in conn.exec_driver_sql("SELECT sql FROM sqlite_master WHERE type = 'trigger' ORDER BY name"):
+        body = sql[sql.index(" BEGIN ") + len(" BEGIN ") : sql.rindex(" END")]
+        body = re.sub(r"\b(?:OLD|NEW)\.(\w+)", lambda m: values[m.group(1)], body)
+        statements += [" ".join(part.split()) for part in body.split(";") if part.strip()]
+    return statements
+
+
+def test_stats_trigger_statements_use_an_index(conn):
+    statements = trigger_statements(conn)
+    # insert: upsert; delete: adjust + drop empty; update: both
+    assert len(statements) == 6
+    for statement in statements:
+        plan = assert_indexed(conn, statement)
+        if "min(result)" in statement:
+            # min/max are recomputed from the user's rows via the composite index
+            assert sum("ix_calculations_user_id_id" in step for step in plan) == 2, plan
+
+
+def test_user_pages_use_the_composite_index(conn):
+    plan = assert_indexed(conn, list_calculations_stmt(1, 500, 101))
+    assert any("ix_calculations_user_id_id" in step for step in plan), plan
+
+
+def test_ensure_schema_adds_new_indexes_to_an_existing_database(tmp_path, monkeypatch):
+    # a database created before the composite index existed
+    url = f"sqlite:///{tmp_path / 'old.db'}"
+    migrate(url, "0001")
+    engine = create_engine(url)
+    monkeypatch.setattr(database, "_schema_ready", False)
+    database.ensure_schema(engine)
+    with engine.connect() as connection:
+        assert {ix["name"] for ix in inspect(connection).get_indexes("calculations")} == {"ix_calculations_user_id_id"}
+        plan = assert_indexed(connection, list_calculations_stmt(1, 500, 101))
+    engine.dispose()
+    assert any("ix_calculations_user_id_id" in step for step in plan), plan
+
+
+def test_detects_full_scans(conn):
+    with pytest.raises(AssertionError, match="full scan"):
+        assert_indexed(conn, select(models.Calculation).where(models.Calculation.type == "add"))
@@ -0,0 +1,105 @@
+import dataclasses
+import logging
+from uuid import uuid4
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+from sqlalchemy import select, text
+from sqlalchemy.exc import OperationalError
+
+from app.api.main import SessionLocal, app, engine
+from app.api.middleware import QueryStatsMiddleware
+from app.core import models, querystats
+from app.core.querystats import assert_max_queries, track_queries
+
+client = TestClient(app)
+
+
+def _user_headers():
+    name = f"q_{uuid4().hex[:8]}"
+    client.post("/users/register", json={"username": name, "email": f"{name}@example.com", "password": "pw"})
+    token = client.post("/users/token", json={"username": name, "password": "pw"}).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+def test_calculation_routes_query_budget():
+    headers = _user_headers()
+    client.get("/calculations", headers=headers)  # principal now cached
+    # one statement each; the budget of 2 leaves room for a principal cache miss
+    with assert_max_queries(2, engine):
+        calc = client.post("/calculations", json={"a": 1, "b": 2, "type": "add"}, headers=headers).json()
+    for method, url, kwargs in (
+        ("GET", f"/calculations/{calc['id']}", {}),
+        ("PUT", f"/calculations/{calc['id']}", {"json": {"a": 2, "b": 2, "type": "add"}}),
+        ("GET", "/calculations", {}),
+        ("GET", "/calculations/stats", {}),
+        ("DELETE", f"/calculations/{calc['id']}", {}),
+    ):
+        with assert_max_queries(2, engine) as executed:
+            r = client.request(method, url, headers=headers, **kwargs)
+        assert r.status_code < 300
+        assert r.headers["server-timing"].startswith("db;dur=")
+        assert r.headers["server-timing"].endswith(f'desc="{len(executed)} queries"')
+
+
+def test_assert_max_queries_lists_the_statements():
+    with pytest.raises(AssertionError, match=r"at most 1 queries, 2 were executed:\n  1\. SELECT"):
+        with assert_max_queries(1, engine):
+            with SessionLocal() as db:
+                db.execute(select(models.User.id).limit(1))
+                db.execute(select(models.Calculation.id).limit(1))
+
+
+def _lazy_backref_app():
+    demo = FastAPI()
+    demo.add_middleware(QueryStatsMiddleware, n_plus_one_threshold=3)
+
+    @demo.get("/n-plus-one")
+    def n_plus_one():
+        with SessionLocal() as db:
+            users = db.scalars(select(models.User).limit(4)).all()
+            # one lazy SELECT per user through the backref
+            return {"calculations": sum(len(u.calculations) for u in users)}
+
+    return demo
+
+
+def test_repeated_statements_are_flagged_as_n_plus_one(caplog):
+    for _ in range(4):
+        _user_headers()
+    with track_queries() as stats:
+        with SessionLocal() as db:
+            for user in db.scalars(select(models.User).limit(4)):
+                len(user.calculations)
+    ((statement, times),) = stats.repeated(3)
+    assert times == 4 and "FROM calculations" in statement
+    assert stats.count == 5 and stats.duration_ns > 0
+    assert stats.repeated(0) == []
+
+    with caplog.at_level(logging.WARNING, logger="calculator"):
+        r = TestClient(_lazy_backref_app()).get("/n-plus-one")
+    assert 'desc="5 queries"' in r.headers["server-timing"]
+    assert any("Possible N+1 in GET /n-plus-one: statement executed 4 times" in m for m in caplog.messages)
+
+
+def test_slow_queries_are_logged(monkeypatch, caplog):
+    monkeypatch.setattr(querystats, "settings", dataclasses.replace(querystats.settings, db_slow_query_ms=1e-6))
+    with caplog.at_level(logging.WARNING, logger="calculator.sql"):
+        with SessionLocal() as db:
+            db.execute(select(models.User.id).where(models.User.username == "nobody"))
+    assert any(m.startswith("Slow query (") and "FROM users" in m for m in caplog.messages)
+    assert "nobody" not in caplog.text
+
+
+def test_failed_statements_are_counted_and_leave_no_state(monkeypatch, caplog):
+    monkeypatch.setattr(querystats, "settings", dataclasses.replace(querystats.settings, db_slow_query_ms=1e-6))
+    with caplog.at_level(logging.WARNING, logger="calculator.sql"), track_queries() as stats:
+        with SessionLocal() as db:
+            with pytest.raises(OperationalError):
+                db.execute(text("SELECT * FROM no_such_table"))
+            assert "query_start_ns" not in db.connection().info
+            db.execute(select(models.User.id).limit(1))
+    assert stats.count == 2
+    assert "no_such_table" in next(iter(stats.statements))
+    assert any("no_such_table" in m for m in caplog.messages)
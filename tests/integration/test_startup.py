@@ -0,0 +1,48 @@
+"""Importing the app stays cheap and side-effect free; the first request stays fast.
+
+Each check runs in a fresh interpreter so module caches don't hide the cost.
+"""
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parents[2]
+
+# generous ceilings (seconds) meant to catch regressions such as heavy
+# import-time work, not to benchmark the machine
+IMPORT_BUDGET = 3.0
+FIRST_RESPONSE_BUDGET = 1.5
+
+PROBE = """
+import json, os, sys, time
+start = time.perf_counter()
+import app.api.main as main
+imported = time.perf_counter() - start
+touched_db = os.path.exists(os.environ["PROBE_DB"])
+deferred = [m for m in ("passlib", "jwt", "numpy") if m in sys.modules]
+from fastapi.testclient import TestClient
+client = TestClient(main.app)
+start = time.perf_counter()
+status = client.post("/users/login", json={"username": "nobody", "password": "x"}).status_code
+first = time.perf_counter() - start
+print(json.dumps({"import": imported, "first": first, "status": status, "deferred": deferred, "touched_db": touched_db}))
+"""
+
+
+def test_cold_import_and_first_response_budget(tmp_path):
+    db_path = tmp_path / "startup.db"
+    env = {"DATABASE_URL": f"sqlite:///{db_path}", "PROBE_DB": str(db_path), "PYTHONPATH": str(ROOT)}
+    out = subprocess.run(
+        [sys.executable, "-c", PROBE], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60, check=True
+    )
+    result = json.loads(out.stdout.strip().splitlines()[-1])
+
+    # importing the app must not touch the database or load the heavy libraries
+    assert not result["touched_db"]
+    assert result["deferred"] == []
+    # the first request creates the schema lazily and is answered normally
+    assert result["status"] == 401
+    assert db_path.exists()
+    assert result["import"] < IMPORT_BUDGET
+    assert result["first"] < FIRST_RESPONSE_BUDGET
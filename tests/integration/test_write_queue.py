@@ -0,0 +1,208 @@
+"""Group-committed calculation inserts (app.core.writequeue, DB_WRITE_COALESCE)."""
+import dataclasses
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from uuid import uuid4
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import create_engine, func, select
+from sqlalchemy.orm import sessionmaker
+
+from app.api import async_routes, main
+from app.core import database, models
+from app.core.writequeue import GroupCommitQueue, WriteQueueFullError
+
+
+def _session_factory(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path / 'writes.db'}", connect_args={"check_same_thread": False})
+    models.Base.metadata.create_all(engine)
+    return sessionmaker(bind=engine)
+
+
+def _row(i: int) -> dict:
+    return {"a": i, "b": 1, "type": "add", "result": i + 1.0, "user_id": None}
+
+
+def test_concurrent_inserts_share_commits_and_get_their_own_rows(tmp_path):
+    SessionLocal = _session_factory(tmp_path)
+    writer = GroupCommitQueue(SessionLocal, models.Calculation, convert=lambda c: (c.id, c.a), flush_ms=50)
+    start = threading.Barrier(20)
+
+    def insert(i):
+        start.wait()
+        return writer.insert(_row(i))
+
+    with ThreadPoolExecutor(20) as pool:
+        results = list(pool.map(insert, range(20)))
+    writer.shutdown()
+
+    assert [a for _, a in results] == list(range(20))
+    assert len({calc_id for calc_id, _ in results}) == 20
+    with SessionLocal() as db:
+        stored = dict(db.execute(select(models.Calculation.id, models.Calculation.a)).all())
+    assert stored == dict(results)
+    stats = writer.stats()
+    assert stats["rows"] == 20 and stats["failed"] == 0
+    assert stats["batches"] < 20 and stats["max_batch"] > 1
+
+
+def test_failing_row_only_fails_its_own_request(tmp_path):
+    SessionLocal = _session_factory(tmp_path)
+    writer = GroupCommitQueue(SessionLocal, models.Calculation, convert=lambda c: c.a, flush_ms=50)
+    futures = [writer.submit(_row(0)), writer.submit({**_row(1), "a": None}), writer.submit(_row(2))]
+    writer.shutdown()
+
+    assert futures[0].result() == 0 and futures[2].result() == 2
+    with pytest.raises(Exception):
+        futures[1].result()
+    assert writer.stats()["rows"] == 2 and writer.stats()["failed"] == 1
+
+
+def test_full_queue_is_rejected_and_shutdown_drains_it(tmp_path):
+    SessionLocal = _session_factory(tmp_path)
+    writer = GroupCommitQueue(SessionLocal, models.Calculation, batch_size=10, max_depth=2)
+    flushing, release = threading.Event(), threading.Event()
+
+    def blocked(obj):
+        # hold the writer thread inside its first flush while the queue fills up
+        flushing.set()
+        release.wait()
+        return obj.a
+
+    writer.convert = blocked
+    first = writer.submit(_row(0))
+    assert flushing.wait(5)
+    queued = [writer.submit(_row(1)), writer.submit(_row(2))]
+    with pytest.raises(WriteQueueFullError):
+        writer.submit(_row(3))
+    assert writer.stats()["rejected"] == 1
+
+    release.set()
+    writer.shutdown()
+    assert first.result() == 0
+    assert [f.result() for f in queued] == [1, 2]
+    with SessionLocal() as db:
+        assert db.scalar(select(func.count()).select_from(models.Calculation)) == 3
+
+
+def test_cancelled_requests_are_skipped_and_the_writer_keeps_running(tmp_path):
+    SessionLocal = _session_factory(tmp_path)
+    writer = GroupCommitQueue(SessionLocal, models.Calculation, convert=lambda c: c.a, batch_size=1)
+    flushing, release = threading.Event(), threading.Event()
+    convert = writer.convert
+
+    def blocked(obj):
+        flushing.set()
+        release.wait()
+        return convert(obj)
+
+    writer.convert = blocked
+    running = writer.submit(_row(0))
+    assert flushing.wait(5)
+    cancelled = writer.submit(_row(1))
+    assert cancelled.cancel()  # e.g. a client that disconnected while queued
+    assert not running.cancel()  # already being written
+    writer.convert = convert
+    release.set()
+
+    assert running.result(5) == 0
+    assert writer.submit(_row(2)).result(5) == 2
+    assert writer.stats()["rows"] == 2
+    with SessionLocal() as db:
+        assert sorted(db.scalars(select(models.Calculation.a))) == [0, 2]
+    writer.shutdown()
+
+
+def test_unexpected_errors_fail_the_batch_not_the_writer(tmp_path):
+    SessionLocal = _session_factory(tmp_path)
+    calls = []
+
+    def flaky_session():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+        return SessionLocal()
+
+    writer = GroupCommitQueue(flaky_session, models.Calculation, convert=lambda c: c.a)
+    with pytest.raises(RuntimeError, match="database unavailable"):
+        writer.submit(_row(0)).result(5)
+    assert writer.submit(_row(1)).result(5) == 1
+    assert writer.stats()["failed"] == 1 and writer.stats()["rows"] == 1
+    writer.shutdown()
+
+
+def _login(client) -> dict:
+    unique = uuid4().hex[:8]
+    user = {"username": f"wq_{unique}", "email": f"wq_{unique}@example.com", "password": "pw"}
+    assert client.post("/users/register", json=user).status_code == 200
+    token = client.post("/users/token", json=user).json()["access_token"]
+    return {"Authorization": f"Bearer {token}"}
+
+
+@pytest.fixture
+def writer(monkeypatch):
+    writer = GroupCommitQueue(main.SessionLocal, models.Calculation, convert=main.CalculationRead.model_validate)
+    monkeypatch.setattr(main, "calculation_writer", writer)
+    yield writer
+    writer.shutdown()
+
+
+def test_create_calculation_through_the_write_queue(writer):
+    client = TestClient(main.app)
+    auth = _login(client)
+    r = client.post("/calculations", json={"a": 6, "b": 3, "type": "divide"}, headers=auth)
+    assert r.status_code == 201
+    assert r.json()["result"] == 2.0
+    assert client.get(f"/calculations/{r.json()['id']}", headers=auth).json() == r.json()
+    assert writer.stats()["rows"] == 1
+    assert "calculator_write_queue_rows_total 1" in client.get("/metrics").text
+
+
+def test_full_write_queue_returns_503(writer, monkeypatch):
+    client = TestClient(main.app)
+    auth = _login(client)
+
+    def full(values):
+        raise WriteQueueFullError("write queue is full")
+
+    monkeypatch.setattr(writer, "submit", full)
+    r = client.post("/calculations", json={"a": 1, "b": 2, "type": "add"}, headers=auth)
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+
+
+@pytest.mark.parametrize("started, status", [(False, 503), (True, 504)])
+def test_write_timeout(writer, monkeypatch, started, status):
+    client = TestClient(main.app)
+    auth = _login(client)
+    submitted = []
+
+    def stuck(values):
+        future = Future()
+        if started:
+            future.set_running_or_notify_cancel()
+        submitted.append(future)
+        return future
+
+    monkeypatch.setattr(writer, "submit", stuck)
+    monkeypatch.setattr(main, "settings", dataclasses.replace(main.settings, db_write_timeout=0.05))
+    r = client.post("/calculations", json={"a": 1, "b": 2, "type": "add"}, headers=auth)
+    assert r.status_code == status
+    # a row still queued is withdrawn, so retrying cannot insert it twice
+    assert submitted[0].cancelled() is not started
+
+
+def test_async_create_calculation_through_the_write_queue(writer, monkeypatch):
+    # app.core.database may have been reloaded with another URL by other tests
+    monkeypatch.setattr(database, "SQLALCHEMY_DATABASE_URL", main.engine.url.render_as_string(hide_password=False))
+    monkeypatch.setattr(database, "_async_sessionmaker", None)
+    app = main.FastAPI()
+    async_routes.install(app)
+    with TestClient(app) as client:
+        auth = _login(client)
+        r = client.post("/calculations", json={"a": 2, "b": 5, "type": "multiply"}, headers=auth)
+        assert r.status_code == 201
+        assert r.json()["result"] == 10.0
+        assert client.get(f"/calculations/{r.json()['id']}", headers=auth).json() == r.json()
+    assert writer.stats()["rows"] == 1
@@ -23,3 +23,20 @@ def test_calculation_compute_no_persist_and_force():
     assert "Calculation" in r
     d = c.to_dict()
     assert d["a"] == 6
+
+
+def test_calculation_compute_results_bulk():
+    calcs = [
+        Calculation(a=1, b=2, type="add"),
+        Calculation(a=1, b=0, type="divide"),
+        Calculation(a=2, b=3, type="multiply", result=99.0),
+    ]
+    batch = Calculation.compute_results(calcs)
+    assert batch.zero_division.tolist() == [False, True, False]
+    assert calcs[0].result == 3
+    # division by zero leaves the row untouched instead of raising
+    assert calcs[1].result is None
+    # existing results are only overwritten when forced
+    assert calcs[2].result == 99.0
+    Calculation.compute_results(calcs, force=True)
+    assert calcs[2].result == 6
@@ -7,3 +7,49 @@ def test_password_hasher_with_deprecated_option():
     hashed = hasher.hash(raw)
     assert hasher.verify(raw, hashed) is True
     assert hasher.verify("wrong", hashed) is False
+
+
+def test_verify_token_caches_until_secret_changes(monkeypatch):
+    import jwt
+
+    from app.auth import security
+
+    calls = []
+    real_decode = jwt.decode
+
+    def counting_decode(*args, **kwargs):
+        calls.append(args[0])
+        return real_decode(*args, **kwargs)
+
+    monkeypatch.setattr(jwt, "decode", counting_decode)
+    tok = security.create_token({"sub": "cached"}, expire_seconds=60)
+    first = security.verify_token(tok)
+    first["sub"] = "mutated"  # callers get a copy
+    assert security.verify_token(tok)["sub"] == "cached"
+    assert len(calls) == 1
+
+    # explicit secrets bypass the cache
+    assert security.verify_token(tok, secret=security._JWT_SECRET)["sub"] == "cached"
+    assert len(calls) == 2
+
+    # rotating the secret drops every cached verification
+    monkeypatch.setattr(security, "_JWT_SECRET", "rotated-secret")
+    assert security.verify_token(tok) is None
+    assert len(security.token_cache) == 0
+
+
+def test_verify_token_cache_entry_expires_with_token(monkeypatch):
+    from app.auth import security
+
+    tok = security.create_token({"sub": "short"}, expire_seconds=60)
+    assert security.verify_token(tok)["sub"] == "short"
+    key = next(reversed(security.token_cache._data))
+    expires, _ = security.token_cache._data[key]
+    assert 0 < expires - security.token_cache._clock() <= 60
+
+    # tokens without exp are cached with the cache default (no expiry)
+    import jwt
+
+    no_exp = jwt.encode({"sub": "forever"}, security._JWT_SECRET, algorithm="HS256")
+    assert security.verify_token(no_exp)["sub"] == "forever"
+    assert security.verify_token(no_exp)["sub"] == "forever"
@@ -0,0 +1,60 @@
+"""Tests for the benchmark suite's baselines and regression check."""
+import json
+
+import pytest
+
+from benchmarks import suite
+
+
+def _result(p50: float) -> dict:
+    return {"iterations": 10, "mean_s": p50, "p50_s": p50, "p95_s": p50 * 2}
+
+
+def test_compare_flags_only_cases_over_the_threshold():
+    baseline = {"fast": _result(1e-3), "steady": _result(1e-3), "removed": _result(1e-3)}
+    current = {"fast": _result(1.3e-3), "steady": _result(1.2e-3), "added": _result(5.0)}
+    # a case missing from the run (e.g. filtered out by -k) or new since the
+    # baseline is never a regression
+    assert suite.compare(baseline, current, 0.25) == [("fast", 1e-3, 1.3e-3)]
+    assert suite.compare(baseline, current, 0.5) == []
+    assert suite.compare({}, current, 0.0) == []
+
+
+def test_baseline_round_trip(tmp_path):
+    results = {"GET /add": _result(2.5e-4), "calculator.add": _result(1e-7)}
+    path = tmp_path / "baseline.json"
+    suite.save_baseline(path, results)
+    assert suite.load_baseline(path) == results
+    document = json.loads(path.read_text())
+    assert {"created", "python", "platform"} <= document.keys()
+
+
+@pytest.fixture
+def fake_run(monkeypatch):
+    # main() points DATABASE_URL at a temporary file; have it restored afterwards
+    monkeypatch.delenv("DATABASE_URL", raising=False)
+    runs = []
+
+    def run(selected, iterations):
+        return {name: result for name, result in runs.pop(0).items() if selected(name)}
+
+    monkeypatch.setattr(suite, "run", run)
+    return runs
+
+
+def test_main_saves_compares_and_reports(fake_run, tmp_path, capsys):
+    path = tmp_path / "baseline.json"
+    fake_run.append({"GET /add": _result(1e-4), "GET /sub": _result(1e-4)})
+    assert suite.main(["--save", str(path)]) == 0
+    assert f"saved baseline to {path}" in capsys.readouterr().out
+
+    fake_run.append({"GET /add": _result(2e-4), "GET /sub": _result(1e-4), "GET /mul": _result(1e-4)})
+    assert suite.main(["--baseline", str(path)]) == 1
+    lines = capsys.readouterr().out.splitlines()
+    assert lines[1].split()[:2] == ["GET", "/add"] and lines[1].endswith("+100%")
+    assert lines[3].split()[-1] == "-"  # no baseline for GET /mul
+    assert lines[-1] == "REGRESSION GET /add: p50 100.0 us -> 200.0 us (+100%)"
+
+    fake_run.append({"GET /add": _result(2e-4), "GET /sub": _result(1e-4)})
+    assert suite.main(["--baseline", str(path), "-k", "sub"]) == 0
+    assert "REGRESSION" not in capsys.readouterr().out
@@ -0,0 +1,21 @@
+"""Tests for matching multi-row INSERT ... RETURNING rows to their parameters."""
+from types import SimpleNamespace
+
+from sqlalchemy.dialects import postgresql, sqlite
+
+from app.core import models
+from app.core.bulk import insert_returning
+
+
+def test_postgres_sorts_by_parameter_order():
+    stmt, ordered = insert_returning(models.Calculation, postgresql.psycopg2.dialect())
+    assert stmt._sort_by_parameter_order
+    rows = [SimpleNamespace(id=2), SimpleNamespace(id=1)]
+    assert ordered(iter(rows)) == rows
+
+
+def test_sqlite_sorts_the_returned_rows_by_id():
+    # sort_by_parameter_order would mean one INSERT per row on SQLite
+    stmt, ordered = insert_returning(models.Calculation, sqlite.dialect())
+    assert not stmt._sort_by_parameter_order
+    assert [row.id for row in ordered([SimpleNamespace(id=i) for i in (3, 1, 2)])] == [1, 2, 3]
@@ -0,0 +1,54 @@
+"""Tests for the TTL/LRU cache used by the API layer."""
+
+from app.core.cache import TTLCache
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_lru_eviction_and_counters():
+    cache = TTLCache(maxsize=2)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    assert cache.get("a") == 1  # "a" becomes most recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("c") == 3
+    stats = cache.stats()
+    assert stats["hits"] == 2
+    assert stats["misses"] == 1
+    assert stats["evictions"] == 1
+    assert stats["size"] == len(cache) == 2
+
+
+def test_entries_expire_after_ttl():
+    clock = FakeClock()
+    cache = TTLCache(maxsize=10, ttl=5, clock=clock)
+    cache.set("k", "v")
+    cache.set("short", "v", ttl=1)
+    clock.now = 2
+    assert cache.get("short") is None
+    assert cache.get("k") == "v"
+    clock.now = 5
+    assert cache.get("k", "default") == "default"
+    assert cache.stats()["expirations"] == 2
+
+
+def test_disabled_cache_pop_and_clear():
+    disabled = TTLCache(maxsize=0)
+    disabled.set("k", "v")
+    assert disabled.get("k") is None
+    assert disabled.stats()["hit_rate"] == 0.0
+
+    cache = TTLCache(maxsize=4)
+    cache.set("k", "v")
+    assert cache.pop("k") == "v"
+    assert cache.pop("k", "gone") == "gone"
+    cache.set("k", "v")
+    cache.clear()
+    assert len(cache) == 0
@@ -1,8 +1,10 @@
 """Tests for the CalculationFactory and operation objects (TDD)."""
 
+import math
+
 import pytest
 
-from app.core.factory import CalculationFactory, Operation
+from app.core.factory import CalculationFactory, Operation, compute_many
 
 
 def test_factory_returns_operation_instances_and_compute():
@@ -33,3 +35,29 @@ def test_operations_handle_zero_division():
     div_op = fac.get("divide")
     with pytest.raises(ZeroDivisionError):
         div_op.compute(1, 0)
+
+
+def test_factory_reuses_operation_instances():
+    assert CalculationFactory().get("add") is CalculationFactory().get("add")
+
+
+def test_compute_many_groups_by_type_and_masks_zero_division():
+    batch = compute_many(
+        ["add", "divide", "subtract", "multiply", "divide"],
+        [1, 10, 5, 3, 1],
+        [2, 4, 2, 4, 0],
+    )
+    assert batch.results[:4].tolist() == [3, 2.5, 3, 12]
+    assert math.isnan(batch.results[4])
+    assert batch.zero_division.tolist() == [False, False, False, False, True]
+
+
+def test_compute_many_empty_and_invalid_input():
+    batch = compute_many([], [], [])
+    assert batch.results.size == 0
+    assert batch.zero_division.size == 0
+
+    with pytest.raises(ValueError):
+        compute_many(["noop"], [1], [2])
+    with pytest.raises(ValueError):
+        compute_many(["add", "add"], [1], [2])
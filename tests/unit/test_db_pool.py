@@ -0,0 +1,70 @@
+import pytest
+from sqlalchemy import create_engine, exc
+
+from app.api.metrics import pool_metric_lines
+from app.core import database
+from app.core.pool import InstrumentedQueuePool, PoolStats, pool_status
+
+
+class _Pool(InstrumentedQueuePool):
+    stats = PoolStats()
+
+
+def test_instrumented_pool_counts_checkouts_and_timeouts(tmp_path):
+    engine = create_engine(
+        f"sqlite:///{tmp_path / 'pool.db'}", poolclass=_Pool, pool_size=1, max_overflow=0, pool_timeout=0.05
+    )
+    try:
+        with engine.connect():
+            status = pool_status(engine.pool)
+            assert status["checked_out"] == 1
+            with pytest.raises(exc.TimeoutError):
+                engine.connect()
+        with engine.connect():
+            pass
+    finally:
+        engine.dispose()
+
+    status = pool_status(engine.pool)
+    assert status["checkouts"] == 2
+    assert status["timeouts"] == 1
+    assert status["checked_out"] == 0
+    assert status["max_wait_seconds"] >= 0.05
+    assert status["wait_seconds"] >= status["max_wait_seconds"]
+
+
+def test_pool_status_without_queue_pool():
+    engine = create_engine("sqlite://")
+    assert pool_status(engine.pool) == {"size": 0, "checked_out": 0, "overflow": 0}
+
+
+def test_engine_options():
+    memory = database.engine_options("sqlite://", InstrumentedQueuePool)
+    assert "poolclass" not in memory
+    assert memory["connect_args"] == {"check_same_thread": False}
+
+    pg = database.engine_options("postgresql://u:p@db/app", InstrumentedQueuePool)
+    assert pg["poolclass"] is InstrumentedQueuePool
+    assert "connect_args" not in pg
+    assert {"pool_size", "max_overflow", "pool_timeout", "pool_pre_ping", "pool_recycle"} <= pg.keys()
+
+
+def test_sqlite_pragmas_applied_on_connect():
+    from app.api.main import engine  # database may have been reloaded with another URL
+
+    with engine.connect() as conn:
+        assert conn.exec_driver_sql("PRAGMA journal_mode").scalar() == "wal"
+        assert conn.exec_driver_sql("PRAGMA synchronous").scalar() == 1  # NORMAL
+        assert conn.exec_driver_sql("PRAGMA busy_timeout").scalar() == 5000
+    assert "PRAGMA mmap_size=268435456" in database.sqlite_pragmas()
+
+
+def test_pool_metric_lines():
+    lines = pool_metric_lines("db_pool", {"sync": {"size": 5, "timeouts": 2}, "async": {"size": 3}})
+    assert lines == [
+        "# TYPE db_pool_size gauge",
+        'db_pool_size{engine="async"} 3',
+        'db_pool_size{engine="sync"} 5',
+        "# TYPE db_pool_timeouts_total counter",
+        'db_pool_timeouts_total{engine="sync"} 2',
+    ]
@@ -0,0 +1,95 @@
+"""Tests for the configurable logging pipeline."""
+
+import io
+import json
+import logging
+import random
+
+import pytest
+
+from app.config import logging_config
+from app.config.logging_config import (
+    SamplingFilter,
+    configure_logging,
+    logging_stats,
+    parse_sample_rates,
+    shutdown_logging,
+)
+
+
+@pytest.fixture(autouse=True)
+def restore_logging():
+    yield
+    configure_logging(mode="sync", fmt="text", sample_rates={}, force=True)
+
+
+def test_configure_is_idempotent_without_force():
+    stream = io.StringIO()
+    configure_logging(stream=stream)
+    logging.getLogger("calculator").info("hello")
+    assert stream.getvalue() == ""
+
+
+def test_async_json_pipeline_writes_through_listener():
+    stream = io.StringIO()
+    configure_logging(mode="async", fmt="json", sample_rates={}, stream=stream, force=True)
+    logging.getLogger("calculator.test").info("value=%s", 42)
+    try:
+        raise RuntimeError("boom")
+    except RuntimeError:
+        logging.getLogger("calculator.test").exception("failed")
+    assert logging_stats()["mode"] == "async"
+    shutdown_logging()  # drains the queue
+
+    lines = [json.loads(line) for line in stream.getvalue().splitlines()]
+    assert lines[0]["message"] == "value=42"
+    assert lines[0]["logger"] == "calculator.test"
+    assert lines[0]["level"] == "INFO"
+    assert "boom" in lines[1]["message"]
+
+
+def test_async_queue_drops_when_full():
+    stream = io.StringIO()
+    configure_logging(mode="async", sample_rates={}, queue_size=1, stream=stream, force=True)
+    handler = logging_config._queue_handler
+    logging_config._listener.stop()  # nothing drains the queue now
+    logging_config._listener = None
+    log = logging.getLogger("calculator.test")
+    log.info("first")
+    log.info("second")
+    log.info("third")
+    assert handler.dropped == 2
+    assert logging_stats() == {"mode": "async", "queue_depth": 1, "dropped": 2}
+
+
+def test_sampling_filter_rates_and_levels():
+    rates = parse_sample_rates("calculator=1, calculator.access=0 ,,calculator.access.debug=0.5")
+    assert rates == {"calculator": 1.0, "calculator.access": 0.0, "calculator.access.debug": 0.5}
+    filt = SamplingFilter(rates, rng=random.Random(0))
+    assert filt.rate_for("calculator.access.debug.x") == 0.5
+    assert filt.rate_for("calculator.accessory") == 1.0
+    assert filt.rate_for("other") == 1.0
+
+    def record(name, level=logging.INFO):
+        return logging.LogRecord(name, level, __file__, 1, "msg", None, None)
+
+    assert not filt.filter(record("calculator.access"))
+    assert filt.filter(record("calculator.access", logging.WARNING))
+    assert filt.filter(record("calculator.operations"))
+
+
+def test_sampled_logger_is_dropped_in_sync_mode():
+    stream = io.StringIO()
+    configure_logging(mode="sync", sample_rates={"calculator.access": 0.0}, stream=stream, force=True)
+    logging.getLogger("calculator.access").info("dropped")
+    logging.getLogger("calculator.operations").info("kept")
+    assert "dropped" not in stream.getvalue()
+    assert "kept" in stream.getvalue()
+    assert logging_stats()["mode"] == "sync"
+
+
+def test_invalid_mode_and_format():
+    with pytest.raises(ValueError):
+        configure_logging(mode="nope", force=True)
+    with pytest.raises(ValueError):
+        configure_logging(fmt="xml", force=True)
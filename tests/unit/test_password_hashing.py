@@ -9,3 +9,127 @@ def test_password_hash_and_verify():
     # module-level helpers
     mh = hash_password("abc123")
     assert verify_password("abc123", mh)
+
+
+def test_password_hash_pool_thread_and_process():
+    import asyncio
+
+    from app.auth.security import PasswordHashPool
+
+    async def roundtrip(pool):
+        h = await pool.hash("pw")
+        return await pool.verify("pw", h), await pool.verify("nope", h)
+
+    for kind in ("thread", "process"):
+        pool = PasswordHashPool(PasswordHasher(), workers=1, kind=kind)
+        try:
+            assert asyncio.run(roundtrip(pool)) == (True, False)
+            stats = pool.stats()
+            assert stats["kind"] == kind
+            assert stats["completed"] == 3
+            assert stats["running"] == stats["queued"] == 0
+        finally:
+            pool.shutdown()
+        pool.shutdown()  # idempotent
+
+
+def test_password_hash_pool_sheds_load_when_full():
+    import asyncio
+
+    import pytest
+
+    from app.auth.security import HasherBusyError, PasswordHashPool
+
+    pool = PasswordHashPool(PasswordHasher(), max_queue=0)
+    with pytest.raises(HasherBusyError):
+        asyncio.run(pool.hash("pw"))
+    assert pool.stats()["rejected"] == 1
+    with pytest.raises(ValueError):
+        PasswordHashPool(PasswordHasher(), kind="fiber")
+
+
+def test_auth_routes_return_503_when_pool_is_full(monkeypatch):
+    from fastapi.testclient import TestClient
+
+    from app.api import main
+    from app.auth.security import PasswordHashPool
+
+    monkeypatch.setattr(main, "password_pool", PasswordHashPool(PasswordHasher(), max_queue=0))
+    client = TestClient(main.app)
+    r = client.post("/users/register", json={"username": "busy", "email": "busy@example.com", "password": "pw"})
+    assert r.status_code == 503
+    assert r.headers["retry-after"] == "1"
+    assert "calculator_password_pool_rejected_total 1" in client.get("/metrics").text
+
+
+def test_rounds_configuration_and_needs_update():
+    fast = PasswordHasher(rounds=1000)
+    h = fast.hash("pw")
+    assert h.startswith("$pbkdf2-sha256$1000$")
+    assert not fast.needs_update(h)
+    # within the tolerance band: no rehash
+    assert not PasswordHasher(rounds=1100).needs_update(h)
+
+    ok, new_hash = PasswordHasher(rounds=4000).verify_and_update("pw", h)
+    assert ok and new_hash.startswith("$pbkdf2-sha256$4000$")
+    assert PasswordHasher(rounds=4000).verify_and_update("wrong", h) == (False, None)
+
+
+def test_calibrate_rounds_and_cli(monkeypatch, capsys):
+    from app.auth import calibrate, security
+
+    rounds = security.calibrate_rounds(5, sample_rounds=1000, samples=1)
+    assert rounds >= 1000 and rounds % 1000 == 0
+
+    assert calibrate.main(["--target-ms", "2"]) == 0
+    assert "PASSWORD_HASH_ROUNDS=" in capsys.readouterr().out
+
+    monkeypatch.setattr(security, "settings", security.settings.__class__(password_hash_rounds=3000))
+    assert security._configured_rounds() == 3000
+    monkeypatch.setattr(security, "settings", security.settings.__class__(password_hash_target_ms=1))
+    assert security._configured_rounds() >= 1000
+    monkeypatch.setattr(security, "settings", security.settings.__class__())
+    assert security._configured_rounds() is None
+
+
+def test_login_rehashes_stale_password(monkeypatch):
+    import asyncio
+    from uuid import uuid4
+
+    from fastapi.testclient import TestClient
+
+    from app.api import main
+    from app.auth.security import PasswordHashPool
+    from app.core import models
+
+    # main's own session factory: app.core.database may have been reloaded by other tests
+    SessionLocal = main.SessionLocal
+    client = TestClient(main.app)
+    username = f"rh_{uuid4().hex[:8]}"
+    r = client.post("/users/register", json={"username": username, "email": f"{username}@example.com", "password": "pw"})
+    assert r.status_code == 200
+
+    def stored_hash():
+        db = SessionLocal()
+        try:
+            return db.query(models.User).filter(models.User.username == username).one().password_hash
+        finally:
+            db.close()
+
+    assert not stored_hash().startswith("$pbkdf2-sha256$2000$")
+    monkeypatch.setattr(main, "password_pool", PasswordHashPool(PasswordHasher(rounds=2000)))
+    assert client.post("/users/login", json={"username": username, "password": "pw"}).status_code == 200
+    upgraded = stored_hash()
+    assert upgraded.startswith("$pbkdf2-sha256$2000$")
+
+    # once current, further logins leave the hash alone
+    assert client.post("/users/token", json={"username": username, "password": "pw"}).status_code == 200
+    assert stored_hash() == upgraded
+    assert client.post("/users/token", json={"username": username, "password": "bad"}).status_code == 401
+
+    pool = PasswordHashPool(PasswordHasher(rounds=2000), workers=1, kind="process")
+    try:
+        ok, new_hash = asyncio.run(pool.verify_and_update("pw", upgraded))
+        assert ok and new_hash is None
+    finally:
+        pool.shutdown()
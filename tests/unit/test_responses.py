@@ -0,0 +1,35 @@
+import json
+from collections import namedtuple
+
+import pytest
+from pydantic import ValidationError
+
+from app.api.responses import calculation_rows_json, model_response, projection_json
+from app.api.schemas import CalculationRead
+
+Row = namedtuple("Row", "id a b type result user_id")
+
+
+def test_calculation_rows_json_validates_once_and_encodes():
+    rows = [Row(1, 1.0, 2.0, "add", 3.0, 7), Row(2, 6, 3, "divide", None, None)]
+    assert json.loads(calculation_rows_json(rows)) == [
+        {"id": 1, "a": 1.0, "b": 2.0, "type": "add", "result": 3.0, "user_id": 7},
+        {"id": 2, "a": 6.0, "b": 3.0, "type": "divide", "result": None, "user_id": None},
+    ]
+    assert calculation_rows_json([]) == b"[]"
+    with pytest.raises(ValidationError):
+        calculation_rows_json([Row(1, 1.0, 2.0, "modulo", 3.0, 7)])
+
+
+def test_projection_and_model_responses():
+    rows = [Row(1, 1.0, 2.0, "add", 3.0, 7)]
+    assert json.loads(projection_json(rows, ("id", "result"))) == [{"id": 1, "result": 3.0}]
+    overflow = [Row(2, 1e308, 10.0, "multiply", float("inf"), 7)]
+    assert projection_json(overflow, ("id", "result")) == b'[{"id":2,"result":null}]'
+
+    calc = CalculationRead(id=1, a=1, b=2, type="add", result=3)
+    response = model_response(calc, status_code=201, headers={"X-Test": "1"})
+    assert response.status_code == 201
+    assert response.headers["content-type"] == "application/json"
+    assert response.headers["x-test"] == "1"
+    assert CalculationRead.model_validate_json(response.body) == calc
@@ -0,0 +1,66 @@
+from app.config.settings import Settings
+
+
+def test_settings_from_env(monkeypatch):
+    monkeypatch.setenv("RESULT_CACHE_SIZE", "0")
+    monkeypatch.setenv("RESULT_CACHE_TTL", "1.5")
+    monkeypatch.delenv("RESULT_CACHE_MAX_AGE", raising=False)
+    s = Settings.from_env()
+    assert s.result_cache_size == 0
+    assert s.result_cache_ttl == 1.5
+    assert s.result_cache_max_age == Settings.result_cache_max_age
+
+
+def test_db_mode_from_env(monkeypatch):
+    monkeypatch.delenv("DB_MODE", raising=False)
+    assert Settings.from_env().db_mode == "sync"
+    monkeypatch.setenv("DB_MODE", "async")
+    assert Settings.from_env().db_mode == "async"
+
+
+def test_pool_and_sqlite_settings_from_env(monkeypatch):
+    monkeypatch.setenv("DB_POOL_SIZE", "20")
+    monkeypatch.setenv("DB_POOL_PRE_PING", "true")
+    monkeypatch.setenv("SQLITE_JOURNAL_MODE", "delete")
+    s = Settings.from_env()
+    assert s.db_pool_size == 20
+    assert s.db_pool_pre_ping is True
+    assert s.sqlite_journal_mode == "delete"
+    monkeypatch.setenv("DB_POOL_PRE_PING", "0")
+    assert Settings.from_env().db_pool_pre_ping is False
+
+
+def test_profiling_settings_from_env(monkeypatch):
+    for name in ("PROFILE_ENABLED", "PROFILE_SAMPLE_RATE", "PROFILE_DIR"):
+        monkeypatch.delenv(name, raising=False)
+    s = Settings.from_env()
+    assert (s.profile_enabled, s.profile_sample_rate, s.profile_dir) == (False, 0.0, "profiles")
+    monkeypatch.setenv("PROFILE_ENABLED", "yes")
+    monkeypatch.setenv("PROFILE_SAMPLE_RATE", "0.01")
+    monkeypatch.setenv("PROFILE_DIR", "/var/tmp/prof")
+    s = Settings.from_env()
+    assert (s.profile_enabled, s.profile_sample_rate, s.profile_dir) == (True, 0.01, "/var/tmp/prof")
+
+
+def test_query_instrumentation_settings_from_env(monkeypatch):
+    monkeypatch.setenv("DB_SLOW_QUERY_MS", "250")
+    monkeypatch.setenv("DB_N_PLUS_ONE_THRESHOLD", "0")
+    s = Settings.from_env()
+    assert (s.db_slow_query_ms, s.db_n_plus_one_threshold) == (250.0, 0)
+
+
+def test_write_coalescing_settings_from_env(monkeypatch):
+    assert Settings().db_write_coalesce is False
+    monkeypatch.setenv("DB_WRITE_COALESCE", "true")
+    monkeypatch.setenv("DB_WRITE_FLUSH_MS", "5")
+    monkeypatch.setenv("DB_WRITE_BATCH_SIZE", "50")
+    monkeypatch.setenv("DB_WRITE_QUEUE_DEPTH", "200")
+    s = Settings.from_env()
+    assert (s.db_write_coalesce, s.db_write_flush_ms, s.db_write_batch_size, s.db_write_queue_depth) == (True, 5.0, 50, 200)
+
+
+def test_idempotency_settings_from_env(monkeypatch):
+    monkeypatch.setenv("IDEMPOTENCY_CACHE_SIZE", "0")
+    monkeypatch.setenv("IDEMPOTENCY_TTL", "60")
+    s = Settings.from_env()
+    assert (s.idempotency_cache_size, s.idempotency_ttl) == (0, 60.0)